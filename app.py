@@ -1,313 +1,247 @@
 import streamlit as st
 import streamlit.components.v1 as components
 import os
+import re
 import time
-import threading
+import uuid
 from datetime import datetime
+from functools import partial
 from dotenv import load_dotenv
-import google.generativeai as genai
-from PyPDF2 import PdfReader
-
-# Timeout handler for API calls
-class TimeoutException(Exception):
-    pass
-
-def timeout_handler(seconds, callback, *args, **kwargs):
-    """Run a function with a timeout"""
-    result = [None]
-    error = [None]
-    completed = [False]
-
-    def target():
-        try:
-            result[0] = callback(*args, **kwargs)
-            completed[0] = True
-        except Exception as e:
-            error[0] = e
-
-    thread = threading.Thread(target=target)
-    thread.daemon = True
-    thread.start()
-    thread.join(seconds)
-
-    if completed[0]:
-        if error[0] is not None:
-            raise error[0]
-        return result[0]
-    else:
-        raise TimeoutException(f"Function call timed out after {seconds} seconds")
-
-# Load environment variables and configure API
+from ats_systems import ATS_SYSTEMS
+import extractors
+import job_index
+import profiling
+import routing
+import session_store
+import tracing
+from heuristics import estimate_chat_answer, estimate_report, estimate_score, is_estimate, mark_estimate
+from history import add_version, find_version, version_label, version_text
+from model_client import SCORE_SAMPLES, SloMissed, call_ensemble, call_model, generate_parallel, model_for
+from prompts import build_analysis_prompts, build_chat_prompt, build_delta_prompt, build_score_prompt
+from report import extract_ats_score, merge_reports, patch_report, split_report
+from resume_text import DELTA_MAX_CHANGED, canonicalize, diff_sections, estimate_tokens, fingerprint
+from token_budget import TokenBudgetExceeded, check_session_budget, count_tokens, fit_prompt, request_budget
+
+# Load environment variables; each call type gets its model from model_for (see MODEL_TIERS)
 load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-model = genai.GenerativeModel("gemini-1.5-flash")
 
-# Function to get Gemini output with caching and timeout
+# Names shown to the user when a prompt field had to be shortened to fit the token budget
+TRUNCATED_FIELD_LABELS = {
+    "resume_text": "resume",
+    "job_description": "job description",
+    "previous_analysis": "previous analysis",
+}
+
+# Function to tell the user which inputs were shortened to fit the prompt size limit
+def warn_truncated(truncated):
+    if truncated:
+        labels = ", ".join(TRUNCATED_FIELD_LABELS.get(name, name) for name in truncated)
+        st.warning(f"To keep the request within the size limit, the {labels} was shortened.")
+
+# Function to give the markdown and h2 headers of a report our custom header style
+@profiling.profiled("render")
+@tracing.traced("render")
+def style_headers(text):
+    # Replace markdown headers (## Header) with custom styled headers
+    text = re.sub(r'## ([A-Z\s]+):?', r'<h2 class="custom-header">\1</h2>', text)
+    # Replace any HTML h2 tags with our custom styled headers
+    return re.sub(r'<h2>([A-Z\s]+)</h2>', r'<h2 class="custom-header">\1</h2>', text)
+
+# Message shown whenever a local estimate stands in for the model's answer
+ESTIMATE_WARNING = ("Gemini is slow or unavailable right now, so this is a quick local estimate. "
+                    "The full result will replace it as soon as Gemini answers.")
+
+# Function to get Gemini output with caching and a latency SLO
+# The cache is keyed on the prompt's fingerprint (the underscore argument is not hashed by Streamlit);
+# the prompt already contains the resume text, so it is the only thing sent.
+# Slow or failed calls raise (so they are never cached) and the caller falls back to an estimate
+@st.cache_data(ttl=3600, show_spinner=False)  # Cache for 1 hour
+def get_gemini_output(prompt_fingerprint, _prompt, call_type="analysis"):
+    tracing.set_attribute("cache", "miss")
+    with st.spinner("Analyzing your resume... This may take a moment."):
+        response = call_model(model_for(call_type), [_prompt], call_type, cutoff=routing.slo_timeout(call_type))
+        charge_session_tokens(count_tokens(_prompt) + count_tokens(response.text))
+        return response.text
+
+# Function to merge the reports of a long resume's parts into one report
+def merge_parts(reports, weights):
+    scores = [extract_ats_score(report)["value"] for report in reports]
+    return merge_reports(reports, scores, weights)
+
+# Function to analyze the parts of a long resume in parallel and merge them into one report
+# It makes no Streamlit calls, so it can also run as a background refresh
+def analyze_parts(prompts, weights, cutoff=None):
+    return merge_parts(generate_parallel(model_for("analysis"), prompts, cutoff=cutoff), weights)
+
+# Function to get the Future of the text a call that missed its SLO will still produce, or None
+# finish turns the call's result into that text
+def pending_text(error, finish):
+    if not isinstance(error, SloMissed):
+        return None
+    return routing.then(error.pending, finish)
+
+# Function to analyze a long resume in parallel chunks and merge them into one report
+# Keyed on the fingerprint of all the part prompts; like get_gemini_output, slow or failed calls raise
 @st.cache_data(ttl=3600, show_spinner=False)  # Cache for 1 hour
-def get_gemini_output(pdf_text, prompt):
+def get_chunked_gemini_output(prompts_fingerprint, _prompts, _weights):
+    tracing.set_attribute("cache", "miss")
+    with st.spinner(f"Analyzing your resume in {len(_prompts)} parts... This may take a moment."):
+        # Each part gets the analysis SLO; the parts run in parallel
+        report = analyze_parts(_prompts, _weights, cutoff=routing.slo_timeout("analysis"))
+        charge_session_tokens(sum(count_tokens(prompt) for prompt in _prompts) + count_tokens(report))
+        return report
+
+# Function to remember an estimate that a background refresh will replace (see apply_refreshes)
+def expect_refresh(field, key, text):
+    st.session_state.pending_refresh[field] = {"key": key, "fingerprint": fingerprint(text)}
+
+# Function to run the full analysis, switching to chunked mode for long resumes
+# Texts are canonicalized first, so whitespace or PDF-artifact differences reuse the cached analysis
+# extracted is the result of background extraction (see extractors.py), which has this work done already.
+# If Gemini misses the analysis SLO or is down, returns an estimated report (see heuristics.py)
+# and keeps retrying Gemini in the background
+@profiling.profiled("analysis")
+@tracing.traced("analysis")
+def get_resume_analysis(pdf_text, job_description, ats_model, job_level="", job_role="", detailed=True, extracted=None):
+    if extracted is None:
+        extracted = {"canonical": canonicalize(pdf_text)}
+        extracted["fingerprint"] = fingerprint(extracted["canonical"])
+        extracted["tokens"] = estimate_tokens(extracted["canonical"])
+    pdf_text = extracted["canonical"]
+    job_description = canonicalize(job_description)
+    prompts, weights, truncated = build_analysis_prompts(extracted, job_description, ats_model, job_level, job_role, detailed,
+                                                         request_budget(st.session_state.get('tokens_used', 0)))
+    if weights is not None:
+        # All parts are sent together, so together they must fit in what is left of the session budget
+        check_session_budget(sum(count_tokens(prompt) for prompt in prompts), st.session_state.get('tokens_used', 0))
+        key = fingerprint("\n".join(prompts))
+        analyze = partial(get_chunked_gemini_output, key, prompts, weights)
+        refresh = partial(analyze_parts, prompts, weights)
+        finish = partial(merge_parts, weights=weights)
+    else:
+        warn_truncated(truncated)
+        prompt = prompts[0]
+        key = fingerprint(prompt)
+        analyze = partial(get_gemini_output, key, prompt)
+        refresh = lambda: call_model(model_for("analysis"), [prompt], "analysis").text
+        finish = lambda response: response.text
+
+    # A refresh that finished after an earlier estimate is used as is
+    report = routing.refreshed(key)
+    if report is not None:
+        tracing.set_attribute("cache", "refreshed")
+        return report
+    # A cache miss runs the cached function, which records "miss" instead
+    tracing.set_attribute("cache", "hit")
     try:
-        with st.spinner("Analyzing your resume... This may take a moment."):
-            # Define the API call function
-            def api_call():
-                return model.generate_content([pdf_text, prompt])
-
-            # Call with timeout (60 seconds)
-            try:
-                response = timeout_handler(60, api_call)
-                return response.text
-            except TimeoutException:
-                st.error("Analysis is taking longer than expected. Please try again or use a shorter resume.")
-                return "Analysis timed out. Please try again with a shorter resume or simpler job description."
+        return analyze()
     except Exception as e:
-        st.error(f"Error connecting to Gemini API: {str(e)}")
-        return "Error analyzing resume. Please try again later."
-
-# Function to get ATS score from analysis
-def extract_ats_score(analysis_text):
+        print(f"Analysis fell back to an estimate: {str(e)}")
+        tracing.set_attribute("fallback", "estimate")
+        # A call that only missed the SLO is still running; the refresh uses its answer
+        routing.start_refresh(key, refresh, pending_text(e, finish))
+        expect_refresh("analysis", key, pdf_text)
+        st.warning(ESTIMATE_WARNING)
+        return estimate_report(pdf_text, job_description, ats_model)
+
+# Function to re-analyze an edited resume by sending only the sections changed since the last analysis,
+# together with that analysis, and patching the report sections the model sends back
+# Returns None when a full analysis is needed instead: the last analysis was an estimate, more than
+# DELTA_MAX_CHANGED of the resume changed (so a delta would save little), or Gemini failed or sent no score
+@profiling.profiled("delta")
+@tracing.traced("delta")
+def get_delta_analysis(analyzed_text, edited_text, previous_report, job_description, ats_model, job_level="", job_role=""):
+    if not previous_report or is_estimate(previous_report):
+        return None
+    changes = diff_sections(analyzed_text, edited_text)
+    changed_tokens = sum(estimate_tokens(new_text or old_text) for _, old_text, new_text in changes)
+    if not changes or changed_tokens > DELTA_MAX_CHANGED * estimate_tokens(canonicalize(edited_text)):
+        return None
+    build = partial(build_delta_prompt, changes, ats_model=ats_model, job_level=job_level, job_role=job_role)
+    prompt, truncated = fit_prompt(build, {"previous_analysis": previous_report, "job_description": canonicalize(job_description)},
+                                   request_budget(st.session_state.get('tokens_used', 0)),
+                                   ["job_description", "previous_analysis"])
+    warn_truncated(truncated)
+    tracing.set_attribute("changed_sections", len(changes))
+    tracing.set_attribute("cache", "hit")
     try:
-        # Look for patterns like "ATS SCORE: 75.5" or "ATS Score: 75.5/100"
-        import re
-
-        # First, check for HTML h2 tag format (from our custom formatting)
-        html_pattern = r'<h2[^>]*>ATS SCORE</h2>\s*(\d+\.?\d*)'
-        html_match = re.search(html_pattern, analysis_text, re.IGNORECASE)
-
-        if html_match:
-            score_value = float(html_match.group(1))
-            print(f"Found score from HTML h2 tag: {score_value}")
-            return {
-                "value": score_value,
-                "display": f"{score_value}/100"
-            }
-
-        # Next, look for the exact ATS SCORE line in the analysis
-        # This is the most reliable way to get the exact score as shown in the analysis
-        score_line_pattern = r"(?:^|\n)(?:.*?)ATS\s+SCORE:?\s*(.*?)(?:\n|$)"
-        score_line_match = re.search(score_line_pattern, analysis_text, re.IGNORECASE | re.MULTILINE)
-
-        if score_line_match:
-            # Extract the full score line as displayed in the analysis
-            score_line = score_line_match.group(1).strip()
-
-            # Try to extract just the number from this line
-            number_match = re.search(r"(\d+\.?\d*)", score_line)
-            if number_match:
-                score_value = float(number_match.group(1))
-                print(f"Found exact score: {score_value} from line: {score_line}")
-                # Store both the numeric value and the full text representation
-                return {
-                    "value": score_value,
-                    "display": score_line  # This preserves the exact format shown in the analysis
-                }
-
-        # If we couldn't find a specific ATS SCORE line, try more generic patterns
-        patterns = [
-            r"ATS\s+SCORE:?\s*(\d+\.?\d*)",  # ATS SCORE: 75.5
-            r"ATS\s+SCORE:?\s*(\d+\.?\d*)\/100",  # ATS SCORE: 75.5/100
-            r"SCORE:?\s*(\d+\.?\d*)",  # SCORE: 75.5
-            r"(\d+\.?\d*)/100",  # 75.5/100
-            r"^(\d+\.?\d*)$"  # Just a number like 75.5
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, analysis_text, re.IGNORECASE | re.MULTILINE)
-            if match:
-                score_value = float(match.group(1))
-                print(f"Found score: {score_value} using pattern: {pattern}")
-                return {
-                    "value": score_value,
-                    "display": f"{score_value}/100"  # Default display format
-                }
-
-        # If no pattern matches, try to find any number in the text
-        numbers = re.findall(r"(\d+\.?\d*)", analysis_text)
-        if numbers:
-            for num in numbers:
-                try:
-                    score_value = float(num)
-                    if 0 <= score_value <= 100:  # Ensure it's a valid score
-                        print(f"Found score from numbers: {score_value}")
-                        return {
-                            "value": score_value,
-                            "display": f"{score_value}/100"  # Default display format
-                        }
-                except Exception:
-                    continue
-
-        print("No score found in text:", analysis_text[:100])  # Print first 100 chars for debugging
-        return {
-            "value": 0,
-            "display": "0/100"  # Default when no score is found
-        }
+        patch = get_gemini_output(fingerprint(prompt), prompt, "analysis")
     except Exception as e:
-        print(f"Error extracting score: {str(e)}")
-        return {
-            "value": 0,
-            "display": "0/100"  # Default on error
-        }
+        print(f"Delta analysis failed, running a full analysis: {str(e)}")
+        return None
+    if "ATS SCORE" not in dict(split_report(patch)):
+        print("Delta analysis had no ATS SCORE section, running a full analysis")
+        return None
+    print(f"Delta analysis of {len(changes)} changed sections ({changed_tokens} tokens)")
+    return patch_report(previous_report, patch)
+
+# Function to read the score from a score response, or None if it has none
+def parse_score(score_text):
+    score = extract_ats_score(score_text.strip())
+    return score["value"] if score["value"] > 0 else None
 
 # Function to analyze edited resume and return new score
+# The cache is keyed on the fingerprint of the score prompt, which is built from the canonical texts;
+# slow or failed calls raise, so they are never cached.
+# With SCORE_SAMPLES > 1 the score is the median of several samples that agree (see call_ensemble),
+# so re-clicking "Update Score" gives the same stable answer from the cache
 @st.cache_data(ttl=1800, show_spinner=False)  # Cache for 30 minutes
-def analyze_edited_resume(edited_text, job_description, ats_model="Generic ATS", job_level="", job_role=""):
-    # Get selected ATS system information
-    selected_ats = ATS_SYSTEMS[ats_model]
-
-    prompt = f"""
-    You are ResumeChecker, an expert in ATS (Applicant Tracking System) analysis.
-    Your task is to provide a consistent and accurate evaluation of the resume against the job description,
-    specifically for the {ats_model} ATS system.
-
-    ABOUT THE {ats_model.upper()} ATS SYSTEM:
-    {selected_ats["description"]}
-
-    KEY FEATURES:
-    {', '.join(selected_ats["key_features"])}
-
-    FORMAT PREFERENCES:
-    {selected_ats["format_preferences"]}
-
-    PARSING QUIRKS:
-    {selected_ats["parsing_quirks"]}
-
-    ANALYSIS APPROACH:
-    1. First, thoroughly analyze the job description to identify:
-       - Required skills, qualifications, and experience
-       - Essential keywords and phrases the ATS will likely scan for
-       - Core responsibilities and expectations
-       - Industry-specific terminology and jargon
-
-    2. Then, analyze the resume to determine:
-       - How well it matches the job requirements
-       - Which critical keywords are present or missing
-       - If the format is optimized for {ats_model} ATS parsing
-       - Whether experience and qualifications align with the job
-
-    3. Calculate the ATS score based on the following criteria with exact weights:
-       - Keyword match (40%): Presence of key skills, technologies, and qualifications from the job description
-       - Resume format (20%): Proper structure, section organization, and machine readability specifically for {ats_model}
-       - Experience relevance (25%): How well the experience matches the job requirements
-       - Education match (15%): Relevance of education to the position
-
-    IMPORTANT: Return ONLY the ATS score as a number out of 100 with one decimal place precision.
-    Do not include any other text, explanation, or analysis.
-
-    Resume text: {edited_text}
-    Job description: {job_description}
-    Job level: {job_level}
-    Job role: {job_role}
-    """
+def analyze_edited_resume(prompt_fingerprint, _prompt):
+    tracing.set_attribute("cache", "miss")
+    with st.spinner("Calculating ATS score..."):
+        if SCORE_SAMPLES > 1:
+            value, texts = call_ensemble(model_for("score"), [_prompt], "score", parse_score, cutoff=routing.slo_timeout("score"))
+            charge_session_tokens(count_tokens(_prompt) * len(texts) + sum(count_tokens(text) for text in texts))
+            value = round(value, 1)
+            return {"value": value, "display": f"{value}/100"}
+        response = call_model(model_for("score"), [_prompt], "score", cutoff=routing.slo_timeout("score"))
+        charge_session_tokens(count_tokens(_prompt) + count_tokens(response.text))
+        # Extract score using our improved function
+        return extract_ats_score(response.text.strip())
+
+# Function to score an edited resume, with an estimated score if Gemini misses the score SLO or is down
+# Raises TokenBudgetExceeded when the session has no budget left
+@profiling.profiled("score")
+@tracing.traced("score")
+def score_edited_resume(edited_text, job_description, ats_model="Generic ATS", job_level="", job_role=""):
+    edited_text = canonicalize(edited_text)
+    job_description = canonicalize(job_description)
+    build = partial(build_score_prompt, ats_model=ats_model, job_level=job_level, job_role=job_role)
+    prompt, _ = fit_prompt(build, {"resume_text": edited_text, "job_description": job_description},
+                           request_budget(st.session_state.get('tokens_used', 0)),
+                           ["job_description", "resume_text"])
+    key = fingerprint(prompt)
+    score_text = routing.refreshed(key)
+    if score_text is not None:
+        tracing.set_attribute("cache", "refreshed")
+        return extract_ats_score(score_text.strip())
+    tracing.set_attribute("cache", "hit")
     try:
-        with st.spinner("Calculating ATS score..."):
-            # Define the API call function
-            def api_call():
-                return model.generate_content([edited_text, prompt])
-
-            # Call with timeout (30 seconds)
-            try:
-                response = timeout_handler(30, api_call)
-                score_text = response.text.strip()
-                # Extract score using our improved function
-                score_result = extract_ats_score(score_text)
-                return score_result
-            except TimeoutException:
-                st.error("Score calculation is taking longer than expected. Please try again.")
-                return {"value": 0, "display": "Timed out"}
+        return analyze_edited_resume(key, prompt)
     except Exception as e:
-        st.error(f"Error calculating ATS score: {str(e)}")
-        print(f"Error in analyze_edited_resume: {str(e)}")
-        return {"value": 0, "display": "0/100"}
-
-# Function to read PDF with caching
-@st.cache_data(ttl=3600, show_spinner=False)  # Cache for 1 hour
+        print(f"Score fell back to an estimate: {str(e)}")
+        tracing.set_attribute("fallback", "estimate")
+        routing.start_refresh(key, lambda: call_model(model_for("score"), [prompt], "score").text,
+                              pending_text(e, lambda response: response.text))
+        expect_refresh("score", key, edited_text)
+        st.warning(ESTIMATE_WARNING)
+        return estimate_score(edited_text, job_description)
+
+# Function to read the uploaded resume (PDF, DOCX, RTF or TXT), waiting for the background extraction started on upload if it is still running
+# Returns the extracted text with its canonical form, fingerprint, token estimate and sections
+@profiling.profiled("read_pdf")
+@tracing.traced("read_pdf")
 def read_pdf(uploaded_file):
     if uploaded_file is not None:
         try:
-            with st.spinner("Reading PDF..."):
-                pdf_reader = PdfReader(uploaded_file)
-                pdf_text = ""
-                for page in pdf_reader.pages:
-                    pdf_text += page.extract_text()
-                return pdf_text
+            with st.spinner("Reading resume..."):
+                return extractors.submit(uploaded_file.getvalue()).result()
         except Exception as e:
-            st.error(f"Error reading PDF: {str(e)}")
+            st.error(f"Error reading file: {str(e)}")
             raise e
     else:
         raise FileNotFoundError("No file uploaded")
 
-# ATS system information
-ATS_SYSTEMS = {
-    "Generic ATS": {
-        "description": "A standard ATS that uses keyword matching and basic resume parsing.",
-        "key_features": [
-            "Keyword matching",
-            "Basic resume parsing",
-            "Standard formatting requirements"
-        ],
-        "format_preferences": "Standard resume format with clear section headings (Summary, Experience, Skills, Education).",
-        "parsing_quirks": "May struggle with complex formatting, tables, and graphics."
-    },
-    "iCIMS": {
-        "description": "A comprehensive talent acquisition platform used by many large enterprises.",
-        "key_features": [
-            "Advanced keyword matching",
-            "Semantic search capabilities",
-            "Skills-based filtering"
-        ],
-        "format_preferences": "Clean formatting with standard section headers. Supports DOC, DOCX, PDF, RTF, and TXT formats.",
-        "parsing_quirks": "Better at parsing PDF files than some other systems. May have issues with headers/footers and complex tables."
-    },
-    "Greenhouse": {
-        "description": "A hiring software platform focused on structured hiring processes.",
-        "key_features": [
-            "Attribute-based candidate evaluation",
-            "Custom application questions",
-            "Collaborative hiring"
-        ],
-        "format_preferences": "Clean, simple formatting. Works well with standard chronological resumes.",
-        "parsing_quirks": "May miss information in non-standard sections. Handles PDF and Word documents well."
-    },
-    "Manatal": {
-        "description": "An AI-powered recruitment software with advanced candidate matching.",
-        "key_features": [
-            "AI-powered candidate matching",
-            "Social media enrichment",
-            "Multilingual support"
-        ],
-        "format_preferences": "Standard resume format with clear section delineation. Supports various file formats.",
-        "parsing_quirks": "AI capabilities help with understanding context, but may still struggle with highly creative formats."
-    },
-    "ClearCompany": {
-        "description": "A talent management platform with emphasis on company goals and culture fit.",
-        "key_features": [
-            "Goal alignment",
-            "Culture-based screening",
-            "Competency mapping"
-        ],
-        "format_preferences": "Traditional resume format with clear sections. Prefers chronological format.",
-        "parsing_quirks": "May prioritize experience descriptions that align with company values and goals."
-    },
-    "Bullhorn": {
-        "description": "A recruitment software popular with staffing and recruiting agencies.",
-        "key_features": [
-            "Candidate tracking",
-            "Resume parsing",
-            "Job matching"
-        ],
-        "format_preferences": "Standard resume formats. Handles various file types including PDF and Word.",
-        "parsing_quirks": "Strong at parsing contact information and work history, may struggle with skill categorization in non-standard formats."
-    },
-    "Transformify": {
-        "description": "A modern ATS with focus on diversity and inclusion in hiring.",
-        "key_features": [
-            "Blind recruitment options",
-            "Skills-based matching",
-            "Global talent pool"
-        ],
-        "format_preferences": "Clean, standard formatting. Supports skills-based and chronological formats.",
-        "parsing_quirks": "May place higher emphasis on skills and qualifications over chronological work history."
-    }
-}
-
 # Job description templates
 JOB_TEMPLATES = {
     "Fresher SDE": """
@@ -492,9 +426,14 @@ Nice to Have:
 """
 }
 
+# Large texts kept per session; st.session_state holds their digest in the shared session store
+SESSION_TEXT_FIELDS = ["analysis_response", "pdf_text", "job_description", "edited_resume", "analyzed_resume"]
+
 # Function to initialize and manage session state
 def initialize_session_state():
     # Initialize session state variables if they don't exist
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
     if 'analysis_response' not in st.session_state:
         st.session_state.analysis_response = None
     if 'original_score' not in st.session_state:
@@ -506,22 +445,89 @@ def initialize_session_state():
     if 'job_description' not in st.session_state:
         st.session_state.job_description = None
     if 'edited_resume' not in st.session_state:
-        st.session_state.edited_resume = ""
+        set_session_text("edited_resume", "")
+    if 'analyzed_resume' not in st.session_state:
+        st.session_state.analyzed_resume = None  # The resume text the current analysis was made for
     if 'selected_ats' not in st.session_state:
         st.session_state.selected_ats = "Generic ATS"
     if 'job_level' not in st.session_state:
         st.session_state.job_level = ""
     if 'job_role' not in st.session_state:
         st.session_state.job_role = ""
+    if 'resume_versions' not in st.session_state:
+        st.session_state.resume_versions = []  # Edited versions of the resume with their scores (see history.py)
+    if 'tokens_used' not in st.session_state:
+        st.session_state.tokens_used = 0  # Prompt and response tokens used by this session
+    if 'pending_refresh' not in st.session_state:
+        st.session_state.pending_refresh = {}  # Estimates waiting for a background refresh (see routing.py)
     if 'app_version' not in st.session_state:
         st.session_state.app_version = "1.1.0"  # Track app version for cache busting
 
+    # Keep this session's texts in memory while it is active
+    session_store.touch(st.session_state.session_id)
+
+# Function to store one of the large session texts (see SESSION_TEXT_FIELDS)
+# A version's analysis is the current analysis_response when the version is added, so holding the
+# analyses of all versions before any text is replaced keeps them stored for as long as the versions exist
+def set_session_text(field, text):
+    hold_version_analyses()
+    st.session_state[field] = session_store.put(st.session_state.session_id, field, text)
+
+# Function to keep the analyses of the resume versions (see history.py) in the session store
+def hold_version_analyses():
+    versions = st.session_state.get("resume_versions", [])
+    session_store.hold(st.session_state.session_id,
+                       [version["analysis"] for version in versions if version.get("analysis")])
+
+# Function to read one of the large session texts, or None if it is not set
+def get_session_text(field):
+    return session_store.get(st.session_state.get(field))
+
+# Function to add the tokens of a model call to this session's usage
+def charge_session_tokens(count):
+    st.session_state.tokens_used = st.session_state.get('tokens_used', 0) + count
+
+# Function to swap estimates for Gemini's answers once their background refreshes have finished
+# An answer is only used if the text it was made for is still the one on screen
+def apply_refreshes():
+    pending = st.session_state.pending_refresh
+    for field, entry in list(pending.items()):
+        text = routing.refreshed(entry["key"])
+        if text is None:
+            # A refresh that gave up leaves the estimate in place
+            if not routing.refreshing(entry["key"]):
+                del pending[field]
+            continue
+        del pending[field]
+        pdf_text = get_session_text("pdf_text") or ""
+        edited_resume = get_session_text("edited_resume") or ""
+        if field == "analysis" and fingerprint(pdf_text) == entry["fingerprint"]:
+            score = extract_ats_score(text)
+            set_session_text("analysis_response", text)
+            # The current score follows unless an edited version has been scored since
+            if st.session_state.current_score == st.session_state.original_score:
+                st.session_state.current_score = score
+            st.session_state.original_score = score
+            add_version(st.session_state.resume_versions, pdf_text, pdf_text, score, st.session_state.analysis_response)
+        elif field == "analysis" and fingerprint(get_session_text("analyzed_resume") or "") == entry["fingerprint"]:
+            # An updated analysis of an edited version (see "Update Analysis")
+            score = extract_ats_score(text)
+            analyzed_resume = get_session_text("analyzed_resume")
+            set_session_text("analysis_response", text)
+            st.session_state.current_score = score
+            add_version(st.session_state.resume_versions, pdf_text, analyzed_resume, score, st.session_state.analysis_response)
+        elif field == "score" and fingerprint(edited_resume) == entry["fingerprint"]:
+            score = extract_ats_score(text.strip())
+            st.session_state.current_score = score
+            add_version(st.session_state.resume_versions, pdf_text, edited_resume, score)
+
 # Function to clear cache and reset session
 def reset_app():
     # Clear all cached functions
     st.cache_data.clear()
 
-    # Reset session state
+    # Release this session's stored texts and reset session state
+    session_store.release(st.session_state.session_id)
     for key in list(st.session_state.keys()):
         if key != 'app_version':  # Keep the app version
             del st.session_state[key]
@@ -535,9 +541,17 @@ def reset_app():
 # Streamlit UI
 st.set_page_config(page_title="ATS-Checker - Powered by Gemini AI", layout="wide")
 
+# Profile this rerun if profiling is on (PROFILE=true, or ?profile=1 in the URL), see profiling.py
+profiling.begin_rerun(st.query_params.get("profile") == "1")
+# Trace this rerun as one user action if tracing is on (TRACING=true), see tracing.py
+tracing.begin_rerun()
+
 # Initialize session state
 initialize_session_state()
 
+# Pick up any full results that arrived in the background since the last rerun
+apply_refreshes()
+
 # Custom CSS for a ResumeWorded-like design with hidden header
 st.markdown("""
 <style>
@@ -797,12 +811,26 @@ with st.sidebar:
 
 with left_col:
     # File upload
-    upload_file = st.file_uploader("Upload your resume (PDF)", type=["pdf"])
+    upload_file = st.file_uploader("Upload your resume (PDF, DOCX, RTF or TXT)", type=extractors.SUPPORTED_EXTENSIONS)
+
+    # Start extracting the resume right away, while the job details are being chosen
+    if upload_file is not None:
+        if st.session_state.get("traced_upload") != upload_file.file_id:
+            st.session_state.traced_upload = upload_file.file_id
+            tracing.set_action("upload")
+        extractors.submit(upload_file.getvalue())
 
     # Job template selection
     st.subheader("Job Description")
     use_template = st.checkbox("Use a job description template", value=False)
 
+    # With a job library index (see job_index.py), the resume can be matched against the library instead
+    job_library = job_index.shared_index()
+    use_library = False
+    if job_library is not None and not use_template:
+        use_library = st.checkbox(f"Find the best-fitting postings in the job library ({len(job_library)} postings)", value=False)
+    posting = None
+
     if use_template:
         job_template = st.selectbox(
             "Select a job template:",
@@ -812,6 +840,41 @@ with left_col:
         job_description = JOB_TEMPLATES[job_template]
         with st.expander("View Job Description"):
             st.write(job_description)
+    elif use_library:
+        job_description = ""
+        if upload_file is None:
+            st.info("Upload your resume to see the postings it fits best.")
+        else:
+            try:
+                extracted = read_pdf(upload_file)
+            except Exception:
+                extracted = None  # read_pdf has shown the error
+            if extracted is not None:
+                # Only postings of the chosen level and role are ranked; "Any" keeps them all
+                level_filter = st.selectbox("Postings for job level:", ["Any level"] + job_index.JOB_LEVELS)
+                role_filter = st.selectbox("Postings for job role:", ["Any role"] + job_index.JOB_ROLES)
+                started = time.perf_counter()
+                matches = job_library.search(extracted["canonical"],
+                                             job_level=level_filter if level_filter in job_index.JOB_LEVELS else "",
+                                             job_role=role_filter if role_filter in job_index.JOB_ROLES else "")
+                elapsed = time.perf_counter() - started
+                if matches:
+                    posting = st.selectbox(
+                        "Select a matching posting:",
+                        matches,
+                        format_func=lambda match: (f"{match['title']} ({len(match['matched_skills'])}/{len(match['skills'])} skills)")
+                    )
+                    st.caption(f"Top {len(matches)} of {len(job_library)} postings, found in {elapsed * 1000:.0f} ms")
+                    try:
+                        job_description = job_index.posting_text(posting)
+                    except OSError as e:
+                        st.error(f"Could not read the posting: {str(e)}")
+                    with st.expander("View Job Description"):
+                        st.write(job_description)
+                        if posting["missing_skills"]:
+                            st.markdown(f"**Skills not found in your resume:** {', '.join(posting['missing_skills'][:15])}")
+                else:
+                    st.warning("No postings of this level and role in the job library share any keywords with your resume.")
     else:
         # Enhanced custom job description input
         st.markdown("""
@@ -839,10 +902,13 @@ with left_col:
                 st.success(f"Job description length: {char_count} characters. Good level of detail for accurate analysis.")
 
     # Job level selection
-    job_level = st.selectbox("Select Job Level", ["Entry Level/Fresher", "Intermediate (2-5 years)", "Advanced (5+ years)"])
+    # (a posting picked from the job library preselects its own level and role)
+    job_level = st.selectbox("Select Job Level", job_index.JOB_LEVELS,
+                             index=job_index.JOB_LEVELS.index(posting["level"]) if posting and posting["level"] else 0)
 
     # Job role selection
-    job_role = st.selectbox("Select Job Role", ["Software Development Engineer", "Data Analyst/Scientist", "MERN Stack Developer", "Other"])
+    job_role = st.selectbox("Select Job Role", job_index.JOB_ROLES,
+                            index=job_index.JOB_ROLES.index(posting["role"]) if posting else 0)
 
     # ATS system focus selection (with clarification)
     st.markdown("""
@@ -858,115 +924,44 @@ with left_col:
 
     # Analyze button
     if st.button("Analyze Resume"):
+        tracing.set_action("analyze")
         if upload_file is not None:
             with st.spinner("Analyzing your resume..."):
                 try:
-                    pdf_text = read_pdf(upload_file)
-
-                    # Get selected ATS system information
-                    selected_ats = ATS_SYSTEMS[ats_model]
+                    extracted = read_pdf(upload_file)
+                    pdf_text = extracted["text"]
 
                     # Store selected ATS in session state
                     st.session_state.selected_ats = ats_model
+                    st.session_state.pending_refresh = {}
 
                     # Use a tailored prompt for ATS analysis with specific ATS information and deep job description analysis
-                    prompt = f"""
-                    You are ResumeChecker, an expert in ATS (Applicant Tracking System) analysis. Your task is to provide a comprehensive evaluation of the resume against the job description, specifically for the {ats_model} ATS system, and help the candidate pass the ATS screening process.
-
-                    ABOUT THE {ats_model.upper()} ATS SYSTEM:
-                    {selected_ats["description"]}
-
-                    KEY FEATURES:
-                    {', '.join(selected_ats["key_features"])}
-
-                    FORMAT PREFERENCES:
-                    {selected_ats["format_preferences"]}
-
-                    PARSING QUIRKS:
-                    {selected_ats["parsing_quirks"]}
-
-                    ANALYSIS APPROACH:
-                    1. First, thoroughly analyze the job description to identify:
-                       - Required skills, qualifications, and experience
-                       - Essential keywords and phrases the ATS will likely scan for
-                       - Core responsibilities and expectations
-                       - Company values and culture indicators
-                       - Industry-specific terminology and jargon
-
-                    2. Then, analyze the resume to determine:
-                       - How well it matches the job requirements
-                       - Which critical keywords are present or missing
-                       - If the format is optimized for {ats_model} ATS parsing
-                       - Whether experience and qualifications align with the job
-
-                    3. Calculate the ATS score based on the following criteria with exact weights:
-                       - Keyword match (40%): Presence of key skills, technologies, and qualifications from the job description
-                       - Resume format (20%): Proper structure, section organization, and machine readability specifically for {ats_model}
-                       - Experience relevance (25%): How well the experience matches the job requirements
-                       - Education match (15%): Relevance of education to the position
-
-                    ANALYSIS FORMAT:
-                    1. <h2>JOB DESCRIPTION ANALYSIS</h2>
-                       - Summarize the key requirements and qualifications from the job description
-                       - List the most important keywords and phrases the ATS will scan for
-                       - Identify any unique or specific requirements that stand out
-
-                    2. <h2>ATS SCORE</h2> Provide a single, consistent score out of 100 with one decimal place precision
-
-                    3. <h2>KEY FINDINGS</h2>
-                       - Identify the most important keywords found and missing in the resume
-                       - Evaluate the resume structure and format for {ats_model} ATS compatibility
-                       - Assess the overall match between the resume and job description
-
-                    4. <h2>{ats_model.upper()} SPECIFIC RECOMMENDATIONS</h2>
-                       - Provide specific advice for optimizing this resume for the {ats_model} ATS system
-                       - Highlight any particular strengths or weaknesses for this specific ATS
-                       - Explain how this specific ATS might evaluate certain aspects of the resume
-
-                    5. <h2>OPTIMIZATION SUGGESTIONS</h2>
-                       - List 5 specific, actionable recommendations to improve the resume for this job
-                       - Suggest exact keywords to add and where to place them
-                       - Recommend format changes to improve ATS readability
-                       - Provide specific phrasing suggestions that align with the job description
-
-                    6. <h2>SECTION-BY-SECTION ANALYSIS</h2>
-                       - Analyze each major section of the resume (Summary, Experience, Skills, Education)
-                       - Provide specific improvement suggestions for each section
-                       - Suggest how to better align each section with the job requirements
-
-                    7. <h2>ATS PASSING STRATEGY</h2>
-                       - Provide a clear strategy for passing the {ats_model} ATS for this specific job
-                       - Highlight the most critical changes needed to improve chances of getting through the ATS
-                       - Suggest any industry-specific tactics that might help for this particular role
-
-                    IMPORTANT FORMATTING NOTES:
-                    - Use HTML <h2> tags for all section headers as shown above
-                    - Make sure all section headers have the same style and formatting
-                    - Use consistent styling throughout the analysis
-                    - Do not include any additional attributes in the h2 tags
-
-                    Resume text: {pdf_text}
-                    Job description: {job_description}
-                    Job level: {job_level}
-                    Job role: {job_role}
-                    """
-
-                    response = get_gemini_output(pdf_text, prompt)
+                    # (long resumes are analyzed in parallel parts and merged into the same report format)
+                    response = get_resume_analysis(pdf_text, job_description, ats_model, job_level, job_role,
+                                                   extracted=extracted)
 
                     # Extract ATS score from the analysis
                     original_score = extract_ats_score(response)
+                    if is_estimate(response):
+                        original_score = mark_estimate(original_score)
 
                     # Store in session state
-                    st.session_state.analysis_response = response
+                    set_session_text("analysis_response", response)
                     st.session_state.original_score = original_score
                     st.session_state.current_score = original_score
-                    st.session_state.pdf_text = pdf_text
-                    st.session_state.job_description = job_description
+                    set_session_text("pdf_text", pdf_text)
+                    set_session_text("analyzed_resume", pdf_text)
+                    set_session_text("job_description", job_description)
                     st.session_state.job_level = job_level
                     st.session_state.job_role = job_role
 
                     # Always update the editable resume when a new file is uploaded
-                    st.session_state.edited_resume = pdf_text
+                    set_session_text("edited_resume", pdf_text)
+
+                    # Start a new version history with the uploaded resume as the original
+                    st.session_state.resume_versions = []
+                    add_version(st.session_state.resume_versions, pdf_text, pdf_text, original_score,
+                                st.session_state.analysis_response)
 
                 except Exception as e:
                     st.error(f"An error occurred: {str(e)}")
@@ -1017,8 +1012,11 @@ if 'analysis_response' in st.session_state:
                 </div>
                 """, unsafe_allow_html=True)
 
+        # Score history is filled in at the end of the page, once Update Score has run
+        score_history = st.container()
+
         # Extract issues from analysis
-        analysis_text = st.session_state.analysis_response
+        analysis_text = get_session_text("analysis_response")
 
         # Simplified issue extraction (in a real app, this would be more sophisticated)
         missing_keywords = []
@@ -1061,25 +1059,11 @@ if 'analysis_response' in st.session_state:
 
         # Display the full analysis with proper formatting and colors
         # Process the analysis response to ensure consistent header styling
-        analysis_text = st.session_state.analysis_response
+        analysis_text = get_session_text("analysis_response")
 
         # Replace any h2 tags or markdown headers with our custom styled headers
         if analysis_text:
-            # Replace markdown headers (## Header) with custom styled headers
-            import re
-            # Find all markdown headers and replace them with custom styled headers
-            analysis_text = re.sub(
-                r'## ([A-Z\s]+):?',
-                r'<h2 class="custom-header">\1</h2>',
-                analysis_text
-            )
-
-            # Replace any HTML h2 tags with our custom styled headers
-            analysis_text = re.sub(
-                r'<h2>([A-Z\s]+)</h2>',
-                r'<h2 class="custom-header">\1</h2>',
-                analysis_text
-            )
+            analysis_text = style_headers(analysis_text)
 
         # Display the processed analysis
         st.markdown(f'''
@@ -1111,38 +1095,38 @@ if 'analysis_response' in st.session_state:
                                      key="user_question")
 
         if user_question:
+            if st.session_state.get("traced_question") != user_question:
+                st.session_state.traced_question = user_question
+                tracing.set_action("chat")
             with st.spinner("Generating response..."):
-                chat_prompt = f"""
-                You are ResumeChecker, an expert in ATS (Applicant Tracking System) analysis.
-                Based on the resume and previous analysis, answer the following question with specific,
-                actionable advice. Be consistent in your responses and maintain the same evaluation criteria
-                used in the original analysis.
-
-                Question: {user_question}
-
-                Resume text: {st.session_state.pdf_text}
-                Job description: {st.session_state.job_description}
-                Previous analysis: {st.session_state.analysis_response}
-                """
-
-                chat_response = get_gemini_output(st.session_state.pdf_text, chat_prompt)
+                # The previous analysis is the first thing shortened if the prompt is too long
+                try:
+                    chat_prompt, truncated = fit_prompt(
+                        partial(build_chat_prompt, user_question),
+                        {
+                            "resume_text": canonicalize(get_session_text("pdf_text")),
+                            "job_description": canonicalize(get_session_text("job_description")),
+                            "previous_analysis": get_session_text("analysis_response"),
+                        },
+                        request_budget(st.session_state.tokens_used),
+                        ["previous_analysis", "job_description", "resume_text"]
+                    )
+                    warn_truncated(truncated)
+                    with profiling.profile("chat"), tracing.span("chat", cache="hit"):
+                        chat_response = get_gemini_output(fingerprint(chat_prompt), chat_prompt, "chat")
+                except TokenBudgetExceeded as e:
+                    st.error(str(e))
+                    chat_response = None
+                except Exception as e:
+                    # Gemini missed the chat SLO or is down: say so, with what a local check can tell
+                    print(f"Chat fell back to an estimate: {str(e)}")
+                    chat_response = estimate_chat_answer(get_session_text("pdf_text"), get_session_text("job_description"))
                 # Process the chat response to ensure consistent header styling
                 if chat_response:
-                    # Replace markdown headers (## Header) with custom styled headers
-                    chat_response = re.sub(
-                        r'## ([A-Z\s]+):?',
-                        r'<h2 class="custom-header">\1</h2>',
-                        chat_response
-                    )
+                    chat_response = style_headers(chat_response)
 
-                    # Replace any HTML h2 tags with our custom styled headers
-                    chat_response = re.sub(
-                        r'<h2>([A-Z\s]+)</h2>',
-                        r'<h2 class="custom-header">\1</h2>',
-                        chat_response
-                    )
-
-                st.markdown(f'<div class="results" style="width: 100%; overflow-wrap: break-word;">{chat_response}</div>', unsafe_allow_html=True)
+                if chat_response is not None:
+                    st.markdown(f'<div class="results" style="width: 100%; overflow-wrap: break-word;">{chat_response}</div>', unsafe_allow_html=True)
 
     # Right column - Editable resume with live updates
     with right_col:
@@ -1153,7 +1137,7 @@ if 'analysis_response' in st.session_state:
         st.markdown('<div class="resume-editor" style="width: 100%;">', unsafe_allow_html=True)
 
         # Get the current value from session state, defaulting to empty string if None
-        current_resume_text = st.session_state.edited_resume if st.session_state.edited_resume is not None else ""
+        current_resume_text = get_session_text("edited_resume") or ""
 
         # Add a placeholder message if no resume is uploaded yet
         placeholder = "Upload a resume to edit it here, or paste your resume text directly."
@@ -1167,81 +1151,49 @@ if 'analysis_response' in st.session_state:
         st.markdown('</div>', unsafe_allow_html=True)
 
         # Update the editable resume in session state
-        st.session_state.edited_resume = edited_resume
+        set_session_text("edited_resume", edited_resume)
 
         # Button to analyze the updated resume
         if st.button("Update Score"):
+            tracing.set_action("update_score")
             if edited_resume:
+                job_description = get_session_text("job_description")
+                pdf_text = get_session_text("pdf_text")
                 # Check if we have a job description
-                if st.session_state.job_description is None or st.session_state.job_description == "":
+                if job_description is None or job_description == "":
                     st.error("Please enter a job description or select a template before updating the score.")
                 # Check if we have an original resume to compare against
-                elif st.session_state.pdf_text is None:
+                elif pdf_text is None:
                     # This is a direct entry without uploading a PDF first
                     with st.spinner("Analyzing your resume..."):
                         try:
                             # Store the manually entered resume text
-                            st.session_state.pdf_text = edited_resume
-
-                            # Get selected ATS system information
-                            ats_model = st.session_state.selected_ats
-                            selected_ats = ATS_SYSTEMS[ats_model]
-
-                            # Use the same prompt as the initial analysis
-                            prompt = f"""
-                            You are ResumeChecker, an expert in ATS (Applicant Tracking System) analysis. Your task is to provide a comprehensive evaluation of the resume against the job description, specifically for the {ats_model} ATS system, and help the candidate pass the ATS screening process.
-
-                            ABOUT THE {ats_model.upper()} ATS SYSTEM:
-                            {selected_ats["description"]}
-
-                            KEY FEATURES:
-                            {', '.join(selected_ats["key_features"])}
-
-                            FORMAT PREFERENCES:
-                            {selected_ats["format_preferences"]}
-
-                            PARSING QUIRKS:
-                            {selected_ats["parsing_quirks"]}
-
-                            ANALYSIS FORMAT:
-                            1. <h2>JOB DESCRIPTION ANALYSIS</h2>
-                               - Summarize the key requirements and qualifications from the job description
-                               - List the most important keywords and phrases the ATS will scan for
-                               - Identify any unique or specific requirements that stand out
-
-                            2. <h2>ATS SCORE</h2> Provide a single, consistent score out of 100 with one decimal place precision
-
-                            3. <h2>KEY FINDINGS</h2>
-                               - Identify the most important keywords found and missing in the resume
-                               - Evaluate the resume structure and format for {ats_model} ATS compatibility
-                               - Assess the overall match between the resume and job description
-
-                            4. <h2>{ats_model.upper()} SPECIFIC RECOMMENDATIONS</h2>
-                               - Provide specific advice for optimizing this resume for the {ats_model} ATS system
-                               - Highlight any particular strengths or weaknesses for this specific ATS
-                               - Explain how this specific ATS might evaluate certain aspects of the resume
-
-                            5. <h2>OPTIMIZATION SUGGESTIONS</h2>
-                               - List 5 specific, actionable recommendations to improve the resume for this job
-                               - Suggest exact keywords to add and where to place them
-                               - Recommend format changes to improve ATS readability
-                               - Provide specific phrasing suggestions that align with the job description
-
-                            Resume text: {edited_resume}
-                            Job description: {st.session_state.job_description}
-                            Job level: {st.session_state.get('job_level', '')}
-                            Job role: {st.session_state.get('job_role', '')}
-                            """
-
-                            response = get_gemini_output(edited_resume, prompt)
+                            set_session_text("pdf_text", edited_resume)
+                            set_session_text("analyzed_resume", edited_resume)
+                            st.session_state.pending_refresh = {}
+
+                            # Use the same analysis as the initial upload, without the extended sections
+                            response = get_resume_analysis(
+                                edited_resume,
+                                job_description,
+                                st.session_state.selected_ats,
+                                st.session_state.get('job_level', ''),
+                                st.session_state.get('job_role', ''),
+                                detailed=False
+                            )
 
                             # Extract ATS score from the analysis
                             original_score = extract_ats_score(response)
+                            if is_estimate(response):
+                                original_score = mark_estimate(original_score)
 
                             # Store in session state
-                            st.session_state.analysis_response = response
+                            set_session_text("analysis_response", response)
                             st.session_state.original_score = original_score
                             st.session_state.current_score = original_score
+                            st.session_state.resume_versions = []
+                            add_version(st.session_state.resume_versions, edited_resume, edited_resume,
+                                        original_score, st.session_state.analysis_response)
 
                             # Show success message
                             st.success(f"Your resume received an ATS Score of {original_score['display']}")
@@ -1251,39 +1203,137 @@ if 'analysis_response' in st.session_state:
 
                         except Exception as e:
                             st.error(f"An error occurred: {str(e)}")
-                # Check if the resume has actually been edited compared to the original
-                elif edited_resume != st.session_state.pdf_text:
+                # Check if the resume content has actually changed (whitespace, bullet or
+                # line-ending differences do not count)
+                elif fingerprint(edited_resume) != fingerprint(pdf_text):
                     with st.spinner("Updating score..."):
                         # Get updated ATS analysis using the selected ATS model and job details
-                        new_score = analyze_edited_resume(
-                            edited_resume,
-                            st.session_state.job_description,
-                            st.session_state.selected_ats,
-                            job_level=st.session_state.get('job_level', ''),
-                            job_role=st.session_state.get('job_role', '')
-                        )
-
-                        # Update the score in session state
-                        st.session_state.current_score = new_score
-
-                        # Show the exact score from analysis
-                        if st.session_state.original_score is not None:
-                            if new_score['value'] > st.session_state.original_score['value']:
-                                improvement = new_score['value'] - st.session_state.original_score['value']
-                                st.success(f"Your resume received an ATS Score of {new_score['display']} (improved by {improvement:.1f} points)")
-                            elif new_score['value'] < st.session_state.original_score['value']:
-                                decrease = st.session_state.original_score['value'] - new_score['value']
-                                st.error(f"Your resume received an ATS Score of {new_score['display']} (decreased by {decrease:.1f} points)")
+                        try:
+                            # A version scored before (e.g. after undoing an edit) reuses its stored score
+                            version = find_version(st.session_state.resume_versions, edited_resume)
+                            if version is not None:
+                                new_score = version["score"]
+                            else:
+                                new_score = score_edited_resume(
+                                    edited_resume,
+                                    job_description,
+                                    st.session_state.selected_ats,
+                                    job_level=st.session_state.get('job_level', ''),
+                                    job_role=st.session_state.get('job_role', '')
+                                )
+                                # Estimates and unreadable scores are not kept in the history
+                                if new_score['value'] > 0 and not new_score.get("estimate"):
+                                    add_version(st.session_state.resume_versions, pdf_text, edited_resume, new_score)
+
+                            # Update the score in session state
+                            st.session_state.current_score = new_score
+
+                            # Show the exact score from analysis
+                            if st.session_state.original_score is not None:
+                                if new_score['value'] > st.session_state.original_score['value']:
+                                    improvement = new_score['value'] - st.session_state.original_score['value']
+                                    st.success(f"Your resume received an ATS Score of {new_score['display']} (improved by {improvement:.1f} points)")
+                                elif new_score['value'] < st.session_state.original_score['value']:
+                                    decrease = st.session_state.original_score['value'] - new_score['value']
+                                    st.error(f"Your resume received an ATS Score of {new_score['display']} (decreased by {decrease:.1f} points)")
+                                else:
+                                    st.info(f"Your resume received an ATS Score of {new_score['display']} (unchanged)")
                             else:
-                                st.info(f"Your resume received an ATS Score of {new_score['display']} (unchanged)")
-                        else:
-                            st.success(f"Your resume received an ATS Score of {new_score['display']}")
+                                st.success(f"Your resume received an ATS Score of {new_score['display']}")
+                        except TokenBudgetExceeded as e:
+                            st.error(str(e))
                 else:
                     # No changes made, keep the original score
                     st.info("No changes detected in the resume. Score remains the same.")
             else:
                 st.error("Resume text cannot be empty.")
 
+        # Button to update the analysis report for the edited resume
+        # Only the sections changed since the last analysis are sent, and only the report sections they affect are rewritten
+        if st.button("Update Analysis", help="Re-analyze the sections you changed and update the report"):
+            tracing.set_action("update_analysis")
+            job_description = get_session_text("job_description")
+            analyzed_resume = get_session_text("analyzed_resume") or get_session_text("pdf_text")
+            if not edited_resume:
+                st.error("Resume text cannot be empty.")
+            elif not job_description:
+                st.error("Please enter a job description or select a template before updating the analysis.")
+            elif analyzed_resume is not None and fingerprint(edited_resume) == fingerprint(analyzed_resume):
+                st.info("No changes since the last analysis.")
+            else:
+                with st.spinner("Updating analysis..."):
+                    try:
+                        st.session_state.pending_refresh.pop("analysis", None)
+                        job_level = st.session_state.get('job_level', '')
+                        job_role = st.session_state.get('job_role', '')
+                        response = None
+                        if analyzed_resume is not None:
+                            response = get_delta_analysis(analyzed_resume, edited_resume, get_session_text("analysis_response"),
+                                                          job_description, st.session_state.selected_ats, job_level, job_role)
+                        if response is None:
+                            response = get_resume_analysis(edited_resume, job_description, st.session_state.selected_ats,
+                                                           job_level, job_role)
+
+                        score = extract_ats_score(response)
+                        if is_estimate(response):
+                            score = mark_estimate(score)
+                        set_session_text("analysis_response", response)
+                        set_session_text("analyzed_resume", edited_resume)
+                        st.session_state.current_score = score
+
+                        # A resume typed straight into the editor becomes the original
+                        pdf_text = get_session_text("pdf_text")
+                        if pdf_text is None:
+                            pdf_text = edited_resume
+                            set_session_text("pdf_text", pdf_text)
+                            st.session_state.original_score = score
+                            st.session_state.resume_versions = []
+                        if score['value'] > 0 and not score.get("estimate"):
+                            add_version(st.session_state.resume_versions, pdf_text, edited_resume, score,
+                                        st.session_state.analysis_response)
+                        st.rerun()
+                    except TokenBudgetExceeded as e:
+                        st.error(str(e))
+
+    # Score timeline of the edited versions, with the option to go back to any of them
+    with score_history:
+        # While an estimate is shown, Gemini is retried in the background
+        if st.session_state.pending_refresh:
+            st.info("Showing a local estimate while Gemini is slow or unavailable. The full result replaces it once Gemini answers.")
+            st.button("Check for Full Result")
+
+        versions = st.session_state.resume_versions
+        if len(versions) > 1:
+            st.markdown("### Score History")
+            st.line_chart(
+                {
+                    "Version": [version["number"] for version in versions],
+                    "ATS Score": [version["score"]["value"] for version in versions],
+                },
+                x="Version",
+                y="ATS Score",
+                height=200
+            )
+            selected_version = st.selectbox(
+                "Go back to a version",
+                range(len(versions)),
+                index=len(versions) - 1,
+                format_func=lambda i: version_label(versions[i])
+            )
+            if st.button("Restore Version"):
+                version = versions[selected_version]
+                # The stored score (and analysis, for the original) is reused without a model call
+                set_session_text("edited_resume", version_text(get_session_text("pdf_text"), version))
+                st.session_state.current_score = version["score"]
+                analysis = session_store.get(version.get("analysis"))
+                if analysis is not None:
+                    set_session_text("analysis_response", analysis)
+                    set_session_text("analyzed_resume", get_session_text("edited_resume"))
+                # Drop the editor's widget state so it shows the restored text
+                if "resume_editor" in st.session_state:
+                    del st.session_state["resume_editor"]
+                st.rerun()
+
 # Get current year and month
 current_date = datetime.now().strftime('%Y %B')
 
@@ -1329,5 +1379,9 @@ with col2:
 
 # Footer
 st.markdown("<div style='text-align: center; color: #b0b0b0; font-size: 12px; margin-top: 20px; padding: 10px; border-top: 1px solid #3d3d3d;'>Copyright " + current_date + " ATS-Checker | Created with Linux Community </div>", unsafe_allow_html=True)
+
+# Finish this rerun's profile and trace (a rerun cut short by st.rerun() is finished by the next one)
+profiling.end_rerun()
+tracing.end_rerun()
 # making
 #light way to use the app
@@ -0,0 +1,73 @@
+# ATS system information
+ATS_SYSTEMS = {
+    "Generic ATS": {
+        "description": "A standard ATS that uses keyword matching and basic resume parsing.",
+        "key_features": [
+            "Keyword matching",
+            "Basic resume parsing",
+            "Standard formatting requirements"
+        ],
+        "format_preferences": "Standard resume format with clear section headings (Summary, Experience, Skills, Education).",
+        "parsing_quirks": "May struggle with complex formatting, tables, and graphics."
+    },
+    "iCIMS": {
+        "description": "A comprehensive talent acquisition platform used by many large enterprises.",
+        "key_features": [
+            "Advanced keyword matching",
+            "Semantic search capabilities",
+            "Skills-based filtering"
+        ],
+        "format_preferences": "Clean formatting with standard section headers. Supports DOC, DOCX, PDF, RTF, and TXT formats.",
+        "parsing_quirks": "Better at parsing PDF files than some other systems. May have issues with headers/footers and complex tables."
+    },
+    "Greenhouse": {
+        "description": "A hiring software platform focused on structured hiring processes.",
+        "key_features": [
+            "Attribute-based candidate evaluation",
+            "Custom application questions",
+            "Collaborative hiring"
+        ],
+        "format_preferences": "Clean, simple formatting. Works well with standard chronological resumes.",
+        "parsing_quirks": "May miss information in non-standard sections. Handles PDF and Word documents well."
+    },
+    "Manatal": {
+        "description": "An AI-powered recruitment software with advanced candidate matching.",
+        "key_features": [
+            "AI-powered candidate matching",
+            "Social media enrichment",
+            "Multilingual support"
+        ],
+        "format_preferences": "Standard resume format with clear section delineation. Supports various file formats.",
+        "parsing_quirks": "AI capabilities help with understanding context, but may still struggle with highly creative formats."
+    },
+    "ClearCompany": {
+        "description": "A talent management platform with emphasis on company goals and culture fit.",
+        "key_features": [
+            "Goal alignment",
+            "Culture-based screening",
+            "Competency mapping"
+        ],
+        "format_preferences": "Traditional resume format with clear sections. Prefers chronological format.",
+        "parsing_quirks": "May prioritize experience descriptions that align with company values and goals."
+    },
+    "Bullhorn": {
+        "description": "A recruitment software popular with staffing and recruiting agencies.",
+        "key_features": [
+            "Candidate tracking",
+            "Resume parsing",
+            "Job matching"
+        ],
+        "format_preferences": "Standard resume formats. Handles various file types including PDF and Word.",
+        "parsing_quirks": "Strong at parsing contact information and work history, may struggle with skill categorization in non-standard formats."
+    },
+    "Transformify": {
+        "description": "A modern ATS with focus on diversity and inclusion in hiring.",
+        "key_features": [
+            "Blind recruitment options",
+            "Skills-based matching",
+            "Global talent pool"
+        ],
+        "format_preferences": "Clean, standard formatting. Supports skills-based and chronological formats.",
+        "parsing_quirks": "May place higher emphasis on skills and qualifications over chronological work history."
+    }
+}
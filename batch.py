@@ -0,0 +1,233 @@
+"""Batch screening of many resumes against one job description.
+
+Analyzes every resume in a folder with the same prompts as the app, as bulk traffic
+behind the interactive users (see scheduler.py). Results are streamed to CSV, JSON Lines
+and/or Parquet files as they finish (see export.py), and with --checkpoint an
+interrupted run picks up from the last exported pair.
+Near-duplicate resumes (re-sent with small edits or reformatted) are detected with
+MinHash/LSH and reuse the analysis of the first copy for the same job description and
+ATS, or are only flagged, instead of costing another model call.
+
+Usage: python batch.py resumes/ --job-description jd.txt --ats "Generic ATS" --output results.csv --checkpoint run.ckpt
+"""
+import argparse
+import atexit
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import extractors
+from ats_systems import ATS_SYSTEMS
+from corpus import Corpus, file_digest
+from dedupe import DEDUPE_THRESHOLD, MinHashIndex, minhash
+from export import EXPORT_BUFFER_ROWS, Checkpoint, ResultExporter
+from model_client import call_model, generate_parallel, model_for
+from prompts import build_analysis_prompts
+from report import extract_ats_score, extract_issues, merge_reports
+from resume_text import canonicalize, fingerprint
+from token_budget import request_budget
+
+# Function to analyze one prepared resume (from extractors.extract_resume), in parts if it is long
+# Returns the analysis report; calls run in the scheduler's bulk class
+def analyze_resume(model, extracted, job_description, ats_model, job_level="", job_role=""):
+    prompts, weights, _ = build_analysis_prompts(extracted, canonicalize(job_description), ats_model, job_level, job_role,
+                                                 budget=request_budget())
+    if weights is None:
+        return call_model(model, prompts, "analysis", priority="bulk").text
+    reports = generate_parallel(model, prompts, priority="bulk")
+    scores = [extract_ats_score(report)["value"] for report in reports]
+    return merge_reports(reports, scores, weights)
+
+
+# Function to get the dedupe namespace for a screening setup: duplicates only reuse
+# analyses made for the same job description, ATS, job level and job role
+def screening_context(job_description, ats_model, job_level="", job_role=""):
+    return fingerprint("\n".join([job_description, ats_model, job_level, job_role]))
+
+
+# Function to get the checkpoint key of a (resume, screening setup) pair
+def pair_key(path, context):
+    return f"{context}\t{os.path.abspath(path)}"
+
+
+# Function to open the store of analyses the near-duplicate index refers to
+# Next to an index file it is kept for later runs; without one it is temporary and removed at exit
+def open_reports(index_path=None):
+    if index_path:
+        return Corpus(f"{index_path}.reports")
+    folder = tempfile.mkdtemp(prefix="ats_batch_reports_")
+    atexit.register(shutil.rmtree, folder, ignore_errors=True)
+    return Corpus(os.path.join(folder, "reports"))
+
+
+# Function to screen resume files, yielding (pair key, result dict) in input order as results finish
+# on_duplicate is "reuse" (copy the first copy's score and report) or "flag" (no score).
+# At most workers * 2 resumes are extracted or analyzed ahead of the next result, so memory
+# stays bounded however many files there are. Pairs in skip (e.g. a checkpoint) are left out.
+# With a corpus, text extracted in earlier runs is read from it instead of the files.
+# The index only keeps each analysis's score and key; the report itself is stored in reports
+# (see open_reports), which must be the store the index was filled with
+def screen(paths, job_description, ats_model, job_level="", job_role="", workers=4,
+           index=None, on_duplicate="reuse", model=None, corpus=None, skip=(), reports=None):
+    model = model or model_for("analysis")
+    index = index if index is not None else MinHashIndex()
+    reports = reports if reports is not None else open_reports()
+    context = screening_context(job_description, ats_model, job_level, job_role)
+    lookahead = workers * 2
+    paths = [path for path in paths if pair_key(path, context) not in skip]
+
+    def start_extraction(path):
+        with open(path, "rb") as f:
+            return extractors.submit(f.read(), corpus)
+
+    def finish(path, result, payload, future):
+        # The source of a duplicate is always earlier in the queue, so it has finished already
+        if future is not None:
+            try:
+                report = future.result()
+            except Exception as e:
+                index.remove(payload.pop("key"))
+                payload["error"] = str(e)
+                result.update(status="error", error=payload["error"])
+            else:
+                reports.add(file_digest(payload["key"].encode("utf-8")), report)
+                payload["score"] = extract_ats_score(report)["value"]
+                result.update(score=payload["score"], analysis=report, issues=extract_issues(report))
+        elif payload is not None:
+            if "score" not in payload:
+                result.update(status="error", error=payload.get("error", "The analysis this resume duplicates failed"))
+            elif result["status"] != "flagged":
+                report = reports.get(file_digest(payload["key"].encode("utf-8")))
+                if report is None:
+                    result.update(status="error", error="The analysis this resume duplicates is no longer stored")
+                else:
+                    result.update(score=payload["score"], analysis=report, issues=extract_issues(report))
+        return pair_key(path, context), result
+
+    extractions = deque()
+    pending = deque()
+    next_path = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for path in paths:
+            while next_path < len(paths) and len(extractions) < lookahead:
+                extractions.append(start_extraction(paths[next_path]))
+                next_path += 1
+            extraction = extractions.popleft()
+
+            result = {"file": path, "status": "", "score": "", "duplicate_of": "", "similarity": "",
+                      "fingerprint": "", "error": "", "issues": [], "analysis": ""}
+            try:
+                extracted = extraction.result()
+            except Exception as e:
+                result.update(status="error", error=f"Could not read file: {e}")
+                pending.append((path, result, None, None))
+            else:
+                result["fingerprint"] = extracted["fingerprint"]
+                signature = minhash(extracted["canonical"])
+                match = index.query(signature, namespace=context)
+                if match is not None:
+                    _, similarity, payload = match
+                    result.update(status="duplicate" if on_duplicate == "reuse" else "flagged",
+                                  duplicate_of=payload["file"], similarity=round(similarity, 3))
+                    pending.append((path, result, payload, None))
+                else:
+                    # Registered before the analysis finishes, so later copies in this run are caught too
+                    # (the key also finds the report in the report store for duplicates and later runs)
+                    key = f"{context[:16]}:{extracted['fingerprint']}"
+                    payload = {"file": path, "key": key}
+                    index.add(key, signature, payload, namespace=context)
+                    future = executor.submit(analyze_resume, model, extracted, job_description,
+                                             ats_model, job_level, job_role)
+                    result["status"] = "analyzed"
+                    pending.append((path, result, payload, future))
+
+            while len(pending) >= lookahead:
+                yield finish(*pending.popleft())
+
+        while pending:
+            yield finish(*pending.popleft())
+
+
+# Function to save the near-duplicate index for later runs
+# Only finished analyses are saved: an entry still waiting for its report (the run was
+# interrupted) would otherwise match its own resume on the next run and be reported as a
+# failed duplicate instead of being analyzed again
+def save_index(index, path):
+    index.save(path, keep=lambda payload: payload is not None and "score" in payload)
+
+
+# Function to list the resume files in a folder (every type extractors.py can read)
+def find_resumes(folder):
+    paths = []
+    for extension in extractors.SUPPORTED_EXTENSIONS:
+        paths += glob.glob(os.path.join(folder, f"*.{extension}"))
+    return sorted(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen a folder of resumes against one job description")
+    parser.add_argument("resumes", help="Folder with the resumes (PDF, DOCX, RTF or TXT)")
+    parser.add_argument("--job-description", required=True, help="Text file with the job description")
+    parser.add_argument("--ats", default="Generic ATS", choices=list(ATS_SYSTEMS), help="ATS system to focus on")
+    parser.add_argument("--job-level", default="", help="Job level, as in the app")
+    parser.add_argument("--job-role", default="", help="Job role, as in the app")
+    parser.add_argument("--output", action="append",
+                        help="Results file: .csv, .jsonl or .parquet (repeat for several; default screening_results.csv)")
+    parser.add_argument("--checkpoint", help="Checkpoint file; a run with the same checkpoint skips the pairs already exported")
+    parser.add_argument("--buffer-rows", type=int, default=EXPORT_BUFFER_ROWS, help="Results held in memory between writes")
+    parser.add_argument("--workers", type=int, default=4, help="Resumes analyzed at once")
+    parser.add_argument("--dedupe-threshold", type=float, default=DEDUPE_THRESHOLD,
+                        help="Similarity at or above which resumes count as near-duplicates")
+    parser.add_argument("--on-duplicate", choices=["reuse", "flag"], default="reuse",
+                        help="Reuse the first copy's analysis, or only flag near-duplicates")
+    parser.add_argument("--index", help="JSON file to load and save the near-duplicate index, so later runs reuse analyses "
+                                        "(the analyses are kept next to it in INDEX.reports.dat/.idx)")
+    parser.add_argument("--corpus", help="Corpus of extracted text (see corpus.py) to read from and add to")
+    args = parser.parse_args()
+
+    with open(args.job_description, encoding="utf-8") as f:
+        job_description = f.read()
+    paths = find_resumes(args.resumes)
+    if not paths:
+        print(f"No resumes found in {args.resumes}")
+        return 1
+
+    if args.index and os.path.exists(args.index):
+        index = MinHashIndex.load(args.index, args.dedupe_threshold)
+    else:
+        index = MinHashIndex(args.dedupe_threshold)
+
+    corpus = Corpus(args.corpus) if args.corpus else None
+    reports = open_reports(args.index)
+    outputs = args.output or ["screening_results.csv"]
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    if checkpoint is not None and len(checkpoint):
+        print(f"Resuming: {len(checkpoint)} pairs already done")
+    exporter = ResultExporter(outputs, checkpoint, args.buffer_rows)
+
+    started = time.monotonic()
+    try:
+        for key, result in screen(paths, job_description, args.ats, args.job_level, args.job_role, args.workers,
+                                  index, args.on_duplicate, corpus=corpus, skip=checkpoint or (), reports=reports):
+            # Failed pairs are not checkpointed, so a resumed run tries them again
+            exporter.add(result, key if result["status"] != "error" else None)
+    finally:
+        exporter.close()
+        if args.index:
+            save_index(index, args.index)
+    wall_time = time.monotonic() - started
+
+    counts = exporter.counts
+    print(f"Screened {sum(counts.values())} resumes in {wall_time:.1f}s: "
+          + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    print(f"Results written to {', '.join(outputs)}")
+    return 1 if counts.get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Micro-benchmark of the text extraction backends.
+
+Runs every installed backend (see extractors.BACKENDS) on sample resumes of each
+document type, times it, and rates how well it extracted the text: against
+NAME.expected.txt when a sample has one next to it, otherwise against the words most
+backends agree on. For each type, the fastest backend whose quality meets
+--min-quality is saved to the choices file, which extractors.py reads at startup.
+
+Usage: python bench_extractors.py samples/ --repeat 5 --min-quality 0.9
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+from extractors import (BACKENDS, EXTRACTOR_CHOICES, SUPPORTED_EXTENSIONS, UnsupportedDocument,
+                        backend_available, detect_type)
+from heuristics import words
+
+
+# Function to rate extracted text against a reference word count (multiset Jaccard, 0-1)
+def quality(text_words, reference):
+    union = sum((text_words | reference).values())
+    return sum((text_words & reference).values()) / union if union else 1.0
+
+
+# Function to get the words most backends agree on: each word's median count across outputs
+def consensus(outputs):
+    counts = [Counter(output) for output in outputs]
+    vocabulary = set().union(*counts)
+    return Counter({word: round(statistics.median(count[word] for count in counts)) for word in vocabulary})
+
+
+# Function to time and rate every available backend on the samples of one document type
+# Returns {backend: {"median_ms", "quality", "errors"}}
+def bench_type(document_type, samples, repeat):
+    backends = [name for name, (kind, _) in BACKENDS.items() if kind == document_type and backend_available(name)]
+    times = {name: [] for name in backends}
+    errors = Counter()
+    outputs = {}  # (sample, backend) -> words
+    for path, data in samples:
+        for name in backends:
+            extract = BACKENDS[name][1]
+            try:
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    text = extract(data)
+                    times[name].append(time.perf_counter() - started)
+                outputs[(path, name)] = words(text)
+            except Exception as e:
+                print(f"  {name} failed on {os.path.basename(path)}: {e}")
+                errors[name] += 1
+                outputs[(path, name)] = []
+
+    ratings = {name: [] for name in backends}
+    for path, _ in samples:
+        expected_path = f"{os.path.splitext(path)[0]}.expected.txt"
+        if os.path.exists(expected_path):
+            with open(expected_path, encoding="utf-8") as f:
+                reference = Counter(words(f.read()))
+        else:
+            reference = consensus([outputs[(path, name)] for name in backends])
+        for name in backends:
+            ratings[name].append(quality(Counter(outputs[(path, name)]), reference))
+
+    return {
+        name: {
+            "median_ms": round(statistics.median(times[name]) * 1000, 3) if times[name] else None,
+            "quality": round(statistics.mean(ratings[name]), 3) if ratings[name] else 0.0,
+            "errors": errors[name],
+        }
+        for name in backends
+    }
+
+
+# Function to choose the fastest backend meeting the quality threshold (else the best quality)
+def choose_backend(results, min_quality):
+    usable = {name: result for name, result in results.items() if result["median_ms"] is not None and not result["errors"]}
+    good = [name for name, result in usable.items() if result["quality"] >= min_quality]
+    if good:
+        return min(good, key=lambda name: usable[name]["median_ms"])
+    if usable:
+        return max(usable, key=lambda name: (usable[name]["quality"], -usable[name]["median_ms"]))
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text extraction backends and pick one per document type")
+    parser.add_argument("samples", help="Folder with sample resumes (PDF, DOCX, RTF, TXT)")
+    parser.add_argument("--repeat", type=int, default=5, help="Extractions per sample and backend")
+    parser.add_argument("--min-quality", type=float, default=0.9,
+                        help="Lowest acceptable quality (0-1) for a backend to be chosen")
+    parser.add_argument("--output", default=EXTRACTOR_CHOICES, help="Where to save the chosen backends")
+    args = parser.parse_args()
+
+    samples = {}
+    for extension in SUPPORTED_EXTENSIONS:
+        for path in sorted(glob.glob(os.path.join(args.samples, f"*.{extension}"))):
+            if path.endswith(".expected.txt"):
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            try:
+                samples.setdefault(detect_type(data), []).append((path, data))
+            except UnsupportedDocument as e:
+                print(f"Skipping {path}: {e}")
+    if not samples:
+        print(f"No sample resumes found in {args.samples}")
+        return 1
+
+    choices = {}
+    for document_type, type_samples in sorted(samples.items()):
+        print(f"{document_type.upper()}: {len(type_samples)} samples x {args.repeat} runs")
+        results = bench_type(document_type, type_samples, args.repeat)
+        backend = choose_backend(results, args.min_quality)
+        for name, result in sorted(results.items(), key=lambda item: item[1]["median_ms"] or float("inf")):
+            marker = "*" if name == backend else " "
+            print(f"  {marker} {name:<10} {result['median_ms']} ms median, quality {result['quality']:.3f}"
+                  + (f", {result['errors']} errors" if result["errors"] else ""))
+        if backend is not None:
+            choices[document_type] = {"backend": backend, "results": results}
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(choices, f, indent=2)
+    print(f"Chosen backends saved to {args.output}: "
+          + ", ".join(f"{kind} -> {choice['backend']}" for kind, choice in sorted(choices.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""Benchmark of candidate models for each model tier.
+
+Sends the analysis, score and chat prompts for sample resumes to every candidate
+model, times each call and rates how well its answers agree with the reference
+model's (normally the largest, slowest one): scores must be within --max-score-diff
+points, analyses must also cover the reference report's sections, and chat answers
+are compared by the words they share. For each call type the first candidate (list
+them cheapest first) whose agreement meets the threshold is saved to the tiers file,
+which model_client.py reads at startup.
+
+Usage: python bench_tiers.py samples/ --job-description jd.txt \
+           --models gemini-1.5-flash-8b gemini-1.5-flash gemini-1.5-pro
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+from ats_systems import ATS_SYSTEMS
+from extractors import SUPPORTED_EXTENSIONS, UnsupportedDocument, extract_resume
+from heuristics import STOPWORDS, words
+from model_client import DEFAULT_TIERS, MODEL_TIERS, get_model, tier_for
+from prompts import build_analysis_prompt, build_chat_prompt, build_score_prompt
+from report import extract_ats_score, split_report
+from resume_text import canonicalize
+
+# Questions asked in the chat benchmark, after an analysis by the reference model
+CHAT_QUESTIONS = [
+    "Which missing skills matter most for this job?",
+    "How can I make my experience section stronger?",
+]
+
+
+# Function to build the prompts of one call type for one resume
+# Chat prompts need an analysis to talk about, so they use the reference model's
+def build_prompts(call_type, resume_text, job_description, ats_model, reference_analysis=""):
+    if call_type == "score":
+        return [build_score_prompt(resume_text, job_description, ats_model)]
+    if call_type == "chat":
+        return [build_chat_prompt(question, resume_text, job_description, reference_analysis)
+                for question in CHAT_QUESTIONS]
+    return [build_analysis_prompt(resume_text, job_description, ats_model)]
+
+
+# Function to rate one answer against the reference model's answer to the same prompt (0-1)
+def agreement(call_type, text, reference, max_score_diff):
+    if call_type == "chat":
+        text_words = set(words(text)) - STOPWORDS
+        reference_words = set(words(reference)) - STOPWORDS
+        union = text_words | reference_words
+        return len(text_words & reference_words) / len(union) if union else 1.0
+
+    score = extract_ats_score(text.strip())["value"]
+    reference_score = extract_ats_score(reference.strip())["value"]
+    if score <= 0 or abs(score - reference_score) > max_score_diff:
+        return 0.0
+    if call_type == "score":
+        return 1.0
+    # An analysis with the right score still has to cover the sections the reference wrote
+    reference_titles = {title for title, _ in split_report(reference)}
+    titles = {title for title, _ in split_report(text)}
+    return len(titles & reference_titles) / len(reference_titles) if reference_titles else 1.0
+
+
+# Function to time and rate every candidate model on the prompts of one call type
+# Returns {model: {"median_ms", "agreement", "errors"}}
+def bench_call_type(call_type, models, reference, prompts, repeat, max_score_diff):
+    generation_config = tier_for(call_type)["generation_config"]
+    times = {name: [] for name in models}
+    errors = Counter()
+    answers = {}  # (prompt number, model) -> text
+    for number, prompt in enumerate(prompts):
+        for name in models:
+            model = get_model(name, generation_config)
+            try:
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    text = model.generate_content([prompt]).text
+                    times[name].append(time.perf_counter() - started)
+                answers[(number, name)] = text
+            except Exception as e:
+                print(f"  {name} failed on prompt {number + 1}: {e}")
+                errors[name] += 1
+
+    ratings = {name: [] for name in models}
+    for number in range(len(prompts)):
+        if (number, reference) not in answers:
+            continue
+        for name in models:
+            text = answers.get((number, name))
+            ratings[name].append(0.0 if text is None else
+                                 agreement(call_type, text, answers[(number, reference)], max_score_diff))
+
+    return {
+        name: {
+            "median_ms": round(statistics.median(times[name]) * 1000, 1) if times[name] else None,
+            "agreement": round(statistics.mean(ratings[name]), 3) if ratings[name] else 0.0,
+            "errors": errors[name],
+        }
+        for name in models
+    }
+
+
+# Function to choose the first (cheapest) model meeting the agreement threshold, else the reference
+def choose_model(results, models, reference, min_agreement):
+    for name in models:
+        result = results[name]
+        if result["median_ms"] is not None and not result["errors"] and result["agreement"] >= min_agreement:
+            return name
+    return reference
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark candidate models and pick one per call type")
+    parser.add_argument("samples", help="Folder with sample resumes (PDF, DOCX, RTF, TXT)")
+    parser.add_argument("--job-description", required=True, help="Text file with the job description to screen against")
+    parser.add_argument("--models", nargs="+", required=True, help="Candidate models, cheapest first")
+    parser.add_argument("--reference", help="Model whose answers count as correct (default: the last candidate)")
+    parser.add_argument("--call-types", nargs="+", default=list(DEFAULT_TIERS), choices=list(DEFAULT_TIERS),
+                        help="Call types to benchmark")
+    parser.add_argument("--ats", default="Generic ATS", choices=list(ATS_SYSTEMS), help="ATS model used in the prompts")
+    parser.add_argument("--repeat", type=int, default=1, help="Calls per prompt and model")
+    parser.add_argument("--max-score-diff", type=float, default=3,
+                        help="Most points a score may differ from the reference's and still agree")
+    parser.add_argument("--min-agreement", type=float, default=0.8,
+                        help="Lowest acceptable agreement (0-1) for analysis and score calls")
+    parser.add_argument("--min-chat-agreement", type=float, default=0.5,
+                        help="Lowest acceptable agreement (0-1) for chat answers, which are worded freely")
+    parser.add_argument("--output", default=MODEL_TIERS, help="Where to save the chosen tiers")
+    args = parser.parse_args()
+
+    reference = args.reference or args.models[-1]
+    models = list(dict.fromkeys(args.models + [reference]))
+    with open(args.job_description, encoding="utf-8") as f:
+        job_description = canonicalize(f.read())
+
+    resumes = []
+    for extension in SUPPORTED_EXTENSIONS:
+        for path in sorted(glob.glob(os.path.join(args.samples, f"*.{extension}"))):
+            if path.endswith(".expected.txt"):
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            try:
+                resumes.append(extract_resume(data)["canonical"])
+            except (UnsupportedDocument, ValueError) as e:
+                print(f"Skipping {path}: {e}")
+    if not resumes:
+        print(f"No sample resumes found in {args.samples}")
+        return 1
+
+    reference_analyses = [""] * len(resumes)
+    if "chat" in args.call_types:
+        analysis_model = get_model(reference, tier_for("analysis")["generation_config"])
+        reference_analyses = [analysis_model.generate_content([prompt]).text
+                              for resume_text in resumes
+                              for prompt in build_prompts("analysis", resume_text, job_description, args.ats)]
+
+    tiers = {}
+    for call_type in args.call_types:
+        prompts = [prompt for resume_text, analysis in zip(resumes, reference_analyses)
+                   for prompt in build_prompts(call_type, resume_text, job_description, args.ats, analysis)]
+        print(f"{call_type.upper()}: {len(prompts)} prompts x {args.repeat} runs, reference {reference}")
+        results = bench_call_type(call_type, models, reference, prompts, args.repeat, args.max_score_diff)
+        min_agreement = args.min_chat_agreement if call_type == "chat" else args.min_agreement
+        model = choose_model(results, models, reference, min_agreement)
+        for name in models:
+            result = results[name]
+            marker = "*" if name == model else " "
+            print(f"  {marker} {name:<24} {result['median_ms']} ms median, agreement {result['agreement']:.3f}"
+                  + (f", {result['errors']} errors" if result["errors"] else ""))
+        tiers[call_type] = {"model": model, "generation_config": tier_for(call_type)["generation_config"],
+                            "results": results}
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(tiers, f, indent=2)
+    print(f"Chosen tiers saved to {args.output}: "
+          + ", ".join(f"{call_type} -> {tier['model']}" for call_type, tier in tiers.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
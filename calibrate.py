@@ -0,0 +1,173 @@
+"""Calibration of the local score estimate against the model's scores.
+
+Runs heuristics.estimate_score over a labelled set of resume / job description / ATS
+triples and compares it to the model's score for each, parsed with extract_ats_score
+from responses recorded in the fixture store (see MODEL_BACKEND=record), so it needs
+no network access. It reports the mean absolute error, the Spearman rank correlation
+and the bias of the estimate, overall and per ATS, and saves per-ATS thresholds: the
+bias to correct by, the error the corrected estimate stays within for --coverage of
+resumes, and whether that is within --tolerance points, i.e. whether the local score
+can be served without calling the model.
+
+The labels file has one JSON object per line; paths are relative to the file:
+    {"resume": "resumes/a.pdf", "job_description": "jds/backend.txt", "ats": "Greenhouse"}
+"job_level" and "job_role" are optional, and a "score" given by hand is used instead
+of the recorded response.
+
+Usage: python calibrate.py labels.jsonl --tolerance 5 --coverage 0.9
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+from functools import partial
+
+from batch import analyze_resume
+from extractors import UnsupportedDocument, extract_resume
+from heuristics import estimate_score
+from model_client import FIXTURE_DIR, FixtureNotFound, ReplayModel, tier_for
+from prompts import build_score_prompt
+from report import extract_ats_score
+from resume_text import canonicalize
+from token_budget import fit_prompt, request_budget
+
+# ATS systems with fewer labelled resumes than this are never served the local score
+MIN_SAMPLES = 10
+
+
+# Function to get the model's score for a triple from the fixture store
+# The recorded score prompt is tried first, then the recorded analysis (as batch screening builds it)
+# Raises FixtureNotFound if neither was recorded
+def recorded_score(resume, job_description, ats_model, job_level, job_role, fixture_dir):
+    build = partial(build_score_prompt, ats_model=ats_model, job_level=job_level, job_role=job_role)
+    prompt, _ = fit_prompt(build, {"resume_text": resume["canonical"], "job_description": job_description},
+                           request_budget(), ["job_description", "resume_text"])
+    try:
+        model = ReplayModel(tier_for("score")["model"], fixture_dir, latency=0)
+        return extract_ats_score(model.generate_content([prompt]).text.strip())["value"]
+    except FixtureNotFound:
+        model = ReplayModel(tier_for("analysis")["model"], fixture_dir, latency=0)
+        return extract_ats_score(analyze_resume(model, resume, job_description, ats_model, job_level, job_role))["value"]
+
+
+# Function to get the rank of each value, ties sharing their average rank
+def ranks(values):
+    order = sorted(range(len(values)), key=lambda index: values[index])
+    result = [0.0] * len(values)
+    start = 0
+    while start < len(order):
+        end = start
+        while end + 1 < len(order) and values[order[end + 1]] == values[order[start]]:
+            end += 1
+        for position in range(start, end + 1):
+            result[order[position]] = (start + end) / 2 + 1
+        start = end + 1
+    return result
+
+
+# Function to get the Spearman rank correlation of two lists (None if either is constant)
+def spearman(first, second):
+    if len(first) < 2:
+        return None
+    first_ranks, second_ranks = ranks(first), ranks(second)
+    first_mean, second_mean = statistics.mean(first_ranks), statistics.mean(second_ranks)
+    covariance = sum((a - first_mean) * (b - second_mean) for a, b in zip(first_ranks, second_ranks))
+    spread = math.sqrt(sum((a - first_mean) ** 2 for a in first_ranks) * sum((b - second_mean) ** 2 for b in second_ranks))
+    return covariance / spread if spread else None
+
+
+# Function to get the value that the given fraction of a list stays within (nearest rank)
+def quantile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+# Function to compare estimates to model scores
+# Returns the error, correlation and bias of the estimate, and its error once the bias is corrected
+def compare(pairs, coverage):
+    errors = [estimate - score for estimate, score in pairs]
+    bias = statistics.mean(errors)
+    correlation = spearman([estimate for estimate, _ in pairs], [score for _, score in pairs])
+    return {
+        "count": len(pairs),
+        "mae": round(statistics.mean(abs(error) for error in errors), 2),
+        "spearman": None if correlation is None else round(correlation, 3),
+        "bias": round(bias, 2),
+        "corrected_error": round(quantile([abs(error - bias) for error in errors], coverage), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare local score estimates with recorded model scores")
+    parser.add_argument("labels", help="JSON lines file of resume, job_description and ats triples")
+    parser.add_argument("--fixture-dir", default=FIXTURE_DIR, help="Fixture store with the recorded model responses")
+    parser.add_argument("--tolerance", type=float, default=5,
+                        help="Most points a corrected estimate may be off for it to be served instead of the model's score")
+    parser.add_argument("--coverage", type=float, default=0.9,
+                        help="Fraction of resumes whose corrected estimate must be within the tolerance")
+    parser.add_argument("--min-samples", type=int, default=MIN_SAMPLES,
+                        help="Fewest labelled resumes an ATS needs for thresholds of its own")
+    parser.add_argument("--output", default="calibration.json", help="Where to save the thresholds")
+    args = parser.parse_args()
+
+    base = os.path.dirname(os.path.abspath(args.labels))
+    pairs = {}  # ATS -> [(estimate, model score)]
+    skipped = 0
+    with open(args.labels, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                label = json.loads(line)
+                with open(os.path.join(base, label["resume"]), "rb") as resume_file:
+                    resume = extract_resume(resume_file.read())
+                with open(os.path.join(base, label["job_description"]), encoding="utf-8") as jd_file:
+                    job_description = canonicalize(jd_file.read())
+                ats_model = label.get("ats", "Generic ATS")
+                if label.get("score") is not None:
+                    score = float(label["score"])
+                else:
+                    score = recorded_score(resume, job_description, ats_model, label.get("job_level", ""),
+                                           label.get("job_role", ""), args.fixture_dir)
+            except (OSError, ValueError, KeyError, UnsupportedDocument, FixtureNotFound) as e:
+                print(f"Skipping line {number}: {type(e).__name__}: {e}")
+                skipped += 1
+                continue
+            if score <= 0:
+                print(f"Skipping line {number}: the model's response had no score")
+                skipped += 1
+                continue
+            estimate = estimate_score(resume["canonical"], job_description)["value"]
+            pairs.setdefault(ats_model, []).append((estimate, score))
+
+    everything = [pair for ats_pairs in pairs.values() for pair in ats_pairs]
+    if not everything:
+        print(f"No usable labels in {args.labels}")
+        return 1
+
+    overall = compare(everything, args.coverage)
+    overall["serve_local"] = overall["corrected_error"] <= args.tolerance
+    calibration = {"tolerance": args.tolerance, "coverage": args.coverage, "all": overall, "ats": {}}
+    print(f"{len(everything)} resumes compared, {skipped} skipped")
+    print(f"  {'ATS':<16} {'count':>5} {'MAE':>6} {'Spearman':>8} {'bias':>6} {'error':>6}  serve local")
+    for ats_model, ats_pairs in sorted(pairs.items()) + [("all", everything)]:
+        result = overall if ats_model == "all" else compare(ats_pairs, args.coverage)
+        if ats_model != "all":
+            # Too few resumes to trust the estimate for this ATS, so its score is always requested
+            result["serve_local"] = (len(ats_pairs) >= args.min_samples
+                                     and result["corrected_error"] <= args.tolerance)
+            calibration["ats"][ats_model] = result
+        spearman_text = "-" if result["spearman"] is None else f"{result['spearman']:.3f}"
+        print(f"  {ats_model:<16} {result['count']:>5} {result['mae']:>6} {spearman_text:>8} {result['bias']:>+6} "
+              f"{result['corrected_error']:>6}  {'yes' if result['serve_local'] else 'no'}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(calibration, f, indent=2)
+    print(f"Thresholds saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
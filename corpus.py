@@ -0,0 +1,181 @@
+"""Append-only, memory-mapped store of extracted resume text.
+
+A corpus is two files: PATH.dat holds the UTF-8 texts back to back and PATH.idx holds
+one fixed-size record per text (sha256 of the source file, offset, length). Opening a
+corpus only reads the index; texts are sliced out of the memory-mapped data file when
+they are used, so processes reading the same corpus share the page cache instead of
+each keeping its own copy of every text.
+
+Usage: python corpus.py add resumes/ --corpus resumes_corpus
+       python corpus.py info --corpus resumes_corpus
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within one process
+    fcntl = None
+
+_RECORD = struct.Struct("<32sQQ")
+
+
+# Function to get the key a source file is stored under (sha256 of its bytes)
+def file_digest(data):
+    return hashlib.sha256(data).digest()
+
+
+class Corpus:
+    """Append-only text store with an offset index keyed by file hash"""
+
+    def __init__(self, path):
+        self.data_path = f"{path}.dat"
+        self.index_path = f"{path}.idx"
+        for file_path in (self.data_path, self.index_path):
+            if not os.path.exists(file_path):
+                open(file_path, "ab").close()
+        self._lock = threading.Lock()
+        self._offsets = {}
+        self._index_size = 0
+        self._map = None
+        self._map_size = 0
+        # Opening the index cuts off a partial record left by an earlier crash
+        with self._locked_index():
+            pass
+        self.refresh()
+
+    # Open the index for appending, locked against other processes; a partial record left
+    # at its end by a crash is cut off first, so records appended after it stay aligned
+    @contextmanager
+    def _locked_index(self):
+        with open(self.index_path, "ab") as index_file:
+            if fcntl is not None:
+                fcntl.flock(index_file, fcntl.LOCK_EX)
+            try:
+                size = index_file.seek(0, os.SEEK_END)
+                if size % _RECORD.size:
+                    index_file.truncate(size - size % _RECORD.size)
+                yield index_file
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(index_file, fcntl.LOCK_UN)
+
+    # Read index records appended since the last refresh (e.g. by another process)
+    def refresh(self):
+        with self._lock:
+            data_size = os.path.getsize(self.data_path)
+            with open(self.index_path, "rb") as f:
+                f.seek(self._index_size)
+                tail = f.read()
+            whole = len(tail) - len(tail) % _RECORD.size
+            for digest, offset, length in _RECORD.iter_unpack(tail[:whole]):
+                # A record whose text is not fully written (interrupted append) is skipped
+                if offset + length <= data_size:
+                    self._offsets[digest] = (offset, length)
+            self._index_size += whole
+
+    def _view(self, offset, length):
+        if length == 0:
+            return memoryview(b"")
+        if offset + length > self._map_size:
+            # The file has grown: map it again (views of the old map keep it alive until released)
+            with open(self.data_path, "rb") as f:
+                self._map_size = os.path.getsize(self.data_path)
+                self._map = mmap.mmap(f.fileno(), self._map_size, access=mmap.ACCESS_READ)
+        return memoryview(self._map)[offset:offset + length]
+
+    def __contains__(self, digest):
+        return digest in self._offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    # Bytes of a stored text without copying it out of the mapped file, or None
+    def view(self, digest):
+        with self._lock:
+            location = self._offsets.get(digest)
+            if location is None:
+                return None
+            return self._view(*location)
+
+    # Stored text for a file hash, or None
+    def get(self, digest):
+        view = self.view(digest)
+        return None if view is None else str(view, "utf-8")
+
+    # Append a text; the data is written before its index record, so a crash never indexes a partial text
+    def add(self, digest, text):
+        with self._lock:
+            if digest in self._offsets:
+                return
+            encoded = text.encode("utf-8")
+            with self._locked_index() as index_file:
+                with open(self.data_path, "ab") as data_file:
+                    offset = data_file.seek(0, os.SEEK_END)
+                    data_file.write(encoded)
+                    data_file.flush()
+                    os.fsync(data_file.fileno())
+                index_file.write(_RECORD.pack(digest, offset, len(encoded)))
+                index_file.flush()
+            self._offsets[digest] = (offset, len(encoded))
+
+    # Iterate over (file hash, text) pairs in the order they were added, decoding one at a time
+    def items(self):
+        with self._lock:
+            locations = sorted(self._offsets.items(), key=lambda item: item[1][0])
+        for digest, (offset, length) in locations:
+            with self._lock:
+                text = str(self._view(offset, length), "utf-8")
+            yield digest, text
+
+    def close(self):
+        with self._lock:
+            self._map = None
+            self._map_size = 0
+
+
+# Function to get a file's text from the corpus, extracting and adding it on a miss
+def get_or_extract(corpus, data, extract):
+    digest = file_digest(data)
+    text = corpus.get(digest)
+    if text is None:
+        text = extract(data)
+        corpus.add(digest, text)
+    return text
+
+
+def main():
+    from batch import find_resumes
+    from extractors import extract_text
+
+    parser = argparse.ArgumentParser(description="Build and inspect extracted-resume corpora")
+    parser.add_argument("command", choices=["add", "info"])
+    parser.add_argument("folder", nargs="?", help="Folder with resumes to add (PDF, DOCX, RTF or TXT)")
+    parser.add_argument("--corpus", required=True, help="Corpus path (without the .dat/.idx extension)")
+    args = parser.parse_args()
+
+    corpus = Corpus(args.corpus)
+    if args.command == "add":
+        if not args.folder:
+            parser.error("add needs a folder")
+        added = 0
+        for path in find_resumes(args.folder):
+            with open(path, "rb") as f:
+                data = f.read()
+            if file_digest(data) not in corpus:
+                get_or_extract(corpus, data, extract_text)
+                added += 1
+        print(f"Added {added} resumes")
+    print(f"{len(corpus)} resumes, {os.path.getsize(corpus.data_path) / 1024 / 1024:.1f} MB of text")
+    corpus.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
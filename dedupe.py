@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+from dotenv import load_dotenv
+
+from resume_text import canonicalize
+
+# Near-duplicate detection for resumes with MinHash signatures and an LSH index.
+# Resumes re-sent with small edits or reformatted share most of their word shingles,
+# so their signatures agree in most positions and they land in a shared LSH bucket.
+
+load_dotenv()
+
+# Estimated Jaccard similarity at or above which two resumes count as duplicates
+DEDUPE_THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0.9"))
+
+NUM_PERMUTATIONS = 128
+SHINGLE_WORDS = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 61) - 1
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Fixed seed so signatures stay comparable between runs and processes
+_random = random.Random(20240601)
+_PERMUTATIONS = [
+    (_random.randrange(1, _MERSENNE_PRIME), _random.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+# Function to get the word shingles of a text (lowercased, after canonicalization)
+def shingles(text):
+    words = _WORD_PATTERN.findall(canonicalize(text).lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+# Function to compute the MinHash signature of a text
+def minhash(text):
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big") & _MAX_HASH
+        for shingle in shingles(text)
+    ]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    return [min((a * value + b) % _MERSENNE_PRIME for value in hashes) for a, b in _PERMUTATIONS]
+
+
+# Function to estimate the Jaccard similarity of two texts from their signatures
+def similarity(signature, other):
+    return sum(1 for a, b in zip(signature, other) if a == b) / len(signature)
+
+
+# Function to choose the LSH band layout (bands, rows per band) for a similarity threshold
+# The S-curve threshold (1/bands)^(1/rows) is kept just below the requested threshold,
+# so that pairs above it almost always share a bucket and are then checked exactly
+def choose_bands(threshold, num_permutations=NUM_PERMUTATIONS):
+    best = (num_permutations, 1)
+    for rows in range(1, num_permutations + 1):
+        if num_permutations % rows:
+            continue
+        bands = num_permutations // rows
+        if (1 / bands) ** (1 / rows) <= threshold * 0.9:
+            best = (bands, rows)
+    return best
+
+
+class MinHashIndex:
+    """LSH index of MinHash signatures that finds the closest earlier near-duplicate of a text
+
+    Entries live in namespaces (e.g. one per job description and ATS), and a query only
+    matches entries of its own namespace.
+    """
+
+    def __init__(self, threshold=None):
+        self.threshold = DEDUPE_THRESHOLD if threshold is None else threshold
+        self.bands, self.rows = choose_bands(self.threshold)
+        self._buckets = [{} for _ in range(self.bands)]
+        self._entries = {}  # key -> (signature, payload, namespace)
+        self._lock = threading.Lock()
+
+    def _band_keys(self, signature, namespace):
+        for band in range(self.bands):
+            yield band, (namespace, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+
+    def add(self, key, signature, payload=None, namespace=""):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (signature, payload, namespace)
+            for band, band_key in self._band_keys(signature, namespace):
+                self._buckets[band].setdefault(band_key, []).append(key)
+
+    def _remove(self, key):
+        signature, _, namespace = self._entries.pop(key)
+        for band, band_key in self._band_keys(signature, namespace):
+            bucket = self._buckets[band][band_key]
+            bucket.remove(key)
+            if not bucket:
+                del self._buckets[band][band_key]
+
+    def remove(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    # Returns (key, similarity, payload) of the most similar entry at or above the threshold, or None
+    def query(self, signature, namespace=""):
+        with self._lock:
+            candidates = set()
+            for band, band_key in self._band_keys(signature, namespace):
+                candidates.update(self._buckets[band].get(band_key, []))
+            best = None
+            for key in candidates:
+                other, payload, _ = self._entries[key]
+                score = similarity(signature, other)
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (key, score, payload)
+            return best
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    # Function to save the index (signatures and JSON-serializable payloads) to a file
+    # With keep, only entries whose payload keep(payload) accepts are saved
+    def save(self, path, keep=None):
+        with self._lock:
+            entries = [{"key": key, "signature": signature, "payload": payload, "namespace": namespace}
+                       for key, (signature, payload, namespace) in self._entries.items()
+                       if keep is None or keep(payload)]
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"threshold": self.threshold, "entries": entries}, f)
+        os.replace(temp_path, path)
+
+    # Function to load an index saved with save()
+    @classmethod
+    def load(cls, path, threshold=None):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(data["threshold"] if threshold is None else threshold)
+        for entry in data["entries"]:
+            index.add(entry["key"], entry["signature"], entry["payload"], entry.get("namespace", ""))
+        return index
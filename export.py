@@ -0,0 +1,181 @@
+import csv
+import json
+import os
+
+# Streaming export of batch results. Results are buffered up to a fixed number of rows,
+# then appended to every output file and recorded in a checkpoint, so memory stays bounded
+# however long the run is and an interrupted run can continue where it stopped.
+
+RESULT_FIELDS = ["file", "status", "score", "duplicate_of", "similarity", "fingerprint", "error", "issues", "analysis"]
+
+# Results held in memory before they are written out
+EXPORT_BUFFER_ROWS = 100
+
+
+class CsvOutput:
+    """Appends results to a CSV file (issues joined with ' | ')"""
+
+    def __init__(self, path):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+        if new_file:
+            self._writer.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            self._writer.writerow(dict(row, issues=" | ".join(row.get("issues") or [])))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlOutput:
+    """Appends results to a JSON Lines file"""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, rows):
+        for row in rows:
+            self._file.write(json.dumps({field: row.get(field) for field in RESULT_FIELDS}, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetOutput:
+    """Writes results to a Parquet file, one row group per flush (needs pyarrow)
+
+    Parquet files cannot be appended to, so a resumed run writes the next free
+    results.1.parquet, results.2.parquet, ... next to the first file.
+    """
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+        self._pa = pa
+        stem, extension = os.path.splitext(path)
+        part = 0
+        while os.path.exists(path):
+            part += 1
+            path = f"{stem}.{part}{extension}"
+        self.path = path
+        self._schema = pa.schema([
+            ("file", pa.string()), ("status", pa.string()), ("score", pa.float64()),
+            ("duplicate_of", pa.string()), ("similarity", pa.float64()), ("fingerprint", pa.string()),
+            ("error", pa.string()), ("issues", pa.list_(pa.string())), ("analysis", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        columns = {field: [] for field in RESULT_FIELDS}
+        for row in rows:
+            for field in RESULT_FIELDS:
+                value = row.get(field)
+                if field in ("score", "similarity"):
+                    value = None if value in (None, "") else float(value)
+                elif field == "issues":
+                    value = list(value or [])
+                else:
+                    value = None if value is None else str(value)
+                columns[field].append(value)
+        self._writer.write_table(self._pa.table(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+OUTPUT_TYPES = {
+    ".csv": CsvOutput,
+    ".jsonl": JsonlOutput,
+    ".parquet": ParquetOutput,
+}
+
+
+# Function to open an output for a path, chosen by its extension
+def open_output(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in OUTPUT_TYPES:
+        raise ValueError(f"Unsupported output format {extension!r}, use one of: {', '.join(OUTPUT_TYPES)}")
+    return OUTPUT_TYPES[extension](path)
+
+
+class Checkpoint:
+    """Append-only record of the (resume, job description) pairs already exported"""
+
+    def __init__(self, path):
+        self.path = path
+        self._done = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._done.update(line.rstrip("\n") for line in f if line.strip())
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, key):
+        return key in self._done
+
+    def __len__(self):
+        return len(self._done)
+
+    def mark(self, keys):
+        for key in keys:
+            self._file.write(key + "\n")
+            self._done.add(key)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class ResultExporter:
+    """Buffers results and writes them to every output, then checkpoints them
+
+    Rows are written before their checkpoint, so after a crash a pair is at worst
+    exported twice, never lost.
+    """
+
+    def __init__(self, paths, checkpoint=None, buffer_rows=EXPORT_BUFFER_ROWS):
+        self.outputs = [open_output(path) for path in paths]
+        self.checkpoint = checkpoint
+        self.buffer_rows = buffer_rows
+        self._rows = []
+        self._keys = []
+        self.counts = {}
+
+    def add(self, row, key=None):
+        self._rows.append(row)
+        if key is not None:
+            self._keys.append(key)
+        self.counts[row["status"]] = self.counts.get(row["status"], 0) + 1
+        if len(self._rows) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            for output in self.outputs:
+                output.write(self._rows)
+        if self.checkpoint is not None and self._keys:
+            self.checkpoint.mark(self._keys)
+        self._rows = []
+        self._keys = []
+
+    # Drops the buffered rows without writing or checkpointing them
+    def discard(self):
+        for row in self._rows:
+            self.counts[row["status"]] -= 1
+        self._rows = []
+        self._keys = []
+
+    def close(self):
+        self.flush()
+        for output in self.outputs:
+            output.close()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
@@ -0,0 +1,302 @@
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+from dotenv import load_dotenv
+from PyPDF2 import PdfReader
+
+import metrics
+import tracing
+from corpus import get_or_extract
+from resume_text import canonicalize, estimate_tokens, fingerprint, split_sections
+
+# Background extraction of uploaded resumes. Extraction starts as soon as a file is
+# uploaded, while the user is still choosing the job details, so that "Analyze Resume"
+# usually finds the text, its sections and its fingerprint already prepared.
+#
+# Text is extracted by a backend chosen per document type (PDF, DOCX, RTF or TXT, told
+# apart by their first bytes). Several PDF backends can be used when their packages are
+# installed; bench_extractors.py measures them on sample resumes and saves the fastest
+# one that extracts well enough to EXTRACTOR_CHOICES, which is read here at startup.
+
+load_dotenv()
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+EXTRACTOR_CHOICES = os.getenv("EXTRACTOR_CHOICES", "extractor_choice.json")
+
+# Finished extractions kept for reuse (the same file uploaded again, or by another session)
+MAX_KEPT_EXTRACTIONS = 32
+
+_executor = ThreadPoolExecutor(max_workers=EXTRACTION_WORKERS, thread_name_prefix="extract")
+_lock = threading.Lock()
+_extractions = OrderedDict()  # sha256 of the file -> Future
+
+
+class UnsupportedDocument(ValueError):
+    pass
+
+
+# Function to extract the text of a PDF with PyPDF2
+def _pdf_pypdf2(data):
+    pdf_reader = PdfReader(io.BytesIO(data))
+    pdf_text = ""
+    for page in pdf_reader.pages:
+        pdf_text += page.extract_text()
+    return pdf_text
+
+
+# Function to extract the text of a PDF with pypdf (the successor of PyPDF2), if installed
+def _pdf_pypdf(data):
+    from pypdf import PdfReader as PypdfReader
+
+    return "\n".join(page.extract_text() or "" for page in PypdfReader(io.BytesIO(data)).pages)
+
+
+# Function to extract the text of a PDF with pdfminer.six, if installed
+def _pdf_pdfminer(data):
+    from pdfminer.high_level import extract_text
+
+    return extract_text(io.BytesIO(data))
+
+
+# Function to extract the text of a PDF with PyMuPDF, if installed
+def _pdf_pymupdf(data):
+    import fitz
+
+    with fitz.open(stream=data, filetype="pdf") as document:
+        return "\n".join(page.get_text() for page in document)
+
+
+_WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+# Function to extract the text of a DOCX file from its document XML (no python-docx needed)
+def _docx_xml(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        xml = archive.read("word/document.xml")
+    paragraphs = []
+    for paragraph in ElementTree.fromstring(xml).iter(f"{_WORD_NAMESPACE}p"):
+        parts = []
+        for element in paragraph.iter():
+            if element.tag == f"{_WORD_NAMESPACE}t":
+                parts.append(element.text or "")
+            elif element.tag == f"{_WORD_NAMESPACE}tab":
+                parts.append("\t")
+            elif element.tag in (f"{_WORD_NAMESPACE}br", f"{_WORD_NAMESPACE}cr"):
+                parts.append("\n")
+        paragraphs.append("".join(parts))
+    return "\n".join(paragraphs)
+
+
+# RTF groups that hold formatting or metadata rather than text
+_RTF_SKIPPED_GROUPS = {"fonttbl", "colortbl", "stylesheet", "info", "pict", "header", "footer",
+                       "headerl", "headerr", "footerl", "footerr", "listtable", "listoverridetable",
+                       "rsidtbl", "generator", "xmlnstbl", "themedata", "datastore", "latentstyles"}
+_RTF_BREAKS = {"par": "\n", "line": "\n", "sect": "\n", "page": "\n", "row": "\n", "cell": "\t", "tab": "\t",
+               "emdash": "\u2014", "endash": "\u2013", "bullet": "\u2022", "lquote": "\u2018", "rquote": "\u2019",
+               "ldblquote": "\u201c", "rdblquote": "\u201d"}
+_RTF_TOKEN = re.compile(r"\\([a-z]+)(-?\d+)? ?|\\'([0-9a-f]{2})|\\([^a-z])|([{}])|[\r\n]+|([^\\{}\r\n]+)", re.IGNORECASE)
+
+
+# Function to extract the plain text of an RTF document
+def _rtf_text(data):
+    text = data.decode("latin-1")
+    output = []
+    stack = []
+    skipping = False
+    skip_chars = 0      # characters to drop after a \u escape (their ANSI fallback)
+    unicode_skip = 1    # \uc setting
+    for match in _RTF_TOKEN.finditer(text):
+        word, argument, hex_code, symbol, brace, plain = match.groups()
+        if brace == "{":
+            stack.append((skipping, unicode_skip))
+            continue
+        if brace == "}":
+            if stack:
+                skipping, unicode_skip = stack.pop()
+            continue
+        if word is not None:
+            word = word.lower()
+            if word in _RTF_SKIPPED_GROUPS:
+                skipping = True
+            elif word == "uc" and argument:
+                unicode_skip = int(argument)
+            elif not skipping and word == "u" and argument:
+                output.append(chr(int(argument) % 65536))
+                skip_chars = unicode_skip
+            elif not skipping and word in _RTF_BREAKS:
+                output.append(_RTF_BREAKS[word])
+            continue
+        if symbol is not None:
+            if symbol == "*":
+                skipping = True
+            elif not skipping and symbol in "\\{}":
+                output.append(symbol)
+            elif not skipping and symbol == "~":
+                output.append(" ")
+            elif not skipping and symbol in "\r\n":
+                output.append("\n")
+            continue
+        if skipping:
+            continue
+        if hex_code is not None:
+            if skip_chars:
+                skip_chars -= 1
+            else:
+                output.append(bytes([int(hex_code, 16)]).decode("cp1252", errors="replace"))
+            continue
+        if plain is not None:
+            if skip_chars:
+                dropped = min(skip_chars, len(plain))
+                plain = plain[dropped:]
+                skip_chars -= dropped
+            output.append(plain)
+    return "".join(output)
+
+
+# Function to read a plain text file (no parsing: just decoding)
+def _txt(data):
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp1252", errors="replace")
+
+
+# Extraction backends: name -> (document type, function)
+BACKENDS = {
+    "pypdf2": ("pdf", _pdf_pypdf2),
+    "pypdf": ("pdf", _pdf_pypdf),
+    "pdfminer": ("pdf", _pdf_pdfminer),
+    "pymupdf": ("pdf", _pdf_pymupdf),
+    "docx-xml": ("docx", _docx_xml),
+    "rtf": ("rtf", _rtf_text),
+    "txt": ("txt", _txt),
+}
+
+# Backend used for each document type when no benchmark choice is saved
+DEFAULT_BACKENDS = {"pdf": "pypdf2", "docx": "docx-xml", "rtf": "rtf", "txt": "txt"}
+
+# File extensions the uploader and batch screening accept
+SUPPORTED_EXTENSIONS = ["pdf", "docx", "rtf", "txt"]
+
+
+# Function to tell the type of a document from its first bytes
+def detect_type(data):
+    if data.startswith(b"%PDF"):
+        return "pdf"
+    if data.startswith(b"{\\rtf"):
+        return "rtf"
+    if data.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return "docx"
+        except zipfile.BadZipFile:
+            pass
+        raise UnsupportedDocument("This archive is not a Word (DOCX) document")
+    if data.startswith(b"\xd0\xcf\x11\xe0"):
+        raise UnsupportedDocument("Old Word (.doc) files are not supported, please save the resume as DOCX or PDF")
+    # Text files have no signature; binary data has NUL bytes
+    if b"\x00" in data[:4096]:
+        raise UnsupportedDocument("Unsupported file type, please upload a PDF, DOCX, RTF or TXT file")
+    return "txt"
+
+
+# Function to check whether a backend's package is installed
+def backend_available(name):
+    module = {"pypdf": "pypdf", "pdfminer": "pdfminer.high_level", "pymupdf": "fitz"}.get(name)
+    if module is None:
+        return name in BACKENDS
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+# Function to load the backends chosen by bench_extractors.py, falling back to the defaults
+def load_choices(path=None):
+    choices = dict(DEFAULT_BACKENDS)
+    try:
+        with open(path or EXTRACTOR_CHOICES, encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return choices
+    for document_type, choice in saved.items():
+        backend = choice.get("backend") if isinstance(choice, dict) else choice
+        if backend in BACKENDS and BACKENDS[backend][0] == document_type and backend_available(backend):
+            choices[document_type] = backend
+    return choices
+
+
+_choices = load_choices()
+
+
+# Function to extract text with one backend, timing it in the extract.<backend> latency metric
+def extract_with(backend, data):
+    started = time.monotonic()
+    with tracing.span("extract", backend=backend, bytes=len(data)):
+        text = BACKENDS[backend][1](data)
+    metrics.observe(f"extract.{backend}", time.monotonic() - started)
+    return text
+
+
+# Function to extract the text of a document with the backend chosen for its type
+def extract_text(data):
+    return extract_with(_choices[detect_type(data)], data)
+
+
+# Function to extract the text of a PDF from its bytes
+def extract_pdf_text(data):
+    return extract_with(_choices["pdf"], data)
+
+
+# Function to get the observed extraction times per backend (count, p50, p95 in seconds)
+def backend_timings():
+    latencies = metrics.snapshot()["latency"]
+    return {name[len("extract."):]: timing for name, timing in latencies.items() if name.startswith("extract.")}
+
+
+# Function to extract a resume and prepare everything the analysis needs from it
+# With a corpus (see corpus.py), text extracted in an earlier run is read back instead
+def extract_resume(data, corpus=None):
+    if corpus is not None:
+        text = get_or_extract(corpus, data, extract_text)
+    else:
+        text = extract_text(data)
+    return prepare_resume(text)
+
+
+# Function to prepare extracted resume text for analysis
+def prepare_resume(text):
+    canonical = canonicalize(text)
+    return {
+        "text": text,
+        "canonical": canonical,
+        "fingerprint": fingerprint(canonical),
+        "tokens": estimate_tokens(canonical),
+        "sections": split_sections(canonical),
+    }
+
+
+# Function to start extracting a file in the background, returns a Future of extract_resume's result
+# Calling it again for the same file returns the same Future, so reruns never extract twice
+def submit(data, corpus=None):
+    key = hashlib.sha256(data).hexdigest()
+    with _lock:
+        future = _extractions.get(key)
+        # A failed or cancelled extraction is tried again rather than handed out forever
+        if future is None or future.cancelled() or (future.done() and future.exception() is not None):
+            future = _executor.submit(tracing.wrap(extract_resume), data, corpus)
+            _extractions[key] = future
+        _extractions.move_to_end(key)
+        while len(_extractions) > MAX_KEPT_EXTRACTIONS:
+            _extractions.popitem(last=False)
+        return future
@@ -0,0 +1,159 @@
+import re
+from collections import Counter
+
+from resume_text import canonicalize, split_sections
+from skills import find_skills
+
+# Local, model-free estimates used when Gemini is too slow or unavailable (see routing.py).
+# The score follows the weights the analysis prompt asks the model for (keywords 40%,
+# format 20%, experience 25%, education 15%), computed from keyword overlap with the job
+# description, so it is a rough stand-in until the model's answer arrives. Skills are
+# compared by their canonical names (see skills.py), so a resume that says "k8s" or "JS"
+# matches a job description asking for Kubernetes or JavaScript.
+
+# Shown with every estimated score and at the top of every estimated report
+ESTIMATE_LABEL = "estimate"
+ESTIMATE_NOTE = ("<p><em>Gemini is slow or unavailable right now, so this is a quick local estimate based on "
+                 "keyword overlap. The full analysis replaces it as soon as Gemini answers.</em></p>")
+
+# Number of job description keywords the estimate looks for
+MAX_KEYWORDS = 30
+
+# Words that say nothing about the role (common English plus job posting filler)
+STOPWORDS = {
+    "a", "about", "above", "across", "after", "all", "also", "an", "and", "any", "are", "as", "at", "be",
+    "been", "being", "both", "but", "by", "can", "could", "do", "does", "each", "etc", "for", "from", "has",
+    "have", "how", "if", "in", "into", "is", "it", "its", "like", "may", "more", "most", "must", "new", "not",
+    "of", "on", "one", "or", "other", "our", "out", "over", "plus", "should", "so", "such", "than", "that",
+    "the", "their", "them", "then", "there", "these", "they", "this", "those", "through", "to", "up", "us",
+    "use", "using", "was", "we", "well", "were", "what", "when", "where", "which", "while", "who", "will",
+    "with", "within", "would", "you", "your",
+    "ability", "able", "apply", "candidate", "candidates", "company", "degree", "description",
+    "environment", "excellent", "experience", "experienced", "familiarity", "good", "great", "help",
+    "ideal", "including", "job", "join", "knowledge", "level", "looking", "nice", "opportunity",
+    "preferred", "proficiency", "qualifications", "related", "required", "requirements", "responsibilities",
+    "role", "seeking", "skills", "strong", "team", "title", "understanding", "work", "working", "year", "years",
+}
+
+# Section titles (from resume_text.split_sections) that hold experience and education
+EXPERIENCE_SECTIONS = {"Experience", "Work Experience", "Professional Experience", "Employment History",
+                       "Work History", "Projects", "Personal Projects"}
+EDUCATION_SECTIONS = {"Education", "Certifications", "Licenses And Certifications", "Training", "Courses"}
+SKILLS_SECTIONS = {"Skills", "Technical Skills", "Core Competencies"}
+
+DEGREE_WORDS = {"bachelor", "bachelors", "master", "masters", "phd", "doctorate", "diploma", "b.tech", "m.tech",
+                "b.e", "b.s", "m.s", "bsc", "msc", "mba", "associate"}
+
+_WORD_PATTERN = re.compile(r"[a-z][a-z0-9+#]*(?:[./-][a-z0-9+#]+)*")
+_CONTACT_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+|\+?\d[\d\s().-]{7,}\d")
+
+
+# Function to get the lowercased words of a text
+def words(text):
+    return _WORD_PATTERN.findall(canonicalize(text or "").lower())
+
+
+# Function to get the most frequent meaningful keywords of a job description, most frequent first
+def job_keywords(job_description, limit=MAX_KEYWORDS):
+    counts = Counter(word for word in words(job_description) if word not in STOPWORDS and len(word) > 1)
+    return [word for word, _ in counts.most_common(limit)]
+
+
+# Function to get what the estimate looks for in a resume: the job description's skills
+# (canonical names) and its most frequent other keywords, at most limit in all
+def job_terms(job_description, limit=MAX_KEYWORDS):
+    job_skills = find_skills(job_description)
+    skill_words = {word for terms in job_skills.values() for term in terms for word in term.split()}
+    wanted_skills = list(job_skills)[:limit]
+    keywords = [word for word in job_keywords(job_description, limit) if word not in skill_words]
+    return wanted_skills, keywords[:limit - len(wanted_skills)]
+
+
+# Function to get which of the skills and keywords a text has
+def _matched(text, wanted_skills, keywords):
+    text_skills = find_skills(text)
+    text_words = set(words(text))
+    return [skill for skill in wanted_skills if skill in text_skills] + [word for word in keywords if word in text_words]
+
+
+# Function to estimate an ATS score from skill and keyword overlap and resume structure
+# Returns a score dict like extract_ats_score's, marked as an estimate, plus the matched and missing skills and keywords
+def estimate_score(resume_text, job_description):
+    wanted_skills, keywords = job_terms(job_description)
+    terms = wanted_skills + keywords
+    resume_word_list = words(resume_text)
+    resume_words = set(resume_word_list)
+    found = _matched(resume_text, wanted_skills, keywords)
+    missing = [term for term in terms if term not in found]
+    keyword_match = len(found) / len(terms) if terms else 0.5
+
+    sections = split_sections(canonicalize(resume_text or ""))
+    titles = {title for title, _ in sections}
+    has_contact = bool(_CONTACT_PATTERN.search(resume_text or ""))
+    word_count = len(resume_word_list)
+    resume_format = (
+        0.25 * has_contact
+        + 0.25 * bool(titles & EXPERIENCE_SECTIONS)
+        + 0.25 * bool(titles & EDUCATION_SECTIONS)
+        + 0.15 * bool(titles & SKILLS_SECTIONS)
+        + 0.10 * (150 <= word_count <= 1200)
+    )
+
+    experience_text = " ".join(text for title, text in sections if title in EXPERIENCE_SECTIONS)
+    experience = len(_matched(experience_text, wanted_skills, keywords)) / len(terms) if terms else 0.5
+
+    job_words = set(words(job_description))
+    if titles & EDUCATION_SECTIONS:
+        wanted_degrees = job_words & DEGREE_WORDS
+        education = 0.6 + 0.4 * (bool(wanted_degrees & resume_words) if wanted_degrees else 1)
+    else:
+        education = 0.3 if resume_words & DEGREE_WORDS else 0.0
+
+    value = round(100 * (0.40 * keyword_match + 0.20 * resume_format + 0.25 * experience + 0.15 * education), 1)
+    return {
+        "value": value,
+        "display": f"~{value}/100 ({ESTIMATE_LABEL})",
+        "estimate": True,
+        "found": found,
+        "missing": missing,
+    }
+
+
+# Function to build a report in the analysis format from a local estimate, clearly marked as one
+def estimate_report(resume_text, job_description, ats_model="Generic ATS"):
+    score = estimate_score(resume_text, job_description)
+    wanted_skills, keywords = job_terms(job_description)
+    found = ", ".join(score["found"][:15]) or "none of the top keywords"
+    missing = ", ".join(score["missing"][:15]) or "none"
+    suggestions = [f"- Work these job description keywords into your experience and skills: {missing}"] if score["missing"] else []
+    suggestions += [
+        f"- Use standard section headings (Experience, Education, Skills) so {ats_model} can parse them",
+        "- Keep contact details in plain text at the top of the resume",
+    ]
+    return (
+        f"{ESTIMATE_NOTE}\n\n"
+        f"<h2>JOB DESCRIPTION ANALYSIS</h2>\n- Skills and most frequent keywords: {', '.join((wanted_skills + keywords)[:15]) or 'none found'}\n\n"
+        f"<h2>ATS SCORE</h2> {score['value']}\n\n"
+        f"<h2>KEY FINDINGS</h2>\n- Found keywords: {found}\n- Missing keywords: {missing}\n\n"
+        f"<h2>OPTIMIZATION SUGGESTIONS</h2>\n" + "\n".join(suggestions) + "\n"
+    )
+
+
+# Function to answer a chat question without the model, pointing at what the estimate found
+def estimate_chat_answer(resume_text, job_description):
+    score = estimate_score(resume_text, job_description)
+    missing = ", ".join(score["missing"][:10])
+    answer = "Gemini is slow or unavailable right now, so this question could not be answered. Please ask again in a moment."
+    if missing:
+        answer += f" Meanwhile, a quick local check found these job description keywords missing from your resume: {missing}."
+    return answer
+
+
+# Function to check whether a report is a local estimate rather than a model analysis
+def is_estimate(report_text):
+    return bool(report_text) and report_text.startswith(ESTIMATE_NOTE)
+
+
+# Function to mark a score extracted from an estimated report as an estimate
+def mark_estimate(score):
+    return dict(score, display=f"~{score['value']}/100 ({ESTIMATE_LABEL})", estimate=True)
@@ -0,0 +1,78 @@
+import difflib
+from datetime import datetime
+
+from resume_text import fingerprint
+
+# Version history of a resume while it is being edited. Each version is stored as a
+# line delta against the original resume text, together with the fingerprint, score and
+# (when one was made) analysis of that version, so going back to it needs no model call.
+
+# Versions kept per session; the original is always kept and the oldest edits are dropped
+MAX_VERSIONS = 20
+
+
+# Function to get the line delta that turns base into text
+# Only the changed line ranges are kept: (start, end, replacement lines) against base
+def make_delta(base, text):
+    base_lines = base.splitlines(keepends=True)
+    text_lines = text.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, base_lines, text_lines, autojunk=False)
+    return [
+        (i1, i2, text_lines[j1:j2])
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+# Function to rebuild a text from base and a delta made by make_delta
+def apply_delta(base, delta):
+    base_lines = base.splitlines(keepends=True)
+    lines = []
+    position = 0
+    for start, end, replacement in delta:
+        lines.extend(base_lines[position:start])
+        lines.extend(replacement)
+        position = end
+    lines.extend(base_lines[position:])
+    return "".join(lines)
+
+
+# Function to find the version with the same content as a text, or None
+def find_version(versions, text):
+    text_fingerprint = fingerprint(text)
+    for version in versions:
+        if version["fingerprint"] == text_fingerprint:
+            return version
+    return None
+
+
+# Function to add a version (or refresh the one with the same content) and return it
+# analysis is the session-store digest of the version's analysis, if it has one
+def add_version(versions, base, text, score, analysis=None):
+    version = find_version(versions, text)
+    if version is None:
+        version = {
+            "number": versions[-1]["number"] + 1 if versions else 0,
+            "delta": make_delta(base, text),
+            "fingerprint": fingerprint(text),
+        }
+        versions.append(version)
+        # Keep the original (number 0) and the most recent edits
+        while len(versions) > MAX_VERSIONS:
+            del versions[1]
+    version["score"] = score
+    if analysis is not None:
+        version["analysis"] = analysis
+    version["saved_at"] = datetime.now().strftime("%H:%M:%S")
+    return version
+
+
+# Function to get the text of a version
+def version_text(base, version):
+    return apply_delta(base, version["delta"])
+
+
+# Function to get the label shown for a version in the history
+def version_label(version):
+    name = "Original" if version["number"] == 0 else f"Version {version['number']}"
+    return f"{name} - {version['score']['display']} ({version['saved_at']})"
@@ -0,0 +1,371 @@
+"""Persistent inverted index over a local library of job descriptions.
+
+Every posting in the library (a folder of .txt or .md files, one posting per file) is
+indexed by its words, with the skills it asks for and the job level and job role it is
+for, using the same choices as the app's "Select Job Level" and "Select Job Role"
+selectors. Given a resume, search() ranks the postings with BM25 over the words they
+share with the resume, so the best-fitting postings of a few thousand are found in
+milliseconds without calling the model; the shortlist can then be analyzed as usual.
+
+Level and role are read from "Job Level:" / "Job Role:" lines when they name one of the
+choices, and otherwise guessed from its title, the years of experience it asks for and its
+keywords. Skills are canonical skill names (see skills.py), so a posting asking for
+"k8s" matches a resume listing "Kubernetes". Building again only re-reads postings whose
+files changed.
+
+Usage: python job_index.py build job_library/ --index job_index.json
+       python job_index.py search resume.pdf --index job_index.json --top 10 --job-level "Advanced (5+ years)"
+"""
+import argparse
+import glob
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dotenv import load_dotenv
+
+from heuristics import STOPWORDS, words
+from skills import find_skills
+
+load_dotenv()
+
+JOB_INDEX = os.getenv("JOB_INDEX", "job_index.json")
+JOB_MATCHES = int(os.getenv("JOB_MATCHES", "10"))
+
+# Choices of the app's job level and job role selectors
+JOB_LEVELS = ["Entry Level/Fresher", "Intermediate (2-5 years)", "Advanced (5+ years)"]
+JOB_ROLES = ["Software Development Engineer", "Data Analyst/Scientist", "MERN Stack Developer", "Other"]
+
+# Other ways a "Job Level:" or "Job Role:" line names a choice, normalized (see _normalize_choice)
+CHOICE_ALIASES = {
+    "entry level": JOB_LEVELS[0], "entry": JOB_LEVELS[0], "fresher": JOB_LEVELS[0], "junior": JOB_LEVELS[0],
+    "intermediate": JOB_LEVELS[1], "mid level": JOB_LEVELS[1],
+    "advanced": JOB_LEVELS[2], "senior": JOB_LEVELS[2],
+    "sde": JOB_ROLES[0], "software engineer": JOB_ROLES[0], "software developer": JOB_ROLES[0],
+    "data analyst": JOB_ROLES[1], "data scientist": JOB_ROLES[1],
+    "mern": JOB_ROLES[2], "mern stack": JOB_ROLES[2], "mern developer": JOB_ROLES[2],
+}
+
+LIBRARY_EXTENSIONS = ["txt", "md"]
+
+# Bumped when the fields a posting is indexed with change, so build re-reads every posting
+INDEX_VERSION = 2
+
+# BM25 parameters: term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_LEVEL_TITLE_WORDS = [
+    (JOB_LEVELS[2], re.compile(r"\b(?:senior|sr\.?|lead|principal|staff|architect|head|director|manager)\b", re.IGNORECASE)),
+    (JOB_LEVELS[0], re.compile(r"\b(?:junior|jr\.?|entry|fresher|graduate|intern|trainee|apprentice)\b", re.IGNORECASE)),
+    (JOB_LEVELS[1], re.compile(r"\b(?:ii|mid|intermediate)\b", re.IGNORECASE)),
+]
+_YEARS_PATTERN = re.compile(r"(\d{1,2})\s*(?:\+|(?:-|to|–)\s*\d{1,2})?\s*\+?\s*years?", re.IGNORECASE)
+_FIELD_PATTERN = re.compile(r"^\s*job\s+(level|role)\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE)
+_TITLE_PREFIX_PATTERN = re.compile(r"^\s*(?:job\s+)?title\s*:\s*", re.IGNORECASE)
+
+# Words that point at each role; a posting's role is the one whose words it uses most (title words count triple)
+ROLE_KEYWORDS = {
+    "MERN Stack Developer": {"mern", "mongodb", "express", "express.js", "node", "node.js", "nodejs", "react", "redux"},
+    "Data Analyst/Scientist": {"data", "analyst", "analytics", "scientist", "science", "statistics", "tableau",
+                               "pandas", "bi", "machine", "learning", "ml", "excel", "visualization"},
+    "Software Development Engineer": {"software", "developer", "engineer", "sde", "programming", "backend",
+                                      "frontend", "algorithms", "java", "c++", "microservices"},
+}
+MIN_ROLE_HITS = 3
+
+
+# Function to get the words a posting or resume is indexed and searched by
+def index_terms(text):
+    return [word for word in words(text) if word not in STOPWORDS and len(word) > 1]
+
+
+# Function to get a posting's title: its first non-empty line, without a "Job Title:" prefix
+def posting_title(text):
+    for line in text.splitlines():
+        if line.strip():
+            return _TITLE_PREFIX_PATTERN.sub("", line).strip()[:120]
+    return ""
+
+
+# Function to normalize a level or role for matching: lowercase words, punctuation dropped
+def _normalize_choice(value):
+    return " ".join(re.findall(r"[a-z0-9+]+", value.lower()))
+
+
+# Function to match a stated level or role against the selector choices, or None
+# Only the choice itself or one of its CHOICE_ALIASES matches: "Data Engineer" is no Data Analyst
+def _match_choice(value, choices):
+    value = _normalize_choice(value)
+    for choice in choices:
+        if _normalize_choice(choice) == value:
+            return choice
+    choice = CHOICE_ALIASES.get(value)
+    return choice if choice in choices else None
+
+
+# Function to get a posting's job level: stated, from its title, or from the years of experience it asks for
+def infer_level(text, title=None):
+    for field, value in _FIELD_PATTERN.findall(text):
+        if field.lower() == "level" and _match_choice(value, JOB_LEVELS):
+            return _match_choice(value, JOB_LEVELS)
+    title = posting_title(text) if title is None else title
+    for level, pattern in _LEVEL_TITLE_WORDS:
+        if pattern.search(title):
+            return level
+    years = [int(match) for match in _YEARS_PATTERN.findall(text)]
+    if years:
+        fewest = min(years)
+        return JOB_LEVELS[2] if fewest >= 5 else JOB_LEVELS[1] if fewest >= 2 else JOB_LEVELS[0]
+    return ""
+
+
+# Function to get a posting's job role: stated, or the role whose keywords it uses most
+def infer_role(text, title=None):
+    for field, value in _FIELD_PATTERN.findall(text):
+        if field.lower() == "role" and _match_choice(value, JOB_ROLES):
+            return _match_choice(value, JOB_ROLES)
+    title_words = Counter(words(posting_title(text) if title is None else title))
+    text_words = Counter(words(text))
+    if text_words["mern"]:
+        return "MERN Stack Developer"
+    hits = {role: sum(3 * title_words[word] + text_words[word] for word in keywords)
+            for role, keywords in ROLE_KEYWORDS.items()}
+    role, count = max(hits.items(), key=lambda item: item[1])
+    return role if count >= MIN_ROLE_HITS else "Other"
+
+
+# Function to get the fields a posting is indexed with
+def posting_fields(path, text):
+    title = posting_title(text)
+    return {
+        "path": os.path.abspath(path),
+        "title": title or os.path.basename(path),
+        "level": infer_level(text, title),
+        "role": infer_role(text, title),
+        "skills": list(find_skills(text)),
+    }
+
+
+class JobIndex:
+    """Inverted index of job postings: term -> {posting id: term count}, plus each posting's fields"""
+
+    def __init__(self):
+        self.postings = {}  # posting id -> fields, "sha256" and "length" (indexed terms)
+        self.terms = {}     # term -> {posting id: count}
+        self.version = INDEX_VERSION
+        self._posting_terms = {}  # posting id -> its terms, so removing a posting only touches those
+        self._lock = threading.Lock()
+        self._norms = None  # posting id -> BM25 length normalization, rebuilt after changes
+
+    def add(self, posting_id, text, fields, sha256=""):
+        counts = Counter(index_terms(text))
+        with self._lock:
+            if posting_id in self.postings:
+                self._remove(posting_id)
+            self.postings[posting_id] = dict(fields, sha256=sha256, length=sum(counts.values()))
+            for term, count in counts.items():
+                self.terms.setdefault(term, {})[posting_id] = count
+            self._posting_terms[posting_id] = list(counts)
+            self._norms = None
+
+    def _remove(self, posting_id):
+        self.postings.pop(posting_id)
+        for term in self._posting_terms.pop(posting_id, ()):
+            postings = self.terms[term]
+            postings.pop(posting_id, None)
+            if not postings:
+                del self.terms[term]
+        self._norms = None
+
+    def remove(self, posting_id):
+        with self._lock:
+            if posting_id in self.postings:
+                self._remove(posting_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self.postings)
+
+    def _length_norms(self):
+        if self._norms is None:
+            lengths = {posting_id: posting["length"] for posting_id, posting in self.postings.items()}
+            average = sum(lengths.values()) / len(lengths) if lengths else 1
+            self._norms = {posting_id: BM25_K1 * (1 - BM25_B + BM25_B * length / (average or 1))
+                           for posting_id, length in lengths.items()}
+        return self._norms
+
+    # Function to rank the postings for a resume, best fit first
+    # job_level and job_role (selector choices) keep only postings of that level or role; "" keeps all
+    # Returns [{"id", "score", "matched_skills", "missing_skills", and the posting's fields}]
+    def search(self, resume_text, limit=None, job_level="", job_role=""):
+        limit = JOB_MATCHES if limit is None else limit
+        resume_terms = set(index_terms(resume_text))
+        resume_skills = find_skills(resume_text)
+        with self._lock:
+            norms = self._length_norms()
+            total = len(self.postings)
+            scores = Counter()
+            for term in resume_terms:
+                postings = self.terms.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for posting_id, count in postings.items():
+                    scores[posting_id] += idf * count * (BM25_K1 + 1) / (count + norms[posting_id])
+
+            def wanted(posting_id):
+                posting = self.postings[posting_id]
+                return (not job_level or posting["level"] == job_level) and (not job_role or posting["role"] == job_role)
+
+            best = heapq.nlargest(limit, (item for item in scores.items() if wanted(item[0])), key=lambda item: item[1])
+            results = []
+            for posting_id, score in best:
+                posting = {key: value for key, value in self.postings[posting_id].items() if key not in ("sha256", "length")}
+                posting.update({
+                    "id": posting_id,
+                    "score": round(score, 3),
+                    "matched_skills": [skill for skill in posting["skills"] if skill in resume_skills],
+                    "missing_skills": [skill for skill in posting["skills"] if skill not in resume_skills],
+                })
+                results.append(posting)
+            return results
+
+    # Function to save the index to a file
+    def save(self, path):
+        with self._lock:
+            data = json.dumps({"version": self.version, "postings": self.postings, "terms": self.terms})
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    # Function to load an index saved with save()
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls()
+        index.postings = data["postings"]
+        index.terms = data["terms"]
+        index.version = data.get("version", 1)
+        for term, postings in index.terms.items():
+            for posting_id in postings:
+                index._posting_terms.setdefault(posting_id, []).append(term)
+        return index
+
+
+# Function to find the job descriptions in a library folder (and its subfolders)
+def find_postings(folder):
+    paths = []
+    for extension in LIBRARY_EXTENSIONS:
+        paths.extend(glob.glob(os.path.join(folder, "**", f"*.{extension}"), recursive=True))
+    return sorted(paths)
+
+
+# Function to bring an index up to date with a library folder
+# Postings are keyed by their path within the folder; unchanged files are skipped and deleted ones removed
+# Returns (added or updated, removed)
+def update_index(index, folder):
+    seen = set()
+    changed = 0
+    for path in find_postings(folder):
+        posting_id = os.path.relpath(path, folder)
+        seen.add(posting_id)
+        with open(path, "rb") as f:
+            data = f.read()
+        sha256 = hashlib.sha256(data).hexdigest()
+        existing = index.postings.get(posting_id)
+        if existing is not None and existing.get("sha256") == sha256 and index.version == INDEX_VERSION:
+            continue
+        text = data.decode("utf-8", errors="replace")
+        index.add(posting_id, text, posting_fields(path, text), sha256)
+        changed += 1
+    removed = [posting_id for posting_id in list(index.postings) if posting_id not in seen]
+    for posting_id in removed:
+        index.remove(posting_id)
+    index.version = INDEX_VERSION
+    return changed, len(removed)
+
+
+# Function to read a posting's job description from its file
+def posting_text(posting):
+    with open(posting["path"], encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+_shared_lock = threading.Lock()
+_shared = {}  # path -> (modification time, JobIndex)
+
+
+# Function to get the index at a path, shared by all sessions and reloaded when the file changes
+# Returns None when there is no index
+def shared_index(path=None):
+    path = path or JOB_INDEX
+    try:
+        modified = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _shared_lock:
+        loaded = _shared.get(path)
+        if loaded is None or loaded[0] != modified:
+            try:
+                loaded = (modified, JobIndex.load(path))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Could not load job index {path}: {str(e)}")
+                return None
+            _shared[path] = loaded
+        return loaded[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index a library of job descriptions and find the best fits for a resume")
+    parser.add_argument("command", choices=["build", "search"])
+    parser.add_argument("target", help="Library folder (build) or resume file (search)")
+    parser.add_argument("--index", default=JOB_INDEX, help="Index file to create, update or search")
+    parser.add_argument("--top", type=int, default=JOB_MATCHES, help="Number of postings to show (search only)")
+    parser.add_argument("--job-level", default="", choices=[""] + JOB_LEVELS, help="Only postings of this level (search only)")
+    parser.add_argument("--job-role", default="", choices=[""] + JOB_ROLES, help="Only postings for this role (search only)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = JobIndex.load(args.index) if os.path.exists(args.index) else JobIndex()
+        started = time.monotonic()
+        changed, removed = update_index(index, args.target)
+        index.save(args.index)
+        print(f"Indexed {len(index)} postings ({changed} added or updated, {removed} removed) "
+              f"in {time.monotonic() - started:.2f}s: {args.index}")
+        return 0
+
+    if not os.path.exists(args.index):
+        print(f"No job index at {args.index}; build one with: python job_index.py build FOLDER")
+        return 1
+    from extractors import UnsupportedDocument, extract_text
+
+    index = JobIndex.load(args.index)
+    with open(args.target, "rb") as f:
+        data = f.read()
+    try:
+        resume_text = extract_text(data)
+    except UnsupportedDocument as e:
+        print(f"{args.target}: {e}")
+        return 1
+    started = time.perf_counter()
+    results = index.search(resume_text, args.top, args.job_level, args.job_role)
+    elapsed = time.perf_counter() - started
+    for rank, posting in enumerate(results, start=1):
+        skills = posting["skills"]
+        print(f"{rank:3d}. {posting['score']:8.2f}  {posting['title']} ({posting['level'] or 'any level'}, {posting['role']})"
+              f"  {len(posting['matched_skills'])}/{len(skills)} skills  {posting['id']}")
+    print(f"{len(results)} of {len(index)} postings in {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
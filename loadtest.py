@@ -0,0 +1,377 @@
+"""Concurrent-session load test for the ATS Checker app.
+
+Starts the app with `streamlit run` against the stub model backend (or targets an
+already running server with --url) and drives N simulated browser sessions over
+Streamlit's websocket protocol through upload -> analyze -> edit -> update score ->
+chat. Reports throughput, per-step latency percentiles, and the server's thread
+count and RSS over time.
+
+Usage: python loadtest.py --sessions 50 --stub-latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+
+import requests
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Common_pb2 import UploadedFileInfo
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from samples import RESUME_LINES, make_resume_pdf
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+STEPS = ["load", "upload", "analyze", "edit", "update_score", "chat"]
+
+
+# Function to read the thread count and RSS (in MB) of a process from /proc
+def process_stats(pid):
+    threads = rss_mb = None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss_mb = int(line.split()[1]) / 1024
+                elif line.startswith("Threads:"):
+                    threads = int(line.split()[1])
+    except OSError:
+        pass
+    return threads, rss_mb
+
+
+# Function to get a percentile from a list of numbers
+def percentile(values, percent):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ResourceSampler:
+    """Samples the server's thread count and RSS in the background while the test runs"""
+
+    def __init__(self, pid, interval):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._started = time.monotonic()
+
+    def _run(self):
+        while not self._stop.is_set():
+            threads, rss_mb = process_stats(self.pid)
+            if threads is not None:
+                self.samples.append({
+                    "t": round(time.monotonic() - self._started, 2),
+                    "threads": threads,
+                    "rss_mb": round(rss_mb, 1),
+                })
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class SimulatedSession:
+    """One browser tab talking to the Streamlit server over its websocket protocol"""
+
+    def __init__(self, base_url, step_timeout):
+        self.base_url = base_url.rstrip("/")
+        self.step_timeout = step_timeout
+        self.session_id = None
+        self.widgets = {}        # label -> (widget type, widget id) from the latest run
+        self.widget_values = {}  # label -> value set so far, resent on every rerun like a browser does
+        self.errors = []
+        self._ws = None
+
+    async def connect(self):
+        ws_url = self.base_url.replace("http", "ws", 1) + "/_stcore/stream"
+        self._ws = await websockets.connect(ws_url, max_size=None)
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+
+    async def _receive(self):
+        message = ForwardMsg()
+        message.ParseFromString(await asyncio.wait_for(self._ws.recv(), self.step_timeout))
+        return message
+
+    # Function to rerun the script with the current widget values (plus an optional button click)
+    async def rerun(self, click=None):
+        back = BackMsg()
+        back.rerun_script.query_string = ""
+        back.rerun_script.page_script_hash = ""
+        for label, value in self.widget_values.items():
+            if label in self.widgets:
+                self._fill_widget_state(back.rerun_script.widget_states.widgets.add(), label, value)
+        if click is not None:
+            state = back.rerun_script.widget_states.widgets.add()
+            state.id = self.widgets[click][1]
+            state.trigger_value = True
+        await self._ws.send(back.SerializeToString())
+
+        widgets = {}
+        while True:
+            message = await self._receive()
+            kind = message.WhichOneof("type")
+            if kind == "new_session":
+                self.session_id = message.new_session.initialize.session_id
+            elif kind == "delta" and message.delta.WhichOneof("type") == "new_element":
+                element = message.delta.new_element
+                element_type = element.WhichOneof("type")
+                proto = getattr(element, element_type)
+                if element_type == "exception":
+                    self.errors.append(f"exception: {proto.message}")
+                elif getattr(proto, "id", "") and hasattr(proto, "label"):
+                    widgets[proto.label] = (element_type, proto.id)
+            elif kind == "script_finished":
+                if message.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    # The app called st.rerun(); the server starts the next run by itself
+                    widgets = {}
+                    continue
+                break
+        self.widgets = widgets
+
+    def _fill_widget_state(self, state, label, value):
+        widget_type, widget_id = self.widgets[label]
+        state.id = widget_id
+        if widget_type == "checkbox":
+            state.bool_value = value
+        elif widget_type == "file_uploader":
+            state.file_uploader_state_value.uploaded_file_info.append(value)
+        else:
+            state.string_value = value
+
+    # Function to upload a file the way the browser does: ask for an upload URL, then PUT the file
+    async def upload(self, label, filename, content):
+        back = BackMsg()
+        request_id = uuid.uuid4().hex
+        back.file_urls_request.request_id = request_id
+        back.file_urls_request.file_names.append(filename)
+        back.file_urls_request.session_id = self.session_id
+        await self._ws.send(back.SerializeToString())
+        while True:
+            message = await self._receive()
+            if message.WhichOneof("type") == "file_urls_response" and message.file_urls_response.response_id == request_id:
+                file_urls = message.file_urls_response.file_urls[0]
+                break
+        response = await asyncio.to_thread(
+            requests.put,
+            self.base_url + file_urls.upload_url,
+            files={"file": (filename, content, "application/pdf")},
+            timeout=self.step_timeout,
+        )
+        response.raise_for_status()
+        self.widget_values[label] = UploadedFileInfo(
+            name=filename, size=len(content), file_id=file_urls.file_id, file_urls=file_urls
+        )
+
+
+# Function to run one simulated session and return its per-step timings
+async def run_session(session_number, args):
+    timings = {}
+    session = SimulatedSession(args.url, args.step_timeout)
+
+    # Give every session a slightly different resume so st.cache_data does not hide the model calls
+    lines = list(RESUME_LINES)
+    if not args.shared_resume:
+        lines.append(f"Load test session {session_number}")
+    pdf_bytes = make_resume_pdf(lines)
+    edited = "\n".join(lines + ["SQL, PostgreSQL, AWS"])
+
+    async def step(name, action):
+        started = time.monotonic()
+        try:
+            await action()
+        except Exception as e:
+            session.errors.append(f"{name}: {type(e).__name__}: {e}")
+        timings[name] = time.monotonic() - started
+
+    async def load():
+        await session.connect()
+        await session.rerun()
+
+    async def upload():
+        await session.upload("Upload your resume (PDF, DOCX, RTF or TXT)", "resume.pdf", pdf_bytes)
+        # Use the first job description template
+        session.widget_values["Use a job description template"] = True
+        await session.rerun()
+
+    async def edit():
+        session.widget_values["Edit Your Resume"] = edited
+        await session.rerun()
+
+    async def chat():
+        session.widget_values["Ask me anything about your resume or the analysis:"] = "How can I improve my skills section?"
+        await session.rerun()
+
+    await step("load", load)
+    await step("upload", upload)
+    await step("analyze", lambda: session.rerun(click="Analyze Resume"))
+    await step("edit", edit)
+    await step("update_score", lambda: session.rerun(click="Update Score"))
+    await step("chat", chat)
+    await session.close()
+    return {"session": session_number, "timings": timings, "errors": session.errors}
+
+
+# Function to run all sessions, at most `concurrency` at a time, with an optional ramp-up
+async def run_all(args):
+    limit = asyncio.Semaphore(args.concurrency or args.sessions)
+
+    async def limited(session_number):
+        await asyncio.sleep(args.ramp_up * session_number / max(1, args.sessions))
+        async with limit:
+            return await run_session(session_number, args)
+
+    return await asyncio.gather(*(limited(n) for n in range(args.sessions)))
+
+
+# Function to start the app under `streamlit run` with the stub model backend
+def start_server(args):
+    env = dict(os.environ)
+    env["MODEL_BACKEND"] = "stub"
+    env["STUB_LATENCY"] = str(args.stub_latency)
+    if args.model_concurrency:
+        env["MODEL_CONCURRENCY"] = str(args.model_concurrency)
+    command = [
+        sys.executable, "-m", "streamlit", "run", APP_PATH,
+        "--server.headless", "true",
+        "--server.port", str(args.port),
+        "--server.enableXsrfProtection", "false",
+        "--browser.gatherUsageStats", "false",
+    ]
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{args.url}/_stcore/health", timeout=2) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("Streamlit server did not become healthy within 60 seconds")
+
+
+# Function to summarize the session results and resource samples into a report
+def build_report(results, samples, wall_time, args):
+    steps = {}
+    for name in STEPS:
+        values = [r["timings"][name] for r in results if name in r["timings"]]
+        steps[name] = {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": max(values) if values else None,
+        }
+    failed = [r for r in results if r["errors"]]
+    return {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency or args.sessions,
+        "stub_latency": None if args.no_server else args.stub_latency,
+        "wall_time": wall_time,
+        "throughput_sessions_per_s": len(results) / wall_time if wall_time else None,
+        "throughput_steps_per_s": sum(len(r["timings"]) for r in results) / wall_time if wall_time else None,
+        "failed_sessions": len(failed),
+        "errors": [e for r in failed for e in r["errors"]][:20],
+        "steps": steps,
+        "threads_peak": max((s["threads"] for s in samples), default=None),
+        "rss_start_mb": samples[0]["rss_mb"] if samples else None,
+        "rss_peak_mb": max((s["rss_mb"] for s in samples), default=None),
+        "rss_end_mb": samples[-1]["rss_mb"] if samples else None,
+        "samples": samples,
+    }
+
+
+# Function to print the report in a readable form
+def print_report(report):
+    def fmt(value):
+        return "-" if value is None else f"{value:.3f}"
+
+    print(f"\nSessions: {report['sessions']} (concurrency {report['concurrency']}), "
+          f"stub latency {report['stub_latency']}s, failed {report['failed_sessions']}")
+    print(f"Wall time: {report['wall_time']:.2f}s, "
+          f"{report['throughput_sessions_per_s']:.2f} sessions/s, {report['throughput_steps_per_s']:.2f} steps/s")
+    print(f"\n{'step':<14}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, stats in report["steps"].items():
+        print(f"{name:<14}{stats['count']:>7}{fmt(stats['p50']):>10}{fmt(stats['p95']):>10}"
+              f"{fmt(stats['p99']):>10}{fmt(stats['max']):>10}")
+    if report["samples"]:
+        print(f"\nServer threads peak: {report['threads_peak']}")
+        print(f"Server RSS start/peak/end: {report['rss_start_mb']} / {report['rss_peak_mb']} / {report['rss_end_mb']} MB")
+        print("\nServer threads and RSS over time:")
+        for sample in report["samples"][:: max(1, len(report["samples"]) // 20)]:
+            print(f"  t={sample['t']:>7}s  threads={sample['threads']:>4}  rss={sample['rss_mb']:>8} MB")
+    if report["errors"]:
+        print("\nErrors:")
+        for error in report["errors"]:
+            print(f"  {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the ATS Checker app with simulated sessions")
+    parser.add_argument("--sessions", type=int, default=50, help="Number of simulated sessions")
+    parser.add_argument("--concurrency", type=int, default=0, help="Sessions running at once (default: all)")
+    parser.add_argument("--ramp-up", type=float, default=0, help="Seconds over which to start the sessions")
+    parser.add_argument("--stub-latency", type=float, default=0.5, help="Mean stub model latency in seconds")
+    parser.add_argument("--model-concurrency", type=int, default=0, help="Override MODEL_CONCURRENCY on the server")
+    parser.add_argument("--step-timeout", type=float, default=120, help="Timeout for each step in seconds")
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="Seconds between resource samples")
+    parser.add_argument("--shared-resume", action="store_true", help="Use the same resume in every session")
+    parser.add_argument("--port", type=int, default=8599, help="Port for the server started by the harness")
+    parser.add_argument("--url", help="Test an already running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="Process id of the --url server, to sample its threads and RSS")
+    parser.add_argument("--json", help="Also write the full report to this JSON file")
+    args = parser.parse_args()
+
+    args.no_server = bool(args.url)
+    server = None
+    if args.no_server:
+        pid = args.pid
+    else:
+        args.url = f"http://localhost:{args.port}"
+        server = start_server(args)
+        pid = server.pid
+
+    sampler = ResourceSampler(pid, args.sample_interval) if pid else None
+    try:
+        if sampler:
+            sampler.start()
+        started = time.monotonic()
+        results = asyncio.run(run_all(args))
+        wall_time = time.monotonic() - started
+    finally:
+        if sampler:
+            sampler.stop()
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = build_report(results, sampler.samples if sampler else [], wall_time, args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nFull report written to {args.json}")
+    return 1 if report["failed_sessions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
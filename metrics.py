@@ -0,0 +1,83 @@
+import threading
+from collections import deque
+
+# In-process metrics shared by every session in this Streamlit server.
+# Latencies are kept in rolling windows so percentiles follow recent behaviour.
+
+WINDOW_SIZE = 200
+
+_lock = threading.Lock()
+_windows = {}
+_counters = {}
+
+
+class LatencyWindow:
+    """Rolling window of the most recent latency samples in seconds"""
+
+    def __init__(self, size=WINDOW_SIZE):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self):
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, percent):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(percent / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+# Function to get (or create) the latency window for a metric name
+def latency_window(name):
+    with _lock:
+        if name not in _windows:
+            _windows[name] = LatencyWindow()
+        return _windows[name]
+
+
+# Function to record one latency sample
+def observe(name, seconds):
+    latency_window(name).add(seconds)
+
+
+# Function to add to a counter
+def increment(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+# Function to read a counter
+def counter(name):
+    with _lock:
+        return _counters.get(name, 0)
+
+
+# Function to get a plain-dict view of all metrics, e.g. for reports or debugging
+def snapshot():
+    with _lock:
+        windows = dict(_windows)
+        counters = dict(_counters)
+    latencies = {}
+    for name, window in windows.items():
+        latencies[name] = {
+            "count": window.count(),
+            "p50": window.percentile(50),
+            "p95": window.percentile(95),
+            "p99": window.percentile(99),
+        }
+    return {"latency": latencies, "counters": counters}
+
+
+# Function to clear all metrics (used by benchmarks between runs)
+def reset():
+    with _lock:
+        _windows.clear()
+        _counters.clear()
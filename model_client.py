@@ -0,0 +1,654 @@
+import hashlib
+import json
+import os
+import queue
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime
+from dotenv import load_dotenv
+
+import metrics
+import scheduler
+import token_budget
+import tracing
+
+# Load environment variables before reading any settings below
+load_dotenv()
+
+# Streamlit re-executes app.py on every interaction, so state that must be shared
+# between reruns and sessions (like the concurrency limit) lives in this module.
+
+# Model backend: "live" calls Gemini, "record" calls Gemini and saves every response
+# to the fixture store, "replay" serves saved responses without any network access,
+# "stub" makes up plausible responses (used by the load test harness)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "live").lower()
+MODEL_NAME = os.getenv("MODEL_NAME", "gemini-1.5-flash")
+FIXTURE_DIR = os.getenv("FIXTURE_DIR", os.path.join("fixtures", "model_responses"))
+
+# Simulated latency in replay mode: "recorded" sleeps for the latency observed when the
+# response was recorded (times REPLAY_LATENCY_SCALE), a number sleeps that many seconds
+REPLAY_LATENCY = os.getenv("REPLAY_LATENCY", "recorded")
+REPLAY_LATENCY_SCALE = float(os.getenv("REPLAY_LATENCY_SCALE", "1.0"))
+
+# Mean latency of the stub backend in seconds; each call varies by up to +/-50%
+STUB_LATENCY = float(os.getenv("STUB_LATENCY", "0.5"))
+
+# Model tiers: each call type is sent to its own model with its own generation settings,
+# so a bare score can go to a faster model than a full analysis. The defaults use
+# MODEL_NAME for everything and only cap the output of each call type; the tiers file
+# (written by bench_tiers.py) and ANALYSIS_MODEL, SCORE_MODEL and CHAT_MODEL override them.
+MODEL_TIERS = os.getenv("MODEL_TIERS", "model_tiers.json")
+DEFAULT_TIERS = {
+    "analysis": {"model": MODEL_NAME, "generation_config": {"max_output_tokens": 8192}},
+    "score": {"model": MODEL_NAME, "generation_config": {"max_output_tokens": 16}},
+    "chat": {"model": MODEL_NAME, "generation_config": {"max_output_tokens": 2048}},
+}
+
+_models = {}
+_models_lock = threading.Lock()
+
+# Maximum number of Gemini calls in flight at once, across all sessions
+MODEL_CONCURRENCY = int(os.getenv("MODEL_CONCURRENCY", "4"))
+
+# Calls wait for a slot in their priority class (score, analysis, chat or bulk), see scheduler.py
+_scheduler = scheduler.create_scheduler(MODEL_CONCURRENCY)
+
+# Upper bound on the deadline for each call type (the previous hard-coded timeouts)
+DEFAULT_TIMEOUTS = {
+    "analysis": 60,
+    "score": 30,
+    "chat": 60,
+}
+
+# Adaptive deadlines: once enough latencies have been observed, a call type's deadline
+# becomes its p99 latency times TIMEOUT_MULTIPLIER, kept between MIN_TIMEOUT and the default
+ADAPTIVE_MIN_SAMPLES = int(os.getenv("ADAPTIVE_MIN_SAMPLES", "20"))
+TIMEOUT_MULTIPLIER = float(os.getenv("TIMEOUT_MULTIPLIER", "1.5"))
+MIN_TIMEOUT = float(os.getenv("MIN_TIMEOUT", "10"))
+
+# Hedged requests: when a call runs past the p95 latency for its type, a duplicate
+# request is sent and whichever answers first wins. HEDGE_BUDGET is the fraction of
+# calls that may be hedged, so hedging cannot double the number of requests.
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.1"))
+HEDGE_BURST = 5
+
+_hedge_lock = threading.Lock()
+_hedge_tokens = [0.0]
+
+# Ensemble scoring: with SCORE_SAMPLES > 1 each score is requested that many times at once
+# and the median is returned as soon as SCORE_QUORUM answers agree within SCORE_AGREEMENT
+# points; requests still waiting for a slot are then cancelled
+SCORE_SAMPLES = int(os.getenv("SCORE_SAMPLES", "1"))
+# 0 means a majority of the samples a call asks for
+SCORE_QUORUM = int(os.getenv("SCORE_QUORUM", "0"))
+SCORE_AGREEMENT = float(os.getenv("SCORE_AGREEMENT", "2"))
+
+# How often a cancellable call checks whether it has been cancelled
+CANCEL_POLL_SECONDS = 0.05
+
+# Circuit breaker: after BREAKER_FAILURES failed or timed-out calls in a row, calls are
+# refused at once for BREAKER_COOLDOWN seconds, then a single trial call decides whether
+# the model has recovered. Callers answer from a local estimate meanwhile (see routing.py).
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+
+
+# Timeout handler for API calls
+class TimeoutException(Exception):
+    pass
+
+
+# Raised when a call misses the caller's cutoff (e.g. a latency SLO); the call itself carries on
+# until its deadline, and pending is a Future of its response
+class SloMissed(TimeoutException):
+    def __init__(self, message, pending):
+        super().__init__(message)
+        self.pending = pending
+
+def timeout_handler(seconds, callback, *args, **kwargs):
+    """Run a function with a timeout"""
+    result = [None]
+    error = [None]
+    completed = [False]
+
+    def target():
+        try:
+            result[0] = callback(*args, **kwargs)
+            completed[0] = True
+        except Exception as e:
+            error[0] = e
+
+    thread = threading.Thread(target=target)
+    thread.daemon = True
+    thread.start()
+    thread.join(seconds)
+
+    if completed[0]:
+        if error[0] is not None:
+            raise error[0]
+        return result[0]
+    else:
+        raise TimeoutException(f"Function call timed out after {seconds} seconds")
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CallCancelled(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Tracks consecutive model failures and refuses calls while the model looks down"""
+
+    def __init__(self, failures=None, cooldown=None):
+        self.failures = BREAKER_FAILURES if failures is None else failures
+        self.cooldown = BREAKER_COOLDOWN if cooldown is None else cooldown
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._trial_thread = None
+
+    # "closed" (calls go through), "open" (refused) or "half-open" (cooldown over, waiting for a trial)
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return "open"
+            return "half-open"
+
+    # Returns True if a call may go to the model; after the cooldown only one trial call is let through
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_running:
+                return False
+            self._trial_running = True
+            self._trial_thread = threading.get_ident()
+            return True
+
+    # Gives up a thread's trial call without a result (it was cancelled), so the next call can be the trial
+    # owner is the thread that was let through, by default the calling thread
+    def release_trial(self, owner=None):
+        with self._lock:
+            owner = threading.get_ident() if owner is None else owner
+            if self._trial_running and self._trial_thread == owner:
+                self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                metrics.increment("model.breaker.closed")
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            # A failed trial opens the breaker again for another cooldown
+            if self._trial_running or (self._opened_at is None and self._consecutive >= self.failures):
+                metrics.increment("model.breaker.opened")
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+_breaker = CircuitBreaker()
+
+
+# Function to get the state of the shared circuit breaker ("closed", "open" or "half-open")
+def breaker_state():
+    return _breaker.state()
+
+
+class FixtureNotFound(Exception):
+    pass
+
+
+class FixtureResponse:
+    """Stand-in for a Gemini response served from the fixture store"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+# Function to get the fixture key for a request (sha256 of the model name and prompt parts)
+def prompt_hash(model_name, contents):
+    payload = json.dumps([model_name, [str(part) for part in contents]], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Function to get the path of a fixture file
+def fixture_path(key, fixture_dir=None):
+    return os.path.join(fixture_dir or FIXTURE_DIR, f"{key}.json")
+
+
+class RecordingModel:
+    """Calls the live model and writes every prompt hash -> response pair to the fixture store"""
+
+    def __init__(self, live_model, model_name, fixture_dir=None):
+        self.live_model = live_model
+        self.model_name = model_name
+        self.fixture_dir = fixture_dir or FIXTURE_DIR
+
+    def generate_content(self, contents):
+        started = time.monotonic()
+        response = self.live_model.generate_content(contents)
+        latency = time.monotonic() - started
+
+        key = prompt_hash(self.model_name, contents)
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        fixture = {
+            "model": self.model_name,
+            "prompt_preview": str(contents[-1])[:200],
+            "text": response.text,
+            "latency": round(latency, 3),
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        # Write to a temporary file first so concurrent sessions never see half a fixture
+        path = fixture_path(key, self.fixture_dir)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+        return response
+
+
+class ReplayModel:
+    """Serves recorded responses from the fixture store with simulated latency"""
+
+    def __init__(self, model_name, fixture_dir=None, latency=None, latency_scale=None):
+        self.model_name = model_name
+        self.fixture_dir = fixture_dir or FIXTURE_DIR
+        self.latency = REPLAY_LATENCY if latency is None else latency
+        self.latency_scale = REPLAY_LATENCY_SCALE if latency_scale is None else latency_scale
+
+    def generate_content(self, contents):
+        key = prompt_hash(self.model_name, contents)
+        try:
+            with open(fixture_path(key, self.fixture_dir), encoding="utf-8") as f:
+                fixture = json.load(f)
+        except FileNotFoundError:
+            raise FixtureNotFound(f"No recorded response for prompt {key[:12]} in {self.fixture_dir}")
+
+        if self.latency == "recorded":
+            delay = fixture.get("latency", 0) * self.latency_scale
+        else:
+            delay = float(self.latency)
+        if delay > 0:
+            time.sleep(delay)
+        return FixtureResponse(fixture["text"])
+
+
+class StubModel:
+    """Makes up responses in the shapes the app expects, for load tests without an API key"""
+
+    def __init__(self, latency=None):
+        self.latency = STUB_LATENCY if latency is None else latency
+
+    def generate_content(self, contents):
+        prompt = str(contents[-1])
+        if self.latency > 0:
+            time.sleep(self.latency * random.uniform(0.5, 1.5))
+
+        # Derive a stable score from the prompt so identical requests agree
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        score = 50 + digest[0] % 400 / 10
+        if "Return ONLY the ATS score" in prompt:
+            return FixtureResponse(f"{score:.1f}")
+        if "CHANGED SECTIONS" in prompt:
+            return FixtureResponse(
+                f"<h2>ATS SCORE</h2> {score:.1f}\n\n"
+                "<h2>KEY FINDINGS</h2>\n- Found keywords: Python, SQL\n- Missing keywords: none\n"
+            )
+        if "ANALYSIS FORMAT" in prompt:
+            return FixtureResponse(
+                "<h2>JOB DESCRIPTION ANALYSIS</h2>\nThe role asks for Python, SQL and teamwork.\n\n"
+                f"<h2>ATS SCORE</h2> {score:.1f}\n\n"
+                "<h2>KEY FINDINGS</h2>\n- Found keywords: Python\n- Missing keywords: SQL\n\n"
+                "<h2>OPTIMIZATION SUGGESTIONS</h2>\n- Add a skills section with SQL\n"
+            )
+        return FixtureResponse("Focus on adding the missing keywords to your experience section.")
+
+
+# Function to create the live Gemini model
+def _create_live_model(model_name, generation_config=None):
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai.GenerativeModel(model_name, generation_config=generation_config)
+
+
+# Function to get the model for the configured backend, created once per process
+# for each model name and generation config
+def get_model(model_name=None, generation_config=None):
+    model_name = model_name or MODEL_NAME
+    key = (model_name, json.dumps(generation_config, sort_keys=True))
+    with _models_lock:
+        if key not in _models:
+            if MODEL_BACKEND == "replay":
+                _models[key] = ReplayModel(model_name)
+            elif MODEL_BACKEND == "record":
+                _models[key] = RecordingModel(_create_live_model(model_name, generation_config), model_name)
+            elif MODEL_BACKEND == "stub":
+                _models[key] = StubModel()
+            elif MODEL_BACKEND == "live":
+                _models[key] = _create_live_model(model_name, generation_config)
+            else:
+                raise ValueError(f"Unknown MODEL_BACKEND: {MODEL_BACKEND}")
+        return _models[key]
+
+
+# Function to load the model tiers: the defaults, then the tiers file, then the *_MODEL settings
+# Returns {call type: {"model", "generation_config"}}
+def load_tiers(path=None):
+    tiers = {call_type: {"model": tier["model"], "generation_config": dict(tier["generation_config"])}
+             for call_type, tier in DEFAULT_TIERS.items()}
+    try:
+        with open(path or MODEL_TIERS, encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        saved = {}
+    for call_type, tier in saved.items():
+        if call_type in tiers and isinstance(tier, dict):
+            tiers[call_type]["model"] = tier.get("model") or tiers[call_type]["model"]
+            tiers[call_type]["generation_config"].update(tier.get("generation_config") or {})
+    for call_type in tiers:
+        tiers[call_type]["model"] = os.getenv(f"{call_type.upper()}_MODEL", tiers[call_type]["model"])
+    return tiers
+
+
+_tiers = load_tiers()
+
+
+# Function to get the model tier of a call type (analysis settings for unknown types)
+def tier_for(call_type):
+    return _tiers.get(call_type, _tiers["analysis"])
+
+
+# Function to get the model a call type is sent to
+def model_for(call_type):
+    tier = tier_for(call_type)
+    return get_model(tier["model"], tier["generation_config"])
+
+
+# Function to get the deadline for a call type from its recent latencies
+def adaptive_timeout(call_type):
+    default = DEFAULT_TIMEOUTS.get(call_type, 60)
+    window = metrics.latency_window(f"model.{call_type}")
+    if window.count() < ADAPTIVE_MIN_SAMPLES:
+        return default
+    return max(MIN_TIMEOUT, min(default, window.percentile(99) * TIMEOUT_MULTIPLIER))
+
+
+# Function to get how long to wait before hedging a call, or None if it should not be hedged
+def hedge_delay(call_type):
+    if not HEDGE_ENABLED:
+        return None
+    window = metrics.latency_window(f"model.{call_type}")
+    if window.count() < ADAPTIVE_MIN_SAMPLES:
+        return None
+    return window.percentile(95)
+
+
+# Function to earn hedge budget for a call (token bucket refilled by HEDGE_BUDGET per call)
+def _earn_hedge_budget():
+    with _hedge_lock:
+        _hedge_tokens[0] = min(HEDGE_BURST, _hedge_tokens[0] + HEDGE_BUDGET)
+
+
+# Function to spend one hedge from the budget, returns False if the budget is used up
+def _spend_hedge_budget():
+    with _hedge_lock:
+        if _hedge_tokens[0] < 1:
+            return False
+        _hedge_tokens[0] -= 1
+        return True
+
+
+# Function to record the token usage of a finished call (hedged duplicates are counted once)
+def _record_tokens(call_type, prompt_tokens, response):
+    try:
+        response_tokens = token_budget.count_tokens(response.text)
+    except ValueError:
+        # Gemini raises ValueError for .text when the response was blocked
+        response_tokens = 0
+    token_budget.record_usage(call_type, prompt_tokens, response_tokens)
+
+
+# Function to call the model with an adaptive deadline, optional hedging and the shared concurrency limit
+# priority is the scheduler class to wait in; it defaults to the call type (batch jobs pass "bulk")
+# The deadline counts from when the call gets a model slot; a call still waiting for a slot after
+# the same length of time gives up without counting as a model failure (model.<call type>.queue_timeouts)
+# Raises CircuitOpen without calling the model while the circuit breaker is open.
+# Setting the cancel event makes the call raise CallCancelled (a request already sent still runs,
+# but one still waiting for a slot is never sent)
+# With a cutoff (seconds, e.g. an interactive SLO) the caller stops waiting then and gets SloMissed,
+# while the call runs on to its deadline; only the deadline counts against the circuit breaker
+@tracing.traced("model.call")
+def call_model(model, contents, call_type, timeout=None, priority=None, cancel=None, cutoff=None):
+    tracing.set_attribute("call_type", call_type)
+    tracing.set_attribute("model", getattr(model, "model_name", type(model).__name__))
+    if not _breaker.allow():
+        metrics.increment(f"model.{call_type}.rejected")
+        raise CircuitOpen("The model is unavailable, calls are paused for a moment")
+    priority = priority or call_type
+    deadline = timeout if timeout is not None else adaptive_timeout(call_type)
+    hedge_after = hedge_delay(call_type)
+    _earn_hedge_budget()
+    metrics.increment(f"model.{call_type}.calls")
+    prompt_tokens = token_budget.count_contents(contents)
+    tracing.set_attribute("prompt_tokens", prompt_tokens)
+    tracing.set_attribute("deadline", round(deadline, 3))
+
+    answers = queue.Queue()
+    finished = threading.Event()
+
+    def attempt(number):
+        enqueued = time.monotonic()
+        with tracing.span("model.attempt", attempt=number, hedge=number > 1) as attempt_span:
+            try:
+                # The slot is held until the call returns, even if the caller has already moved on
+                queue_span = tracing.span("model.queue", priority=priority)
+                with _scheduler.slot(priority):
+                    queue_span.end()
+                    # The call's latency starts once it has a slot; the wait for it is recorded on its own
+                    started = time.monotonic()
+                    metrics.observe(f"model.{call_type}.queue", started - enqueued)
+                    answers.put(("sent", started))
+                    if finished.is_set():
+                        # Another attempt already answered while this one was waiting for a slot
+                        attempt_span.set_attribute("outcome", "superseded")
+                        return
+                    if cancel is not None and cancel.is_set():
+                        attempt_span.set_attribute("outcome", "cancelled")
+                        answers.put(("error", CallCancelled("The call was cancelled")))
+                        return
+                    response = model.generate_content(contents)
+                metrics.observe(f"model.{call_type}", time.monotonic() - started)
+                attempt_span.set_attribute("outcome", "answered")
+                answers.put(("answer", response))
+            except Exception as e:
+                attempt_span.set_attribute("outcome", type(e).__name__)
+                answers.put(("error", e))
+
+    def launch(number):
+        thread = threading.Thread(target=tracing.wrap(attempt), args=(number,))
+        thread.daemon = True
+        thread.start()
+
+    # Waits for the first answer until the deadline, recording the outcome on the circuit breaker
+    def wait_for_answer():
+        enqueued = time.monotonic()
+        start = None  # when the first attempt got a slot
+        launch(1)
+        outstanding = 1
+        hedged = False
+        try:
+            while True:
+                elapsed = time.monotonic() - (enqueued if start is None else start)
+                if elapsed >= deadline:
+                    if start is None:
+                        # The model was never called, so this says nothing about its health
+                        metrics.increment(f"model.{call_type}.queue_timeouts")
+                        raise TimeoutException(f"No model slot was free within {deadline:.1f} seconds")
+                    metrics.increment(f"model.{call_type}.timeouts")
+                    _breaker.record_failure()
+                    raise TimeoutException(f"Function call timed out after {deadline:.1f} seconds")
+                if cancel is not None and cancel.is_set():
+                    raise CallCancelled("The call was cancelled")
+                wait = deadline - elapsed
+                if cancel is not None:
+                    wait = min(wait, CANCEL_POLL_SECONDS)
+                if hedge_after is not None and not hedged and start is not None:
+                    wait = min(wait, max(0.0, hedge_after - elapsed))
+                try:
+                    kind, value = answers.get(timeout=wait)
+                except queue.Empty:
+                    if hedge_after is not None and not hedged and start is not None and time.monotonic() - start >= hedge_after:
+                        hedged = True
+                        # The losing attempt keeps its slot until the model returns, so only hedge into a free
+                        # slot; taking one from a queued call would slow that call down instead
+                        if not _scheduler.has_free_slot(priority):
+                            metrics.increment(f"model.{call_type}.hedges_skipped")
+                        elif _spend_hedge_budget():
+                            metrics.increment(f"model.{call_type}.hedges")
+                            tracing.set_attribute("hedged", True)
+                            launch(2)
+                            outstanding += 1
+                    continue
+                if kind == "sent":
+                    if start is None:
+                        start = value
+                    continue
+                outstanding -= 1
+                if kind == "answer":
+                    _breaker.record_success()
+                    _record_tokens(call_type, prompt_tokens, value)
+                    return value
+                # Only fail once every attempt in flight has failed
+                if outstanding == 0:
+                    # A missing fixture means the replay backend answered, it just has no recording
+                    if isinstance(value, CallCancelled):
+                        pass
+                    elif isinstance(value, FixtureNotFound):
+                        _breaker.record_success()
+                    else:
+                        _breaker.record_failure()
+                    raise value
+        finally:
+            # The losing attempt cannot interrupt its HTTP call; its answer is simply ignored
+            finished.set()
+            # A cancelled trial records neither success nor failure; let the next call be the trial
+            _breaker.release_trial(caller)
+
+    caller = threading.get_ident()
+    if cutoff is None:
+        return wait_for_answer()
+    pending = Future()
+
+    def carry_on():
+        try:
+            pending.set_result(wait_for_answer())
+        except Exception as e:
+            pending.set_exception(e)
+
+    thread = threading.Thread(target=tracing.wrap(carry_on))
+    thread.daemon = True
+    thread.start()
+    try:
+        return pending.result(timeout=cutoff)
+    except FutureTimeout:
+        if pending.done():
+            raise
+        metrics.increment(f"model.{call_type}.slo_misses")
+        tracing.set_attribute("slo_missed", True)
+        raise SloMissed(f"No answer within the {cutoff:.1f} second SLO", pending)
+
+
+# Function to run several prompts in parallel and return the response texts in order
+# The whole batch takes as long as its slowest prompt, not the sum of them
+# If a prompt misses the cutoff, SloMissed is raised with a Future of all the response texts
+def generate_parallel(model, prompts, call_type="analysis", priority=None, timeout=None, cutoff=None):
+    with ThreadPoolExecutor(max_workers=len(prompts) or 1) as executor:
+        futures = [executor.submit(tracing.wrap(call_model), model, [prompt], call_type, timeout, priority, None, cutoff)
+                   for prompt in prompts]
+        parts = []
+        missed = None
+        for future in futures:
+            try:
+                parts.append(future.result())
+            except SloMissed as e:
+                missed = e
+                parts.append(e.pending)
+    if missed is None:
+        return [part.text for part in parts]
+    texts = Future()
+
+    def collect():
+        try:
+            texts.set_result([(part.result() if isinstance(part, Future) else part).text for part in parts])
+        except Exception as e:
+            texts.set_exception(e)
+
+    thread = threading.Thread(target=collect)
+    thread.daemon = True
+    thread.start()
+    raise SloMissed(str(missed), texts)
+
+
+# Function to ask for the same answer several times at once and return the median of the values
+# parse turns a response text into a number, or None if it has none. As soon as quorum values lie
+# within agreement of their median, that median is returned and the remaining calls are cancelled.
+# Returns (median, response texts received); raises the last error if no call gave a value.
+# If that error is SloMissed (a cutoff was given), the call it carries is not cancelled
+def call_ensemble(model, contents, call_type, parse, samples=None, quorum=None, agreement=None,
+                  timeout=None, priority=None, cutoff=None):
+    samples = samples or SCORE_SAMPLES
+    quorum = min(samples, quorum or SCORE_QUORUM or samples // 2 + 1)
+    agreement = SCORE_AGREEMENT if agreement is None else agreement
+    cancels = [threading.Event() for _ in range(samples)]
+    executor = ThreadPoolExecutor(max_workers=samples)
+    futures = {executor.submit(tracing.wrap(call_model), model, contents, call_type, timeout, priority, cancel, cutoff): cancel
+               for cancel in cancels}
+    values = []
+    texts = []
+    error = None
+    kept = None
+    try:
+        for future in as_completed(futures):
+            try:
+                text = future.result().text
+            except Exception as e:
+                error = e
+                kept = futures[future]
+                continue
+            texts.append(text)
+            value = parse(text)
+            if value is None:
+                continue
+            values.append(value)
+            median = statistics.median(values)
+            agreeing = [v for v in values if abs(v - median) <= agreement]
+            if len(agreeing) >= quorum:
+                if len(values) < samples:
+                    metrics.increment(f"model.{call_type}.ensemble_early_stops")
+                return statistics.median(agreeing), texts
+    finally:
+        # Without a value the error is raised; a call that only missed the cutoff keeps running for its caller
+        for cancel in cancels:
+            if not (cancel is kept and isinstance(error, SloMissed) and not values):
+                cancel.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+    if values:
+        return statistics.median(values), texts
+    raise error or ValueError("No response contained a value")
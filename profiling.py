@@ -0,0 +1,196 @@
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Opt-in profiling of script reruns and pipeline stages. With PROFILE=true (or ?profile=1
+# in the app's URL) each rerun and each stage (PDF reading, analysis, scoring, chat,
+# rendering) is sampled by a background thread that records the profiled thread's stack
+# every PROFILE_INTERVAL seconds, and tracemalloc records where memory was allocated.
+# Every profile writes a collapsed-stack file (for flamegraph tools) and a text report
+# with the top functions and allocations to PROFILE_DIR. When profiling is off, profile()
+# returns a shared no-op context manager, so nothing is sampled or traced.
+
+load_dotenv()
+
+PROFILE = os.getenv("PROFILE", "false").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "20"))
+
+_local = threading.local()
+_tracing_lock = threading.Lock()
+_tracing_users = [0]
+
+
+class _NoProfile:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_PROFILE = _NoProfile()
+
+
+# Function to switch profiling on or off for the current thread (the app does this per rerun)
+def set_enabled(enabled):
+    _local.enabled = enabled
+
+
+# Function to check whether profiling is on for the current thread
+def enabled():
+    return PROFILE or getattr(_local, "enabled", False)
+
+
+# Function to start tracemalloc for a profile; it stays on while any profile is running
+def _start_tracing():
+    with _tracing_lock:
+        if _tracing_users[0] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users[0] += 1
+
+
+def _stop_tracing():
+    with _tracing_lock:
+        _tracing_users[0] -= 1
+        if _tracing_users[0] == 0:
+            tracemalloc.stop()
+
+
+class Profile:
+    """Samples one thread's stack and its allocations between start() and stop()
+
+    tracemalloc is process-wide, so allocations made by other threads (other sessions,
+    background extraction) during the profile show up in its report too.
+    """
+
+    def __init__(self, stage, thread_id=None, interval=None):
+        self.stage = stage
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = PROFILE_INTERVAL if interval is None else interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+
+    def start(self):
+        _start_tracing()
+        self._snapshot = tracemalloc.take_snapshot()
+        self._started = time.perf_counter()
+        self._started_at = datetime.now()
+        self._sampler = threading.Thread(target=self._sample, name=f"profile-{self.stage}", daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        if self._sampler is None:
+            return None
+        self.wall_time = time.perf_counter() - self._started
+        self._stopped.set()
+        self._sampler.join()
+        self._sampler = None
+        allocations = tracemalloc.take_snapshot().compare_to(self._snapshot, "lineno")
+        _, peak = tracemalloc.get_traced_memory()
+        _stop_tracing()
+        self._snapshot = None
+        try:
+            return self._write(allocations, peak)
+        except OSError as e:
+            print(f"Could not write profile: {str(e)}")
+            return None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    # Function to write the collapsed stacks and the text report, returns the report path
+    def _write(self, allocations, peak):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{self._started_at:%Y%m%d-%H%M%S-%f}-{self.thread_id}-{self.stage}"
+        base = os.path.join(PROFILE_DIR, name)
+        with open(f"{base}.folded", "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        total = sum(self.stacks.values())
+        own = Counter()
+        cumulative = Counter()
+        for stack, count in self.stacks.items():
+            if stack:
+                own[stack[-1]] += count
+            for function in set(stack):
+                cumulative[function] += count
+
+        lines = [
+            f"Stage: {self.stage}",
+            f"Wall time: {self.wall_time:.3f}s, {total} samples every {self.interval * 1000:.0f}ms",
+            f"Peak traced memory: {peak / 1024 / 1024:.1f} MB",
+            "",
+            f"Top {PROFILE_TOP} functions by total time (including callees):",
+        ]
+        lines += [f"  {count / total:6.1%}  {function}" for function, count in cumulative.most_common(PROFILE_TOP)] if total else []
+        lines += ["", f"Top {PROFILE_TOP} functions by own time:"]
+        lines += [f"  {count / total:6.1%}  {function}" for function, count in own.most_common(PROFILE_TOP)] if total else []
+        lines += ["", f"Top {PROFILE_TOP} allocations (growth during the stage):"]
+        for stat in allocations[:PROFILE_TOP]:
+            frame = stat.traceback[0]
+            lines.append(f"  {stat.size_diff / 1024:+10.1f} KB  {stat.count_diff:+7d} blocks  "
+                         f"{frame.filename}:{frame.lineno}")
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return f"{base}.txt"
+
+
+# Function to profile a stage: use as "with profile('analysis'):"; a no-op unless profiling is on
+def profile(stage):
+    if not enabled():
+        return _NO_PROFILE
+    return Profile(stage)
+
+
+# Decorator to profile every call of a function as a stage
+def profiled(stage):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with profile(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Function to start profiling a script rerun, finishing one left running by st.rerun() or st.stop()
+def begin_rerun(enabled_for_session=False):
+    set_enabled(enabled_for_session)
+    end_rerun()
+    if enabled():
+        _local.rerun = Profile("rerun").start()
+
+
+# Function to finish profiling the current script rerun
+def end_rerun():
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        _local.rerun = None
+        rerun.stop()
@@ -0,0 +1,225 @@
+from functools import partial
+
+from ats_systems import ATS_SYSTEMS
+from resume_text import CHUNK_MAX_TOKENS, CHUNKED_ANALYSIS_THRESHOLD, chunk_sections, estimate_tokens, split_sections
+from token_budget import MAX_PROMPT_TOKENS, fit_prompt
+
+
+# Function to build the ATS system briefing shared by all analysis prompts
+def ats_briefing(ats_model):
+    selected_ats = ATS_SYSTEMS[ats_model]
+    return f"""
+    ABOUT THE {ats_model.upper()} ATS SYSTEM:
+    {selected_ats["description"]}
+
+    KEY FEATURES:
+    {', '.join(selected_ats["key_features"])}
+
+    FORMAT PREFERENCES:
+    {selected_ats["format_preferences"]}
+
+    PARSING QUIRKS:
+    {selected_ats["parsing_quirks"]}
+    """
+
+
+# Function to build the full multi-section analysis prompt
+# detailed=False gives the shorter report used when a resume is pasted into the editor
+def build_analysis_prompt(resume_text, job_description, ats_model, job_level="", job_role="", detailed=True, part_note=""):
+    approach = f"""
+    ANALYSIS APPROACH:
+    1. First, thoroughly analyze the job description to identify:
+       - Required skills, qualifications, and experience
+       - Essential keywords and phrases the ATS will likely scan for
+       - Core responsibilities and expectations
+       - Company values and culture indicators
+       - Industry-specific terminology and jargon
+
+    2. Then, analyze the resume to determine:
+       - How well it matches the job requirements
+       - Which critical keywords are present or missing
+       - If the format is optimized for {ats_model} ATS parsing
+       - Whether experience and qualifications align with the job
+
+    3. Calculate the ATS score based on the following criteria with exact weights:
+       - Keyword match (40%): Presence of key skills, technologies, and qualifications from the job description
+       - Resume format (20%): Proper structure, section organization, and machine readability specifically for {ats_model}
+       - Experience relevance (25%): How well the experience matches the job requirements
+       - Education match (15%): Relevance of education to the position
+    """ if detailed else ""
+
+    extra_sections = f"""
+    6. <h2>SECTION-BY-SECTION ANALYSIS</h2>
+       - Analyze each major section of the resume (Summary, Experience, Skills, Education)
+       - Provide specific improvement suggestions for each section
+       - Suggest how to better align each section with the job requirements
+
+    7. <h2>ATS PASSING STRATEGY</h2>
+       - Provide a clear strategy for passing the {ats_model} ATS for this specific job
+       - Highlight the most critical changes needed to improve chances of getting through the ATS
+       - Suggest any industry-specific tactics that might help for this particular role
+
+    IMPORTANT FORMATTING NOTES:
+    - Use HTML <h2> tags for all section headers as shown above
+    - Make sure all section headers have the same style and formatting
+    - Use consistent styling throughout the analysis
+    - Do not include any additional attributes in the h2 tags
+    """ if detailed else ""
+
+    return f"""
+    You are ResumeChecker, an expert in ATS (Applicant Tracking System) analysis. Your task is to provide a comprehensive evaluation of the resume against the job description, specifically for the {ats_model} ATS system, and help the candidate pass the ATS screening process.
+    {ats_briefing(ats_model)}
+    {approach}
+    ANALYSIS FORMAT:
+    1. <h2>JOB DESCRIPTION ANALYSIS</h2>
+       - Summarize the key requirements and qualifications from the job description
+       - List the most important keywords and phrases the ATS will scan for
+       - Identify any unique or specific requirements that stand out
+
+    2. <h2>ATS SCORE</h2> Provide a single, consistent score out of 100 with one decimal place precision
+
+    3. <h2>KEY FINDINGS</h2>
+       - Identify the most important keywords found and missing in the resume
+       - Evaluate the resume structure and format for {ats_model} ATS compatibility
+       - Assess the overall match between the resume and job description
+
+    4. <h2>{ats_model.upper()} SPECIFIC RECOMMENDATIONS</h2>
+       - Provide specific advice for optimizing this resume for the {ats_model} ATS system
+       - Highlight any particular strengths or weaknesses for this specific ATS
+       - Explain how this specific ATS might evaluate certain aspects of the resume
+
+    5. <h2>OPTIMIZATION SUGGESTIONS</h2>
+       - List 5 specific, actionable recommendations to improve the resume for this job
+       - Suggest exact keywords to add and where to place them
+       - Recommend format changes to improve ATS readability
+       - Provide specific phrasing suggestions that align with the job description
+    {extra_sections}
+    {part_note}
+    Resume text: {resume_text}
+    Job description: {job_description}
+    Job level: {job_level}
+    Job role: {job_role}
+    """
+
+
+# Function to build the note that scopes an analysis prompt to one part of a long resume
+def build_part_note(part_number, part_count, section_titles):
+    if part_number == 1:
+        jd_note = "Include the JOB DESCRIPTION ANALYSIS section as usual."
+    else:
+        jd_note = "Leave the JOB DESCRIPTION ANALYSIS section empty; it is covered in part 1."
+    return f"""
+    LONG RESUME NOTE:
+    This resume is too long to analyze in one pass, so it has been split into {part_count} parts.
+    You are analyzing part {part_number} of {part_count}, which covers: {', '.join(section_titles)}.
+    - Base your findings, recommendations and suggestions only on this part of the resume.
+    - For the ATS SCORE, score how well this part of the resume supports the job description.
+    - {jd_note}
+    """
+
+
+# Function to build the analysis prompts for a prepared resume (see extractors.prepare_resume)
+# A resume over CHUNKED_ANALYSIS_THRESHOLD tokens gets one prompt per chunk of its sections, each
+# fitted to MAX_PROMPT_TOKENS since each part is its own request; otherwise one prompt fitted to budget.
+# Returns (prompts, weights for merging the part reports or None for one prompt, truncated fields)
+def build_analysis_prompts(extracted, job_description, ats_model, job_level="", job_role="", detailed=True,
+                           budget=MAX_PROMPT_TOKENS):
+    build = partial(build_analysis_prompt, ats_model=ats_model, job_level=job_level, job_role=job_role, detailed=detailed)
+    if extracted["tokens"] <= CHUNKED_ANALYSIS_THRESHOLD:
+        prompt, truncated = fit_prompt(build, {"resume_text": extracted["canonical"], "job_description": job_description},
+                                       budget, ["job_description", "resume_text"])
+        return [prompt], None, truncated
+
+    chunks = chunk_sections(extracted.get("sections") or split_sections(extracted["canonical"]), CHUNK_MAX_TOKENS)
+    prompts = []
+    for number, chunk in enumerate(chunks, start=1):
+        part_note = build_part_note(number, len(chunks), [title for title, _ in chunk])
+        prompt, _ = fit_prompt(partial(build, part_note=part_note),
+                               {"resume_text": "\n\n".join(text for _, text in chunk), "job_description": job_description},
+                               MAX_PROMPT_TOKENS, ["job_description", "resume_text"])
+        prompts.append(prompt)
+    weights = [sum(estimate_tokens(text) for _, text in chunk) for chunk in chunks]
+    return prompts, weights, []
+
+
+# Function to build the score-only prompt used when an edited resume is rescored
+def build_score_prompt(resume_text, job_description, ats_model="Generic ATS", job_level="", job_role=""):
+    return f"""
+    You are ResumeChecker, an expert in ATS (Applicant Tracking System) analysis.
+    Your task is to provide a consistent and accurate evaluation of the resume against the job description,
+    specifically for the {ats_model} ATS system.
+    {ats_briefing(ats_model)}
+    ANALYSIS APPROACH:
+    1. First, thoroughly analyze the job description to identify:
+       - Required skills, qualifications, and experience
+       - Essential keywords and phrases the ATS will likely scan for
+       - Core responsibilities and expectations
+       - Industry-specific terminology and jargon
+
+    2. Then, analyze the resume to determine:
+       - How well it matches the job requirements
+       - Which critical keywords are present or missing
+       - If the format is optimized for {ats_model} ATS parsing
+       - Whether experience and qualifications align with the job
+
+    3. Calculate the ATS score based on the following criteria with exact weights:
+       - Keyword match (40%): Presence of key skills, technologies, and qualifications from the job description
+       - Resume format (20%): Proper structure, section organization, and machine readability specifically for {ats_model}
+       - Experience relevance (25%): How well the experience matches the job requirements
+       - Education match (15%): Relevance of education to the position
+
+    IMPORTANT: Return ONLY the ATS score as a number out of 100 with one decimal place precision.
+    Do not include any other text, explanation, or analysis.
+
+    Resume text: {resume_text}
+    Job description: {job_description}
+    Job level: {job_level}
+    Job role: {job_role}
+    """
+
+
+# Function to build the prompt that updates an earlier analysis for the sections of the resume that changed
+# changes are (title, old text, new text) from resume_text.diff_sections
+def build_delta_prompt(changes, previous_analysis, job_description, ats_model="Generic ATS", job_level="", job_role=""):
+    changed_sections = "\n\n".join(
+        f"Section: {title}\nBefore:\n{old_text or '(new section)'}\nAfter:\n{new_text or '(section removed)'}"
+        for title, old_text, new_text in changes
+    )
+    return f"""
+    You are ResumeChecker, an expert in ATS (Applicant Tracking System) analysis.
+    You analyzed this resume for the {ats_model} ATS system earlier (previous analysis below). The candidate has
+    since edited the resume, and only the sections listed under CHANGED SECTIONS are different; everything else is
+    exactly as it was when you analyzed it.
+    {ats_briefing(ats_model)}
+    UPDATE INSTRUCTIONS:
+    - Return ONLY the sections of the previous analysis whose content changes because of these edits, each under
+      its <h2> header exactly as it appears in the previous analysis, rewritten in full
+    - Always return <h2>ATS SCORE</h2> with the updated score out of 100 with one decimal place precision, using the
+      same criteria and weights as before (keywords 40%, format 20%, experience 25%, education 15%), so that a
+      resume that did not get better does not score higher
+    - Do not return sections that stay the same, and do not comment on unchanged parts of the resume
+
+    CHANGED SECTIONS:
+    {changed_sections}
+
+    Previous analysis: {previous_analysis}
+    Job description: {job_description}
+    Job level: {job_level}
+    Job role: {job_role}
+    """
+
+
+# Function to build the prompt for a question about the resume and its analysis
+def build_chat_prompt(question, resume_text, job_description, previous_analysis):
+    return f"""
+                You are ResumeChecker, an expert in ATS (Applicant Tracking System) analysis.
+                Based on the resume and previous analysis, answer the following question with specific,
+                actionable advice. Be consistent in your responses and maintain the same evaluation criteria
+                used in the original analysis.
+
+                Question: {question}
+
+                Resume text: {resume_text}
+                Job description: {job_description}
+                Previous analysis: {previous_analysis}
+                """
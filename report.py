@@ -0,0 +1,171 @@
+import re
+
+import tracing
+
+# Report sections that describe the job rather than the resume, so they are kept once when merging
+SHARED_SECTIONS = {"JOB DESCRIPTION ANALYSIS"}
+
+_HEADER_PATTERN = re.compile(r"<h2[^>]*>(.*?)</h2>|^#{1,3}\s*([A-Z][A-Z0-9 &/\-]+?):?\s*$", re.IGNORECASE | re.MULTILINE)
+
+
+# Function to split an analysis report into (title, body) sections along its h2/markdown headers
+def split_report(report_text):
+    sections = []
+    matches = list(_HEADER_PATTERN.finditer(report_text or ""))
+    for index, match in enumerate(matches):
+        title = (match.group(1) or match.group(2)).strip().upper()
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(report_text)
+        sections.append((title, report_text[match.end():end].strip()))
+    return sections
+
+
+# Function to merge the reports for each part of a long resume into one report
+# Scores are averaged using the weights (usually the token count of each part)
+def merge_reports(reports, scores, weights):
+    total_weight = sum(weights) or 1
+    merged_score = round(sum(score * weight for score, weight in zip(scores, weights)) / total_weight, 1)
+
+    order = []
+    bodies = {}
+    for report in reports:
+        for title, body in split_report(report):
+            if title not in bodies:
+                order.append(title)
+                bodies[title] = []
+            if not body or title == "ATS SCORE":
+                continue
+            if title in SHARED_SECTIONS and bodies[title]:
+                continue
+            bodies[title].append(body)
+
+    # Keep the ATS SCORE section where the prompt asks for it, right after the job description analysis
+    if "ATS SCORE" in order:
+        order.remove("ATS SCORE")
+    score_position = 1 if order and order[0] in SHARED_SECTIONS else 0
+    order.insert(score_position, "ATS SCORE")
+    bodies["ATS SCORE"] = [str(merged_score)]
+
+    merged = [f"<h2>{title}</h2>\n" + "\n\n".join(bodies[title]) for title in order if bodies[title]]
+    return "\n\n".join(merged)
+
+
+# Function to patch a report with the sections of a delta analysis (see prompts.build_delta_prompt)
+# Sections in the patch replace the report's sections of the same title; new ones are added at the end.
+# Any text of the report before its first header is kept in front
+def patch_report(report_text, patch_text):
+    report_text = report_text or ""
+    first = _HEADER_PATTERN.search(report_text)
+    preamble = report_text[:first.start() if first else len(report_text)].strip()
+    sections = dict(split_report(report_text))
+    order = list(sections)
+    for title, body in split_report(patch_text):
+        if title not in sections:
+            order.append(title)
+        sections[title] = body
+    patched = [f"<h2>{title}</h2>\n{sections[title]}" for title in order]
+    return "\n\n".join([preamble] + patched if preamble else patched)
+
+
+# Score patterns, compiled once at import (see warmup.py) rather than on the first analysis
+_SCORE_HTML_PATTERN = re.compile(r'<h2[^>]*>ATS SCORE</h2>\s*(\d+\.?\d*)', re.IGNORECASE)
+_SCORE_LINE_PATTERN = re.compile(r"(?:^|\n)(?:.*?)ATS\s+SCORE:?\s*(.*?)(?:\n|$)", re.IGNORECASE | re.MULTILINE)
+_SCORE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in [
+        r"ATS\s+SCORE:?\s*(\d+\.?\d*)",  # ATS SCORE: 75.5
+        r"ATS\s+SCORE:?\s*(\d+\.?\d*)\/100",  # ATS SCORE: 75.5/100
+        r"SCORE:?\s*(\d+\.?\d*)",  # SCORE: 75.5
+        r"(\d+\.?\d*)/100",  # 75.5/100
+        r"^(\d+\.?\d*)$"  # Just a number like 75.5
+    ]
+]
+_NUMBER_PATTERN = re.compile(r"(\d+\.?\d*)")
+
+
+# Function to get ATS score from analysis
+@tracing.traced("extract_ats_score")
+def extract_ats_score(analysis_text):
+    try:
+        # Look for patterns like "ATS SCORE: 75.5" or "ATS Score: 75.5/100"
+        # First, check for HTML h2 tag format (from our custom formatting)
+        html_match = _SCORE_HTML_PATTERN.search(analysis_text)
+
+        if html_match:
+            score_value = float(html_match.group(1))
+            print(f"Found score from HTML h2 tag: {score_value}")
+            return {
+                "value": score_value,
+                "display": f"{score_value}/100"
+            }
+
+        # Next, look for the exact ATS SCORE line in the analysis
+        # This is the most reliable way to get the exact score as shown in the analysis
+        score_line_match = _SCORE_LINE_PATTERN.search(analysis_text)
+
+        if score_line_match:
+            # Extract the full score line as displayed in the analysis
+            score_line = score_line_match.group(1).strip()
+
+            # Try to extract just the number from this line
+            number_match = _NUMBER_PATTERN.search(score_line)
+            if number_match:
+                score_value = float(number_match.group(1))
+                print(f"Found exact score: {score_value} from line: {score_line}")
+                # Store both the numeric value and the full text representation
+                return {
+                    "value": score_value,
+                    "display": score_line  # This preserves the exact format shown in the analysis
+                }
+
+        # If we couldn't find a specific ATS SCORE line, try more generic patterns
+        for pattern in _SCORE_PATTERNS:
+            match = pattern.search(analysis_text)
+            if match:
+                score_value = float(match.group(1))
+                print(f"Found score: {score_value} using pattern: {pattern.pattern}")
+                return {
+                    "value": score_value,
+                    "display": f"{score_value}/100"  # Default display format
+                }
+
+        # If no pattern matches, try to find any number in the text
+        numbers = _NUMBER_PATTERN.findall(analysis_text)
+        if numbers:
+            for num in numbers:
+                try:
+                    score_value = float(num)
+                    if 0 <= score_value <= 100:  # Ensure it's a valid score
+                        print(f"Found score from numbers: {score_value}")
+                        return {
+                            "value": score_value,
+                            "display": f"{score_value}/100"  # Default display format
+                        }
+                except Exception:
+                    continue
+
+        print("No score found in text:", analysis_text[:100])  # Print first 100 chars for debugging
+        return {
+            "value": 0,
+            "display": "0/100"  # Default when no score is found
+        }
+    except Exception as e:
+        print(f"Error extracting score: {str(e)}")
+        return {
+            "value": 0,
+            "display": "0/100"  # Default on error
+        }
+
+
+# Report sections whose points are listed as issues in batch results
+ISSUE_SECTIONS = ("OPTIMIZATION SUGGESTIONS",)
+
+_ISSUE_PATTERN = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.*\S)|<li[^>]*>(.*?)</li>", re.MULTILINE | re.IGNORECASE)
+
+
+# Function to get the list of suggested fixes from an analysis report
+def extract_issues(report_text):
+    issues = []
+    for title, body in split_report(report_text):
+        if title in ISSUE_SECTIONS:
+            for match in _ISSUE_PATTERN.finditer(body):
+                issues.append(re.sub(r"<[^>]+>", "", match.group(1) or match.group(2)).strip())
+    return [issue for issue in issues if issue]
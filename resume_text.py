@@ -0,0 +1,169 @@
+import hashlib
+import os
+import re
+import unicodedata
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Resumes longer than this many tokens are analyzed in parallel chunks (map-reduce)
+CHUNKED_ANALYSIS_THRESHOLD = int(os.getenv("CHUNKED_ANALYSIS_THRESHOLD", "3000"))
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "1500"))
+
+# Edits touching more than this fraction of a resume are re-analyzed in full rather than as a delta
+DELTA_MAX_CHANGED = float(os.getenv("DELTA_MAX_CHANGED", "0.5"))
+
+
+# Common resume section headings, matched case-insensitively on their own line
+SECTION_HEADINGS = {
+    "summary", "professional summary", "profile", "objective", "career objective",
+    "experience", "work experience", "professional experience", "employment history", "work history",
+    "education", "skills", "technical skills", "core competencies",
+    "projects", "personal projects", "certifications", "licenses and certifications",
+    "awards", "honors and awards", "achievements", "publications", "research",
+    "volunteer experience", "volunteering", "leadership", "activities",
+    "languages", "interests", "references", "training", "courses",
+}
+
+# Bullet characters PDF extraction and word processors use at the start of list items
+BULLET_CHARACTERS = "\u2022\u2023\u25aa\u25ab\u25cf\u25e6\u2043\u2219\u00b7\u25a0\u25a1\u2013\u2014\u27a2\u2713\u2714\uf0b7\uf0a7*"
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_CAPS_HEADING_PATTERN = re.compile(r"^[A-Z][A-Z &/\-]{2,40}$")
+
+
+# Function to estimate the number of model tokens in a text without calling the API
+def estimate_tokens(text):
+    if not text:
+        return 0
+    # Words and punctuation are roughly one token each; long words split into several
+    pieces = _TOKEN_PATTERN.findall(text)
+    return sum(1 + len(piece) // 8 for piece in pieces)
+
+
+# Function to check whether a line of resume text is a section heading
+def is_section_heading(line):
+    stripped = line.strip().rstrip(":").strip()
+    if not stripped or len(stripped) > 40:
+        return False
+    if stripped.lower() in SECTION_HEADINGS:
+        return True
+    return bool(_CAPS_HEADING_PATTERN.match(stripped)) and len(stripped.split()) <= 4
+
+
+# Function to split resume text into (title, text) sections along its headings
+def split_sections(text):
+    sections = []
+    title = "Header"
+    lines = []
+    for line in text.splitlines():
+        if is_section_heading(line):
+            if any(l.strip() for l in lines):
+                sections.append((title, "\n".join(lines).strip()))
+            title = line.strip().rstrip(":").strip().title()
+            lines = [line]
+        else:
+            lines.append(line)
+    if any(l.strip() for l in lines):
+        sections.append((title, "\n".join(lines).strip()))
+    return sections
+
+
+# Function to split one oversized section into pieces of at most max_tokens
+def _split_long_section(title, text, max_tokens):
+    pieces = []
+    lines = []
+    tokens = 0
+    for line in text.splitlines():
+        line_tokens = estimate_tokens(line)
+        if lines and tokens + line_tokens > max_tokens:
+            pieces.append((title, "\n".join(lines)))
+            lines, tokens = [], 0
+        lines.append(line)
+        tokens += line_tokens
+    if lines:
+        pieces.append((title, "\n".join(lines)))
+    return pieces
+
+
+# Function to group resume sections into chunks of at most max_tokens each
+# Returns a list of chunks, each a list of (title, text) sections in document order
+def chunk_sections(sections, max_tokens):
+    chunks = []
+    current = []
+    current_tokens = 0
+    for title, text in sections:
+        section_tokens = estimate_tokens(text)
+        if section_tokens > max_tokens:
+            parts = _split_long_section(title, text, max_tokens)
+        else:
+            parts = [(title, text)]
+        for part_title, part_text in parts:
+            part_tokens = estimate_tokens(part_text)
+            if current and current_tokens + part_tokens > max_tokens:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append((part_title, part_text))
+            current_tokens += part_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# Function to find the sections that differ between two versions of a resume
+# Sections are paired by title (and by order among sections with the same title)
+# Returns [(title, old text, new text)] for every section changed, added (old text "") or removed (new text "")
+def diff_sections(old_text, new_text):
+    def by_title(text):
+        sections = {}
+        for title, section_text in split_sections(canonicalize(text)):
+            number = sum(1 for key in sections if key[0] == title)
+            sections[(title, number)] = section_text
+        return sections
+
+    old_sections = by_title(old_text)
+    new_sections = by_title(new_text)
+    keys = list(new_sections) + [key for key in old_sections if key not in new_sections]
+    return [
+        (key[0], old_sections.get(key, ""), new_sections.get(key, ""))
+        for key in keys
+        if old_sections.get(key, "") != new_sections.get(key, "")
+    ]
+
+
+_INVISIBLE_CHARACTERS = dict.fromkeys(map(ord, "\u00ad\u200b\u200c\u200d\u2060\ufeff"))
+_QUOTE_CHARACTERS = str.maketrans({"\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"'})
+_HYPHENATED_BREAK_PATTERN = re.compile(r"(\w)-\n[ \t]*([a-z])")
+# Dash-like bullets only count when a space follows, so "-5%" or "*Python*" keep their meaning
+_DASH_BULLETS = "-\u2013\u2014*"
+_BULLET_PATTERN = re.compile(
+    r"^[ \t]*(?:[" + re.escape(BULLET_CHARACTERS.translate({ord(c): None for c in _DASH_BULLETS})) + r"]"
+    r"|[" + re.escape(_DASH_BULLETS) + r"](?=[ \t]))[ \t]*(?=\S)",
+    re.MULTILINE,
+)
+_SPACES_PATTERN = re.compile(r"[ \t\f\v]+")
+_BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+
+
+# Function to normalize resume text so that edits which do not change its content compare equal
+# Unicode forms, invisible characters, quotes, line endings, bullets and spacing are normalized; the
+# result is what the prompts send, so nothing that could change the meaning of the text is rewritten
+def canonicalize(text):
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text)
+    text = text.translate(_INVISIBLE_CHARACTERS).translate(_QUOTE_CHARACTERS)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _SPACES_PATTERN.sub(" ", text)
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    text = _BULLET_PATTERN.sub("- ", text)
+    text = _BLANK_LINES_PATTERN.sub("\n\n", text)
+    return text.strip()
+
+
+# Function to get a stable fingerprint of a text's content (sha256 of its canonical form)
+# Words hyphenated across a line break are joined too; that is only safe for comparing texts,
+# since it also turns "well-\nknown" into "wellknown"
+def fingerprint(text):
+    text = _HYPHENATED_BREAK_PATTERN.sub(r"\1\2", canonicalize(text))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
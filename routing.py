@@ -0,0 +1,145 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from dotenv import load_dotenv
+
+import metrics
+import tracing
+from model_client import BREAKER_COOLDOWN, CircuitOpen, adaptive_timeout
+
+# Latency SLOs for interactive calls. A call that has not answered within its SLO (or is
+# refused because the circuit breaker is open) is answered from a local estimate instead
+# (see heuristics.py), and the real call is retried in the background. The refreshed
+# answer is kept here, keyed by the prompt's fingerprint, until the session picks it up.
+
+load_dotenv()
+
+# Seconds a user waits for each call type before getting an estimate
+SLO_SECONDS = {
+    "analysis": float(os.getenv("ANALYSIS_SLO", "25")),
+    "score": float(os.getenv("SCORE_SLO", "10")),
+    "chat": float(os.getenv("CHAT_SLO", "20")),
+}
+
+# Attempts a background refresh makes before giving up
+REFRESH_ATTEMPTS = int(os.getenv("REFRESH_ATTEMPTS", "3"))
+
+# Seconds before the second attempt of a refresh; each further attempt waits twice as long
+REFRESH_BACKOFF_SECONDS = 2
+
+# Finished refreshes kept for sessions to pick up
+MAX_KEPT_REFRESHES = 100
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="refresh")
+_lock = threading.Lock()
+_refreshes = OrderedDict()  # prompt fingerprint -> Future of the response text
+
+
+# Function to get the cutoff of an interactive call: its SLO, or the adaptive timeout if that is shorter
+# A call past its cutoff runs on to its own deadline (see model_client.call_model), so missing the SLO
+# does not count as a model failure
+def slo_timeout(call_type):
+    return min(SLO_SECONDS.get(call_type, 60), adaptive_timeout(call_type))
+
+
+# Function to run attempt number `attempt` of a refresh after `delay` seconds
+# The wait is a timer rather than a sleep, so a cooldown or backoff never holds a refresh thread
+def _schedule(result, function, attempt, delay=0):
+    run = tracing.wrap(_refresh)
+    if delay <= 0:
+        _executor.submit(run, result, function, attempt)
+        return
+    timer = threading.Timer(delay, _executor.submit, args=(run, result, function, attempt))
+    timer.daemon = True
+    timer.start()
+
+
+# Function to make one attempt of a background refresh, setting the result Future or scheduling the next attempt
+# While the breaker is open, the next attempt waits out the cooldown
+@tracing.traced("refresh")
+def _refresh(result, function, attempt):
+    tracing.set_attribute("attempt", attempt)
+    try:
+        text = function()
+    except CircuitOpen:
+        if attempt == REFRESH_ATTEMPTS:
+            metrics.increment("routing.refresh_failed")
+            result.set_exception(CircuitOpen("The model did not recover in time"))
+            return
+        _schedule(result, function, attempt + 1, BREAKER_COOLDOWN)
+    except Exception as e:
+        print(f"Background refresh attempt {attempt} failed: {str(e)}")
+        if attempt == REFRESH_ATTEMPTS:
+            metrics.increment("routing.refresh_failed")
+            result.set_exception(e)
+            return
+        _schedule(result, function, attempt + 1, REFRESH_BACKOFF_SECONDS * 2 ** (attempt - 1))
+    else:
+        metrics.increment("routing.refreshed")
+        result.set_result(text)
+
+
+# Function to finish a refresh with the answer of the call that missed its SLO, or start
+# calling again if that call failed
+def _adopt(result, function, pending):
+    try:
+        text = pending.result()
+    except Exception as e:
+        print(f"The call that missed its SLO failed: {str(e)}")
+        _schedule(result, function, 1)
+    else:
+        metrics.increment("routing.adopted")
+        metrics.increment("routing.refreshed")
+        result.set_result(text)
+
+
+# Function to get a Future of function(result) of another Future, e.g. the text of a pending response
+def then(future, function):
+    chained = Future()
+
+    def done(finished):
+        try:
+            chained.set_result(function(finished.result()))
+        except Exception as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(done)
+    return chained
+
+
+# Function to start refreshing an estimated answer in the background
+# function makes the real call and returns its text; one refresh runs per key.
+# pending is an optional Future of the same text from a call still running (see model_client.SloMissed):
+# its answer is used, and function is only called if it fails
+def start_refresh(key, function, pending=None):
+    with _lock:
+        future = _refreshes.get(key)
+        if future is None or (future.done() and future.exception() is not None):
+            metrics.increment("routing.fallbacks")
+            future = Future()
+            _refreshes[key] = future
+            if pending is None:
+                _schedule(future, function, 1)
+            else:
+                pending.add_done_callback(tracing.wrap(partial(_adopt, future, function)))
+        _refreshes.move_to_end(key)
+        while len(_refreshes) > MAX_KEPT_REFRESHES:
+            _refreshes.popitem(last=False)
+
+
+# Function to get the refreshed text for a key, or None if it is not ready (or failed)
+def refreshed(key):
+    with _lock:
+        future = _refreshes.get(key)
+    if future is None or not future.done() or future.exception() is not None:
+        return None
+    return future.result()
+
+
+# Function to check whether a refresh is still running for a key
+def refreshing(key):
+    with _lock:
+        future = _refreshes.get(key)
+    return future is not None and not future.done()
@@ -0,0 +1,49 @@
+# Synthetic resume and job description used by the load test and by warm-up (see
+# loadtest.py and warmup.py), so neither needs real resumes on disk.
+
+RESUME_LINES = [
+    "Jane Doe - jane.doe@example.com",
+    "SUMMARY",
+    "Software engineer with 3 years of experience building web applications.",
+    "EXPERIENCE",
+    "Software Engineer, Example Corp (2021 - Present)",
+    "- Built REST APIs in Python and Flask serving 1M requests per day",
+    "- Wrote React components and unit tests",
+    "EDUCATION",
+    "B.Tech in Computer Science, Example University (2021)",
+    "SKILLS",
+    "Python, JavaScript, React, Git, Docker",
+]
+
+JOB_DESCRIPTION = """Software Engineer
+We are looking for a software engineer to build and maintain web services.
+Requirements:
+- 2+ years of experience with Python and SQL
+- Experience with REST APIs, Docker and AWS
+- Bachelor's degree in Computer Science or a related field"""
+
+
+# Function to build a minimal one-page PDF with the given lines of text
+def make_resume_pdf(lines):
+    def escape(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    stream = "BT /F1 11 Tf 50 780 Td 14 TL\n" + "\n".join(f"({escape(line)}) '" for line in lines) + "\nET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n"
+    xref_offset = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n"
+    return pdf.encode("latin-1")
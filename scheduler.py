@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+import metrics
+
+# Local scheduler in front of every model call. Calls wait for one of the shared model
+# slots in priority classes; when a slot frees up it goes to the waiting call with the
+# earliest weighted-fair-queuing finish tag among the classes still under their own cap.
+# Interactive classes have larger weights, so a big batch run cannot starve the users
+# waiting on "Analyze Resume" or chat, and the bulk cap keeps slots free for them.
+
+load_dotenv()
+
+# Relative share of the model slots each class gets when all of them are waiting
+CLASS_WEIGHTS = {
+    "score": 8,
+    "analysis": 4,
+    "chat": 2,
+    "bulk": 1,
+}
+
+# Model calls the bulk class (batch screening) may have in flight at once; 0 means half the slots
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "0"))
+
+
+class Scheduler:
+    """Weighted fair queue for a fixed number of model slots with per-class concurrency caps"""
+
+    def __init__(self, concurrency, weights=None, limits=None):
+        self.concurrency = concurrency
+        self.weights = dict(weights or CLASS_WEIGHTS)
+        # Classes without a limit may use every slot
+        self.limits = dict(limits or {})
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._class_in_flight = {name: 0 for name in self.weights}
+        self._last_finish = {name: 0.0 for name in self.weights}
+        self._virtual_time = 0.0
+        self._waiting = []
+        self._sequence = 0
+
+    def _next_ticket(self):
+        # The waiting ticket with the earliest finish tag whose class is under its cap
+        if self._in_flight >= self.concurrency:
+            return None
+        for ticket in sorted(self._waiting):
+            priority_class = ticket[2]
+            limit = self.limits.get(priority_class, self.concurrency)
+            if self._class_in_flight[priority_class] < limit:
+                return ticket
+        return None
+
+    def acquire(self, priority_class, cost=1.0):
+        if priority_class not in self.weights:
+            raise ValueError(f"Unknown priority class: {priority_class}")
+        enqueued = time.monotonic()
+        with self._condition:
+            start_tag = max(self._virtual_time, self._last_finish[priority_class])
+            finish_tag = start_tag + cost / self.weights[priority_class]
+            self._last_finish[priority_class] = finish_tag
+            self._sequence += 1
+            ticket = (finish_tag, self._sequence, priority_class)
+            self._waiting.append(ticket)
+            while self._next_ticket() != ticket:
+                self._condition.wait()
+            self._waiting.remove(ticket)
+            self._virtual_time = max(self._virtual_time, start_tag)
+            self._in_flight += 1
+            self._class_in_flight[priority_class] += 1
+            # Another class may also be able to start now
+            self._condition.notify_all()
+        metrics.observe(f"queue.{priority_class}", time.monotonic() - enqueued)
+
+    def release(self, priority_class):
+        with self._condition:
+            self._in_flight -= 1
+            self._class_in_flight[priority_class] -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority_class, cost=1.0):
+        self.acquire(priority_class, cost)
+        try:
+            yield
+        finally:
+            self.release(priority_class)
+
+    def has_free_slot(self, priority_class):
+        # True if a call of this class would get a slot at once without taking one from a waiting call
+        with self._condition:
+            limit = self.limits.get(priority_class, self.concurrency)
+            return (self._next_ticket() is None and self._in_flight < self.concurrency
+                    and self._class_in_flight[priority_class] < limit)
+
+    def waiting(self):
+        with self._condition:
+            counts = {name: 0 for name in self.weights}
+            for _, _, priority_class in self._waiting:
+                counts[priority_class] += 1
+            return counts
+
+
+# Function to create the scheduler for a number of model slots
+# Bulk calls may use at most half of them unless BULK_CONCURRENCY says otherwise
+def create_scheduler(concurrency):
+    bulk_limit = BULK_CONCURRENCY or max(1, concurrency // 2)
+    return Scheduler(concurrency, CLASS_WEIGHTS, {"bulk": min(bulk_limit, concurrency)})
@@ -0,0 +1,199 @@
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from dotenv import load_dotenv
+
+# Content-addressed store for the large texts each session keeps (resume, edited resume,
+# job description, analysis). st.session_state only holds the sha256 digest of each text,
+# identical texts are stored once for the whole server, and the texts of idle sessions
+# are spilled to disk until the session comes back.
+
+load_dotenv()
+
+SESSION_STORE_COMPRESS = os.getenv("SESSION_STORE_COMPRESS", "false").lower() in ("1", "true", "yes")
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "900"))
+SESSION_EXPIRE_SECONDS = float(os.getenv("SESSION_EXPIRE_SECONDS", "86400"))
+# Parent folder of the spill folder; each server process spills into its own folder, removed at exit
+SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR", tempfile.gettempdir())
+SWEEP_INTERVAL = 60
+
+_lock = threading.RLock()
+_blobs = {}      # digest -> _Blob
+_sessions = {}   # session id -> {"fields": {field: digest}, "last_seen": monotonic time}
+_last_sweep = [time.monotonic()]
+_spill_dir = []  # this process's spill folder, once created
+
+
+class _Blob:
+    """One stored text: in memory (plain or zlib-compressed) or spilled to a file"""
+
+    def __init__(self, text):
+        self.refs = 0
+        self.path = None
+        self.data = None
+        self.compressed = False
+        self._keep(text)
+
+    def _keep(self, text):
+        if SESSION_STORE_COMPRESS:
+            self.data = zlib.compress(text.encode("utf-8"))
+            self.compressed = True
+        else:
+            self.data = text
+            self.compressed = False
+
+    def text(self):
+        if self.data is None:
+            with open(self.path, "rb") as f:
+                self._keep(zlib.decompress(f.read()).decode("utf-8"))
+            os.remove(self.path)
+            self.path = None
+        if self.compressed:
+            return zlib.decompress(self.data).decode("utf-8")
+        return self.data
+
+    def spill(self, digest):
+        if self.data is None:
+            return
+        self.path = os.path.join(_spill_directory(), digest)
+        with open(self.path, "wb") as f:
+            f.write(self.data if self.compressed else zlib.compress(self.data.encode("utf-8")))
+        self.data = None
+
+    def memory_bytes(self):
+        if self.data is None:
+            return 0
+        return len(self.data) if self.compressed else len(self.data.encode("utf-8"))
+
+    def discard(self):
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# Function to get this process's spill folder, creating it on first use
+# A folder of its own keeps two servers on one machine from reading or deleting each other's files
+def _spill_directory():
+    with _lock:
+        if not _spill_dir:
+            os.makedirs(SESSION_SPILL_DIR, exist_ok=True)
+            path = tempfile.mkdtemp(prefix="ats_checker_sessions_", dir=SESSION_SPILL_DIR)
+            atexit.register(shutil.rmtree, path, ignore_errors=True)
+            _spill_dir.append(path)
+        return _spill_dir[0]
+
+
+# Function to get the digest used as the key of a text
+def digest_of(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _release(digest):
+    blob = _blobs.get(digest)
+    if blob is None:
+        return
+    blob.refs -= 1
+    if blob.refs <= 0:
+        blob.discard()
+        del _blobs[digest]
+
+
+# Function to mark a session as active (its spilled texts are read back from disk on first use)
+def touch(session_id):
+    with _lock:
+        session = _sessions.setdefault(session_id, {"fields": {}, "last_seen": time.monotonic()})
+        session["last_seen"] = time.monotonic()
+    _maybe_sweep()
+
+
+# Function to store a text for a session field and return its digest (None for None)
+def put(session_id, field, text):
+    with _lock:
+        session = _sessions.setdefault(session_id, {"fields": {}, "last_seen": time.monotonic()})
+        session["last_seen"] = time.monotonic()
+        previous = session["fields"].pop(field, None)
+        digest = None
+        if text is not None:
+            digest = digest_of(text)
+            if digest not in _blobs:
+                _blobs[digest] = _Blob(text)
+            _blobs[digest].refs += 1
+            session["fields"][field] = digest
+        if previous is not None:
+            _release(previous)
+    _maybe_sweep()
+    return digest
+
+
+# Function to keep already stored texts for a session that are not in any of its fields
+# (e.g. the analyses of older resume versions): the session holds exactly these digests
+# from now on, and texts it held before but not any more are released
+def hold(session_id, digests):
+    with _lock:
+        session = _sessions.setdefault(session_id, {"fields": {}, "last_seen": time.monotonic()})
+        held = session.setdefault("held", set())
+        wanted = {digest for digest in digests if digest in _blobs}
+        for digest in wanted - held:
+            _blobs[digest].refs += 1
+        for digest in held - wanted:
+            _release(digest)
+        session["held"] = wanted
+
+
+# Function to get the text for a digest, or None if the digest is None or unknown
+def get(digest):
+    if digest is None:
+        return None
+    with _lock:
+        blob = _blobs.get(digest)
+        return blob.text() if blob is not None else None
+
+
+# Function to drop every text held for a session (e.g. when the app is reset)
+def release(session_id):
+    with _lock:
+        session = _sessions.pop(session_id, None)
+        if session is not None:
+            for digest in list(session["fields"].values()) + list(session.get("held", ())):
+                _release(digest)
+
+
+# Function to spill the texts of idle sessions to disk and forget expired sessions
+def sweep(now=None):
+    now = time.monotonic() if now is None else now
+    with _lock:
+        for session_id, session in list(_sessions.items()):
+            if now - session["last_seen"] > SESSION_EXPIRE_SECONDS:
+                release(session_id)
+
+        # Texts still used by an active session stay in memory
+        active = set()
+        for session in _sessions.values():
+            if now - session["last_seen"] <= SESSION_IDLE_SECONDS:
+                active.update(session["fields"].values())
+                active.update(session.get("held", ()))
+        for digest, blob in _blobs.items():
+            if digest not in active:
+                blob.spill(digest)
+        _last_sweep[0] = now
+
+
+def _maybe_sweep():
+    if time.monotonic() - _last_sweep[0] >= SWEEP_INTERVAL:
+        sweep()
+
+
+# Function to report how much the store holds, e.g. for load tests
+def stats():
+    with _lock:
+        return {
+            "sessions": len(_sessions),
+            "texts": len(_blobs),
+            "references": sum(blob.refs for blob in _blobs.values()),
+            "memory_bytes": sum(blob.memory_bytes() for blob in _blobs.values()),
+            "spilled_texts": sum(1 for blob in _blobs.values() if blob.data is None),
+        }
@@ -0,0 +1,369 @@
+"""Sharded batch screening across several machines.
+
+A screening job is planned into a manifest: a SQLite file on storage every node can
+reach, holding the job settings and the resumes split into shards. Workers on any node
+claim a shard by taking a lease on it, renew the lease while they work, and mark the
+shard done at the end; a shard whose lease runs out (its worker crashed or lost the
+network) goes back to the queue for another worker, at most MAX_SHARD_ATTEMPTS times
+before it is marked failed. Each worker writes a shard's results and checkpoint to its own
+files next to the manifest, starting from what the previous workers had checkpointed, so
+a shard taken over from a crashed worker continues after the last exported resume
+instead of paying for those analyses again, and a worker that lost its lease but is
+still running can never write into the new owner's files. Results are merged into CSV,
+JSON Lines or Parquet files, from the files of each shard's last owner, once every
+shard is done or failed.
+
+Near-duplicates are detected within each worker's shards (see batch.py); resumes that
+land in different workers' shards are analyzed separately.
+
+Usage: python shards.py plan resumes/ --manifest job.db --job-description jd.txt --shard-size 500
+       python shards.py work --manifest job.db          (on every node)
+       python shards.py status --manifest job.db
+       python shards.py merge --manifest job.db --output results.csv
+"""
+import argparse
+import glob
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+from ats_systems import ATS_SYSTEMS
+from batch import find_resumes, open_reports, screen
+from corpus import Corpus
+from dedupe import DEDUPE_THRESHOLD, MinHashIndex
+from export import EXPORT_BUFFER_ROWS, RESULT_FIELDS, Checkpoint, ResultExporter
+
+# Seconds a claimed shard stays with its worker without a heartbeat
+LEASE_SECONDS = 120
+
+# Claims after which a shard whose lease ran out is marked failed instead of handed out
+# again (e.g. a resume that crashes every worker that reads it)
+MAX_SHARD_ATTEMPTS = 3
+
+# Results buffered before they are checkpointed; kept small so a crashed worker's
+# successor repeats few analyses
+SHARD_BUFFER_ROWS = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY,
+    paths TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    finished_at REAL
+);
+"""
+
+
+class Manifest:
+    """Job settings and shard leases in a SQLite file shared by all workers"""
+
+    def __init__(self, path):
+        self.path = path
+        self.results_dir = f"{path}.results"
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.executescript(_SCHEMA)
+
+    # Run statements in one write transaction, so concurrent workers never claim the same shard
+    def _write(self, function):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = function(self._db)
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    # Function to save the job settings and split the resumes into shards
+    def plan(self, job, paths, shard_size):
+        def plan_shards(db):
+            if db.execute("SELECT COUNT(*) FROM shards").fetchone()[0]:
+                raise ValueError(f"{self.path} already has a plan")
+            db.executemany("INSERT INTO job (key, value) VALUES (?, ?)",
+                           [(key, json.dumps(value)) for key, value in job.items()])
+            db.executemany("INSERT INTO shards (paths) VALUES (?)",
+                           [(json.dumps(paths[start:start + shard_size]),) for start in range(0, len(paths), shard_size)])
+        self._write(plan_shards)
+        os.makedirs(self.results_dir, exist_ok=True)
+
+    def job(self):
+        with self._lock:
+            return {key: json.loads(value) for key, value in self._db.execute("SELECT key, value FROM job")}
+
+    # Function to claim the next pending shard, or one whose lease has run out; returns (id, paths) or None
+    # Shards whose lease ran out after max_attempts claims are marked failed instead
+    def claim(self, worker, lease_seconds=LEASE_SECONDS, max_attempts=MAX_SHARD_ATTEMPTS):
+        def claim_shard(db):
+            now = time.time()
+            db.execute("UPDATE shards SET status = 'failed', lease_until = NULL "
+                       "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?", (now, max_attempts))
+            row = db.execute(
+                "SELECT id, paths FROM shards WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE shards SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                       "WHERE id = ?", (worker, now + lease_seconds, row[0]))
+            return row[0], json.loads(row[1])
+        return self._write(claim_shard)
+
+    # Function to renew a lease; returns False if the shard has been taken over by another worker
+    def heartbeat(self, shard_id, worker, lease_seconds=LEASE_SECONDS):
+        def renew(db):
+            return db.execute("UPDATE shards SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                              (time.time() + lease_seconds, shard_id, worker)).rowcount == 1
+        return self._write(renew)
+
+    # Function to mark a shard done; returns False if the lease was lost first
+    def complete(self, shard_id, worker):
+        def finish(db):
+            return db.execute("UPDATE shards SET status = 'done', lease_until = NULL, finished_at = ? "
+                              "WHERE id = ? AND worker = ? AND status = 'leased'",
+                              (time.time(), shard_id, worker)).rowcount == 1
+        return self._write(finish)
+
+    # Function to give a shard back to the queue (e.g. when its worker is stopped)
+    def release(self, shard_id, worker):
+        def give_back(db):
+            db.execute("UPDATE shards SET status = 'pending', worker = NULL, lease_until = NULL "
+                       "WHERE id = ? AND worker = ? AND status = 'leased'", (shard_id, worker))
+        self._write(give_back)
+
+    # Function to count shards by status ("leased" ones past their lease count as "expired")
+    def progress(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT CASE WHEN status = 'leased' AND lease_until < ? THEN 'expired' ELSE status END, COUNT(*) "
+                "FROM shards GROUP BY 1", (time.time(),)).fetchall()
+        return dict(rows)
+
+    def shard_ids(self):
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT id FROM shards ORDER BY id")]
+
+    # Function to get the worker that finished each done shard, as {shard id: worker}
+    def owners(self):
+        with self._lock:
+            return dict(self._db.execute("SELECT id, worker FROM shards WHERE status = 'done' ORDER BY id"))
+
+    # Paths of a worker's results and checkpoint files for a shard
+    def shard_files(self, shard_id, worker):
+        base = os.path.join(self.results_dir, f"shard-{shard_id:06d}.{worker}")
+        return f"{base}.jsonl", f"{base}.ckpt"
+
+    # Paths of the results and checkpoint files other workers wrote for a shard
+    def previous_files(self, shard_id, worker):
+        own = self.shard_files(shard_id, worker)[0]
+        pattern = os.path.join(glob.escape(self.results_dir), f"shard-{shard_id:06d}.*.jsonl")
+        return [(path, path[:-len(".jsonl")] + ".ckpt") for path in sorted(glob.glob(pattern)) if path != own]
+
+    def close(self):
+        self._db.close()
+
+
+class Heartbeat:
+    """Renews a shard's lease in the background; lost is set if another worker took it over"""
+
+    def __init__(self, manifest, shard_id, worker, lease_seconds=LEASE_SECONDS):
+        self.lost = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(manifest, shard_id, worker, lease_seconds), daemon=True)
+
+    def _run(self, manifest, shard_id, worker, lease_seconds):
+        while not self._stopped.wait(lease_seconds / 3):
+            try:
+                if not manifest.heartbeat(shard_id, worker, lease_seconds):
+                    self.lost.set()
+                    return
+            except sqlite3.Error as e:
+                # A missed heartbeat is retried; the lease only runs out after several
+                print(f"Heartbeat for shard {shard_id} failed: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+        return False
+
+
+# Function to read the complete lines of a file another worker may still be appending to
+def _complete_lines(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [line for line in f if line.endswith("\n") and line.strip()]
+
+
+# Function to start a worker's files for a shard from what previous workers exported and checkpointed
+def adopt_shard(manifest, shard_id, worker):
+    results_path, checkpoint_path = manifest.shard_files(shard_id, worker)
+    if os.path.exists(results_path):
+        return
+    rows, keys = {}, set()
+    for previous_results, previous_checkpoint in manifest.previous_files(shard_id, worker):
+        # The checkpoint is read first: a key checkpointed by then has its row written already
+        keys.update(_complete_lines(previous_checkpoint))
+        for line in _complete_lines(previous_results):
+            try:
+                rows[json.loads(line)["file"]] = line
+            except (ValueError, KeyError):
+                continue
+    # Rows before their checkpoint, as the exporter writes them
+    with open(results_path, "w", encoding="utf-8") as f:
+        f.writelines(rows.values())
+    with open(checkpoint_path, "w", encoding="utf-8") as f:
+        f.writelines(sorted(keys))
+
+
+# Function to screen one claimed shard into this worker's files; returns False if the lease was lost
+# Results not yet written when the lease is lost are dropped; the new owner analyzes them again
+def work_shard(manifest, shard_id, paths, worker, job, workers=4, index=None, corpus=None,
+               lease_seconds=LEASE_SECONDS, buffer_rows=SHARD_BUFFER_ROWS, reports=None):
+    adopt_shard(manifest, shard_id, worker)
+    results_path, checkpoint_path = manifest.shard_files(shard_id, worker)
+    checkpoint = Checkpoint(checkpoint_path)
+    exporter = ResultExporter([results_path], checkpoint, buffer_rows)
+    with Heartbeat(manifest, shard_id, worker, lease_seconds) as heartbeat:
+        try:
+            for key, result in screen(paths, job["job_description"], job["ats"], job["job_level"], job["job_role"],
+                                      workers, index, job["on_duplicate"], corpus=corpus, skip=checkpoint,
+                                      reports=reports):
+                if heartbeat.lost.is_set():
+                    exporter.discard()
+                    break
+                exporter.add(result, key if result["status"] != "error" else None)
+        finally:
+            if heartbeat.lost.is_set():
+                exporter.discard()
+            exporter.close()
+    if heartbeat.lost.is_set():
+        return False
+    return manifest.complete(shard_id, worker)
+
+
+# Function to merge the results of every done shard into the output files, in shard order
+# Only the files of the worker that finished a shard are read; a resume exported twice
+# (after a crash between its row and its checkpoint) keeps its last result
+def merge(manifest, outputs, buffer_rows=EXPORT_BUFFER_ROWS):
+    exporter = ResultExporter(outputs, buffer_rows=buffer_rows)
+    try:
+        for shard_id, worker in manifest.owners().items():
+            results_path, _ = manifest.shard_files(shard_id, worker)
+            if not os.path.exists(results_path):
+                continue
+            rows = {}
+            with open(results_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        rows[row["file"]] = {field: row.get(field) for field in RESULT_FIELDS}
+            for row in rows.values():
+                exporter.add(row)
+    finally:
+        exporter.close()
+    return exporter.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan, work on and merge a sharded screening job")
+    parser.add_argument("command", choices=["plan", "work", "status", "merge"])
+    parser.add_argument("resumes", nargs="?", help="Folder with the resumes (plan only)")
+    parser.add_argument("--manifest", required=True, help="SQLite manifest on storage shared by all workers")
+    parser.add_argument("--job-description", help="Text file with the job description (plan only)")
+    parser.add_argument("--ats", default="Generic ATS", choices=list(ATS_SYSTEMS), help="ATS system to focus on")
+    parser.add_argument("--job-level", default="", help="Job level, as in the app")
+    parser.add_argument("--job-role", default="", help="Job role, as in the app")
+    parser.add_argument("--on-duplicate", choices=["reuse", "flag"], default="reuse",
+                        help="Reuse the first copy's analysis, or only flag near-duplicates")
+    parser.add_argument("--shard-size", type=int, default=500, help="Resumes per shard (plan only)")
+    parser.add_argument("--workers", type=int, default=4, help="Resumes analyzed at once by this worker")
+    parser.add_argument("--buffer-rows", type=int, default=SHARD_BUFFER_ROWS,
+                        help="Results held in memory between checkpoints (work only)")
+    parser.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS,
+                        help="Seconds without a heartbeat before a shard goes back to the queue")
+    parser.add_argument("--max-attempts", type=int, default=MAX_SHARD_ATTEMPTS,
+                        help="Claims after which a shard whose lease ran out is marked failed (work only)")
+    parser.add_argument("--dedupe-threshold", type=float, default=DEDUPE_THRESHOLD,
+                        help="Similarity at or above which resumes count as near-duplicates")
+    parser.add_argument("--corpus", help="Corpus of extracted text (see corpus.py) to read from and add to")
+    parser.add_argument("--output", action="append", help="Merged results file: .csv, .jsonl or .parquet (merge only)")
+    args = parser.parse_args()
+
+    manifest = Manifest(args.manifest)
+    try:
+        if args.command == "plan":
+            if not args.resumes or not args.job_description:
+                parser.error("plan needs a resumes folder and --job-description")
+            with open(args.job_description, encoding="utf-8") as f:
+                job_description = f.read()
+            paths = [os.path.abspath(path) for path in find_resumes(args.resumes)]
+            if not paths:
+                print(f"No resumes found in {args.resumes}")
+                return 1
+            manifest.plan({"job_description": job_description, "ats": args.ats, "job_level": args.job_level,
+                           "job_role": args.job_role, "on_duplicate": args.on_duplicate}, paths, args.shard_size)
+            print(f"Planned {len(paths)} resumes in {len(manifest.shard_ids())} shards")
+
+        elif args.command == "work":
+            job = manifest.job()
+            worker = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+            # The shards this worker claims share one near-duplicate index and the analyses it refers to
+            index = MinHashIndex(args.dedupe_threshold)
+            reports = open_reports()
+            corpus = Corpus(args.corpus) if args.corpus else None
+            done = 0
+            while True:
+                claimed = manifest.claim(worker, args.lease_seconds, args.max_attempts)
+                if claimed is None:
+                    break
+                shard_id, paths = claimed
+                print(f"Shard {shard_id}: {len(paths)} resumes")
+                try:
+                    if work_shard(manifest, shard_id, paths, worker, job, args.workers, index, corpus, args.lease_seconds,
+                                  args.buffer_rows, reports):
+                        done += 1
+                    else:
+                        print(f"Shard {shard_id} was taken over by another worker")
+                except KeyboardInterrupt:
+                    manifest.release(shard_id, worker)
+                    raise
+            print(f"No shards left; this worker finished {done}. Progress: {manifest.progress()}")
+
+        elif args.command == "status":
+            progress = manifest.progress()
+            print(", ".join(f"{count} {status}" for status, count in sorted(progress.items())) or "No shards")
+
+        else:
+            progress = manifest.progress()
+            if set(progress) - {"done", "failed"}:
+                print(f"Not every shard is done yet: {progress}")
+                return 1
+            if progress.get("failed"):
+                print(f"{progress['failed']} shards failed after {MAX_SHARD_ATTEMPTS} attempts; "
+                      "their resumes are not in the merged results")
+            outputs = args.output or ["screening_results.csv"]
+            counts = merge(manifest, outputs)
+            print(f"Merged {sum(counts.values())} results: "
+                  + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+            print(f"Results written to {', '.join(outputs)}")
+    finally:
+        manifest.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+import json
+import os
+import re
+import threading
+import zlib
+from functools import lru_cache
+from dotenv import load_dotenv
+import numpy as np
+
+from resume_text import canonicalize
+
+# Local skill matching that knows synonyms. Every term a resume or job description uses
+# for a skill ("JS", "k8s", "ML", "reactjs") is resolved to one canonical skill
+# ("JavaScript", "Kubernetes", "Machine Learning", "React"), first through the alias
+# table and then, for spellings of one word the table does not list ("postgre",
+# "kubernets"), through the nearest alias by character n-gram similarity. Terms are embedded as
+# hashed character trigram vectors (NumPy arrays) and looked up in a random-hyperplane
+# LSH index, so a batch of terms is resolved with a few matrix products and no network
+# access, even with a large vocabulary loaded from SKILLS_FILE.
+
+load_dotenv()
+
+# Optional JSON file of extra skills: {"Canonical Name": ["alias", ...]}; the name itself is matched too
+SKILLS_FILE = os.getenv("SKILLS_FILE", "")
+# Cosine similarity (0-1) a spelling needs to an alias to count as that skill
+SKILL_SIMILARITY = float(os.getenv("SKILL_SIMILARITY", "0.72"))
+
+VECTOR_DIMENSIONS = 1024
+# 20 tables of 8 bits find an alias with similarity 0.72 about 90% of the time, 0.8 about 97%
+LSH_TABLES = 20
+LSH_BITS = 8
+# Longest skill name looked up, in words, and shortest word matched by similarity, both as
+# a term and as an alias (names of several words are only matched exactly, and short aliases
+# like "swift" are too close to ordinary words like "swiftly" to be matched by similarity)
+MAX_TERM_WORDS = 3
+MIN_FUZZY_LENGTH = 6
+
+# Canonical skill -> the ways resumes and job descriptions write it
+# Ambiguous English words ("go", "express", "spring", "rest", "react") are only listed in
+# unambiguous forms; see CASED_ALIASES for the capitalized ones
+SKILL_ALIASES = {
+    "JavaScript": ["js", "javascript", "ecmascript", "es6", "vanilla js"],
+    "TypeScript": ["typescript"],
+    "Python": ["python", "python3"],
+    "Java": ["java", "core java", "java se", "java ee", "j2ee"],
+    "C++": ["c++", "cpp", "cplusplus"],
+    "C#": ["c#", "csharp", "c sharp"],
+    "Go": ["golang", "go lang"],
+    "Rust": ["rust", "rustlang"],
+    "Ruby": ["ruby"],
+    "Ruby on Rails": ["rails", "ruby on rails", "ror"],
+    "PHP": ["php"],
+    "Kotlin": ["kotlin"],
+    "Swift": ["swiftui", "swift programming", "swift language"],
+    "Scala": ["scala"],
+    "SQL": ["sql", "structured query language", "t-sql", "pl/sql"],
+    "PostgreSQL": ["postgresql", "postgres", "psql"],
+    "MySQL": ["mysql"],
+    "MongoDB": ["mongodb", "mongo"],
+    "Redis": ["redis"],
+    "NoSQL": ["nosql", "no-sql"],
+    "React": ["reactjs", "react.js", "react js"],
+    "React Native": ["react native"],
+    "Angular": ["angular", "angularjs", "angular.js"],
+    "Vue.js": ["vue", "vuejs", "vue.js"],
+    "Node.js": ["nodejs", "node.js", "node js"],
+    "Express.js": ["express.js", "expressjs", "express js"],
+    "Next.js": ["next.js", "nextjs"],
+    "Django": ["django"],
+    "Flask": ["flask"],
+    "FastAPI": ["fastapi"],
+    "Spring Boot": ["spring boot", "springboot", "spring framework"],
+    "HTML": ["html", "html5"],
+    "CSS": ["css", "css3"],
+    "Tailwind CSS": ["tailwind", "tailwindcss", "tailwind css"],
+    "REST APIs": ["restful", "rest api", "rest apis", "restful apis"],
+    "GraphQL": ["graphql"],
+    "Microservices": ["microservices", "microservice", "micro services"],
+    "Docker": ["docker", "containerization", "docker containers"],
+    "Kubernetes": ["kubernetes", "k8s", "kube"],
+    "Terraform": ["terraform"],
+    "AWS": ["aws", "amazon web services", "ec2", "s3", "aws lambda"],
+    "Azure": ["azure", "microsoft azure"],
+    "Google Cloud": ["gcp", "google cloud", "google cloud platform"],
+    "CI/CD": ["ci/cd", "cicd", "ci cd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "Jenkins": ["jenkins"],
+    "GitHub Actions": ["github actions"],
+    "Git": ["git", "github", "gitlab", "version control"],
+    "Linux": ["linux", "unix", "bash", "shell scripting"],
+    "Agile": ["agile", "scrum", "kanban"],
+    "Unit Testing": ["unit testing", "unit tests", "jest", "pytest", "junit", "tdd", "test driven development"],
+    "Data Structures and Algorithms": ["dsa", "data structures", "algorithms", "data structures and algorithms"],
+    "Object-Oriented Programming": ["oop", "oops", "object oriented programming", "object-oriented programming"],
+    "System Design": ["system design", "distributed systems"],
+    "Machine Learning": ["ml", "machine learning"],
+    "Deep Learning": ["dl", "deep learning", "neural networks"],
+    "Artificial Intelligence": ["ai", "artificial intelligence"],
+    "Natural Language Processing": ["nlp", "natural language processing"],
+    "Computer Vision": ["computer vision", "opencv"],
+    "Large Language Models": ["llm", "llms", "large language models", "generative ai", "genai"],
+    "TensorFlow": ["tensorflow", "keras"],
+    "PyTorch": ["pytorch", "torch"],
+    "scikit-learn": ["scikit-learn", "sklearn", "scikit learn"],
+    "Pandas": ["pandas"],
+    "NumPy": ["numpy"],
+    "Apache Spark": ["pyspark", "apache spark"],
+    "Apache Kafka": ["kafka", "apache kafka"],
+    "Apache Airflow": ["airflow", "apache airflow"],
+    "Hadoop": ["hadoop", "hdfs", "mapreduce"],
+    "ETL": ["etl", "elt", "data pipelines", "data pipeline"],
+    "Data Warehousing": ["data warehouse", "data warehousing", "snowflake", "bigquery", "redshift"],
+    "Statistics": ["statistics", "statistical analysis", "hypothesis testing", "a/b testing"],
+    "Data Visualization": ["data visualization", "data visualisation", "matplotlib", "seaborn", "plotly"],
+    "Tableau": ["tableau"],
+    "Power BI": ["power bi", "powerbi"],
+    "Excel": ["ms excel", "microsoft excel", "spreadsheets"],
+    "R": ["r programming", "rstudio", "r language"],
+    "MATLAB": ["matlab"],
+    "Figma": ["figma"],
+    "UI/UX Design": ["ui/ux", "ux", "ui design", "ux design", "user experience", "user interface design"],
+    "Android": ["android", "android development"],
+    "iOS": ["ios", "ios development"],
+    "Cybersecurity": ["cybersecurity", "cyber security", "information security", "infosec"],
+    "Project Management": ["project management", "pmp"],
+    "Communication": ["communication", "communication skills"],
+    "Leadership": ["leadership", "team leadership", "mentoring"],
+}
+
+# Skill names that are also ordinary English words: they only count written as a name,
+# capitalized ("React", "REST"), never in lowercase ("react swiftly", "the rest of")
+CASED_ALIASES = {
+    "REST": "REST APIs",
+    "React": "React",
+    "Node": "Node.js",
+    "Swift": "Swift",
+    "Excel": "Excel",
+    "Spark": "Apache Spark",
+    "Lambda": "AWS",
+}
+
+_TERM_PATTERN = re.compile(r"[a-z][a-z0-9+#]*(?:[./-][a-z0-9+#]+)*")
+_CASED_TERM_PATTERN = re.compile(_TERM_PATTERN.pattern, re.IGNORECASE)
+
+
+# Function to load the built-in skills plus those in SKILLS_FILE, as {alias: canonical skill}
+def load_aliases(path=None):
+    skills = {name: list(aliases) for name, aliases in SKILL_ALIASES.items()}
+    path = path if path is not None else SKILLS_FILE
+    if path:
+        try:
+            with open(path, encoding="utf-8") as f:
+                for name, aliases in json.load(f).items():
+                    skills.setdefault(name, []).extend([name] + aliases)
+        except (OSError, ValueError) as e:
+            print(f"Could not load skills from {path}: {str(e)}")
+    aliases = {}
+    for name, names in skills.items():
+        for alias in names:
+            aliases.setdefault(" ".join(_TERM_PATTERN.findall(alias.lower())) or alias.lower(), name)
+    return aliases
+
+
+# Function to embed a term as a unit vector of hashed character trigram counts
+# crc32 is used instead of hash() so vectors stay the same across processes
+@lru_cache(maxsize=65536)
+def term_vector(term):
+    vector = np.zeros(VECTOR_DIMENSIONS, dtype=np.float32)
+    padded = f"#{term}#"
+    for start in range(len(padded) - 2):
+        vector[zlib.crc32(padded[start:start + 3].encode("utf-8")) % VECTOR_DIMENSIONS] += 1
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+# Function to embed a batch of terms as the rows of one matrix
+def term_vectors(terms):
+    if not terms:
+        return np.zeros((0, VECTOR_DIMENSIONS), dtype=np.float32)
+    return np.stack([term_vector(term) for term in terms])
+
+
+class SkillIndex:
+    """Resolves terms to canonical skills: exact aliases first, then the most similar alias via LSH"""
+
+    def __init__(self, aliases=None, similarity=None, tables=LSH_TABLES, bits=LSH_BITS):
+        self.aliases = load_aliases() if aliases is None else aliases
+        self.similarity = SKILL_SIMILARITY if similarity is None else similarity
+        # Only one-word terms are matched by similarity, so only one-word aliases long enough are indexed
+        self.names = [alias for alias in self.aliases if " " not in alias and len(alias) >= MIN_FUZZY_LENGTH]
+        self.vectors = term_vectors(self.names)
+        # Fixed seed, so every process hashes terms into the same buckets
+        self.planes = np.random.default_rng(20240601).standard_normal((tables, bits, VECTOR_DIMENSIONS)).astype(np.float32)
+        self._weights = 1 << np.arange(bits, dtype=np.int64)
+        self.buckets = [{} for _ in range(tables)]
+        for table, keys in enumerate(self._bucket_keys(self.vectors)):
+            for row, key in enumerate(keys.tolist()):
+                self.buckets[table].setdefault(key, []).append(row)
+
+    # Returns a (tables, terms) array with each term's bucket in every table
+    def _bucket_keys(self, vectors):
+        signs = np.einsum("tbd,nd->tnb", self.planes, vectors) > 0
+        return signs.astype(np.int64) @ self._weights
+
+    # Function to resolve a batch of terms, returns the canonical skill of each (or None)
+    def resolve(self, terms):
+        results = [self.aliases.get(term) for term in terms]
+        fuzzy = [number for number, term in enumerate(terms)
+                 if results[number] is None and len(term) >= MIN_FUZZY_LENGTH and " " not in term]
+        if not fuzzy or not self.names:
+            return results
+        vectors = term_vectors([terms[number] for number in fuzzy])
+        keys = self._bucket_keys(vectors)
+        for position, number in enumerate(fuzzy):
+            candidates = set()
+            for table in range(len(self.buckets)):
+                candidates.update(self.buckets[table].get(int(keys[table, position]), ()))
+            if not candidates:
+                continue
+            rows = np.fromiter(candidates, dtype=np.int64)
+            similarities = self.vectors[rows] @ vectors[position]
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity:
+                results[number] = self.aliases[self.names[rows[best]]]
+        return results
+
+    # Function to find the skills a text mentions, as {canonical skill: [terms used for it]} in order of first mention
+    # Longer names win: "react native" is React Native, not React
+    def find(self, text):
+        words = _CASED_TERM_PATTERN.findall(canonicalize(text or ""))
+        tokens = [word.lower() for word in words]
+        terms = []
+        for size in range(MAX_TERM_WORDS, 0, -1):
+            terms.extend((start, size, " ".join(tokens[start:start + size]))
+                         for start in range(len(tokens) - size + 1))
+        unique = list(dict.fromkeys(term for _, _, term in terms))
+        resolved = dict(zip(unique, self.resolve(unique)))
+
+        found = {}
+        used = set()
+        for start, size, term in sorted(terms, key=lambda item: (item[0], -item[1])):
+            skill = resolved[term]
+            if skill is None and size == 1:
+                skill = CASED_ALIASES.get(words[start])
+            positions = set(range(start, start + size))
+            if skill is None or positions & used:
+                continue
+            used |= positions
+            found.setdefault(skill, [])
+            if term not in found[skill]:
+                found[skill].append(term)
+        return found
+
+
+_index_lock = threading.Lock()
+_index = []
+
+
+# Function to get the skill index shared by the whole process, built on first use
+def skill_index():
+    with _index_lock:
+        if not _index:
+            _index.append(SkillIndex())
+        return _index[0]
+
+
+# Function to find the canonical skills a text mentions, as {canonical skill: [terms used for it]}
+def find_skills(text):
+    return skill_index().find(text)
+
+
+# Function to resolve a batch of terms to canonical skills (None for terms that are not skills)
+def resolve_terms(terms):
+    return skill_index().resolve([" ".join(_TERM_PATTERN.findall(term.lower())) for term in terms])
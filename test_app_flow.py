@@ -0,0 +1,83 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import job_index
+import model_client
+import session_store
+from samples import RESUME_LINES, make_resume_pdf
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+@pytest.fixture
+def app(monkeypatch):
+    # Stub model answers instantly, without an API key
+    monkeypatch.setattr(model_client, "MODEL_BACKEND", "stub")
+    monkeypatch.setattr(model_client, "STUB_LATENCY", 0)
+    monkeypatch.setattr(model_client, "_models", {})
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.run()
+    at.file_uploader[0].set_value(("resume.pdf", make_resume_pdf(RESUME_LINES), "application/pdf")).run()
+    at.checkbox[0].check().run()  # use a job description template
+    return at
+
+
+def click(at, label):
+    next(button for button in at.button if button.label == label).click().run()
+
+
+def edit_resume(at, text):
+    at.text_area(key="resume_editor").set_value(text).run()
+
+
+def test_versions_keep_their_analyses(app):
+    click(app, "Analyze Resume")
+    original = session_store.get(app.session_state["pdf_text"])
+
+    edit_resume(app, original + "\nSQL, AWS")
+    click(app, "Update Score")
+    edit_resume(app, original + "\nSQL, AWS, Kubernetes")
+    click(app, "Update Analysis")
+    edit_resume(app, original + "\nSQL, AWS, Kubernetes, Terraform")
+    click(app, "Update Analysis")
+
+    versions = app.session_state["resume_versions"]
+    analyses = [version["analysis"] for version in versions if version.get("analysis")]
+    assert len(set(analyses)) >= 3
+    assert all(session_store.get(digest) is not None for digest in analyses)
+
+    # Restoring the original brings back its own analysis with its score
+    app.selectbox[-1].set_value(0).run()
+    click(app, "Restore Version")
+    assert app.session_state["analysis_response"] == versions[0]["analysis"]
+    assert app.session_state["current_score"] == versions[0]["score"]
+
+
+def test_job_library_search_filters_by_level_and_role(monkeypatch, tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    (library / "senior.txt").write_text("Senior Backend Engineer\nJob Level: Advanced (5+ years)\nJob Role: Software Development Engineer\n"
+                                        "Python, SQL and AWS", encoding="utf-8")
+    (library / "analyst.txt").write_text("Data Analyst\nJob Level: Entry Level/Fresher\nJob Role: Data Analyst/Scientist\n"
+                                         "Python, SQL and Tableau", encoding="utf-8")
+    index = job_index.JobIndex()
+    job_index.update_index(index, str(library))
+    index.save(str(tmp_path / "jobs.json"))
+    monkeypatch.setattr(job_index, "JOB_INDEX", str(tmp_path / "jobs.json"))
+    monkeypatch.setattr(model_client, "MODEL_BACKEND", "stub")
+    monkeypatch.setattr(model_client, "_models", {})
+
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.run()
+    next(box for box in at.checkbox if "job library" in box.label).check().run()
+    at.file_uploader[0].set_value(("resume.pdf", make_resume_pdf(RESUME_LINES), "application/pdf")).run()
+
+    assert len(next(box for box in at.selectbox if box.label == "Select a matching posting:").options) == 2
+
+    levels = next(box for box in at.selectbox if box.label == "Postings for job level:")
+    levels.select("Entry Level/Fresher").run()
+    matching = next(box for box in at.selectbox if box.label == "Select a matching posting:")
+    assert matching.value["id"] == "analyst.txt"
+    assert len(matching.options) == 1
@@ -0,0 +1,72 @@
+import json
+
+import batch
+from dedupe import MinHashIndex
+from model_client import StubModel
+
+JOB_DESCRIPTION = "Backend engineer with Python, SQL, Docker and AWS experience."
+
+
+# Function to write resumes different enough that none is a near-duplicate of another
+def write_resumes(folder, count):
+    skills = ["Python Flask PostgreSQL", "Java Spring Kafka", "Go Kubernetes Terraform",
+              "React TypeScript GraphQL", "Rust embedded firmware", "Scala Spark Airflow"]
+    paths = []
+    for number in range(count):
+        path = folder / f"resume_{number}.txt"
+        path.write_text(f"Candidate {number}\nSKILLS\n{skills[number]}\nEXPERIENCE\n"
+                        + " ".join(f"project{number}_{word}" for word in range(80)), encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def test_interrupted_run_saves_only_finished_analyses(tmp_path):
+    paths = write_resumes(tmp_path, 4)
+    index = MinHashIndex()
+    index_path = tmp_path / "index.json"
+    results = batch.screen(paths, JOB_DESCRIPTION, "Generic ATS", workers=1, index=index,
+                           model=StubModel(latency=0.05), reports=batch.open_reports(str(index_path)))
+    next(results)  # interrupted after the first result, with the others still in flight
+    batch.save_index(index, str(index_path))
+    results.close()
+
+    saved = MinHashIndex.load(str(index_path))
+    finished = len(saved)
+    assert 1 <= finished < 4
+
+    rerun = [result for _, result in batch.screen(paths, JOB_DESCRIPTION, "Generic ATS", workers=1,
+                                                  index=saved, model=StubModel(latency=0),
+                                                  reports=batch.open_reports(str(index_path)))]
+    assert [result["status"] for result in rerun].count("error") == 0
+    assert sum(result["status"] == "analyzed" for result in rerun) == 4 - finished
+    assert all(result["score"] for result in rerun)
+
+
+def test_failed_analysis_is_not_saved(tmp_path):
+    class FailingModel:
+        def generate_content(self, contents):
+            raise RuntimeError("model down")
+
+    paths = write_resumes(tmp_path, 2)
+    index = MinHashIndex()
+    results = [result for _, result in batch.screen(paths, JOB_DESCRIPTION, "Generic ATS", workers=1,
+                                                    index=index, model=FailingModel())]
+    assert [result["status"] for result in results] == ["error", "error"]
+    batch.save_index(index, str(tmp_path / "index.json"))
+    assert len(MinHashIndex.load(str(tmp_path / "index.json"))) == 0
+
+
+def test_index_keeps_only_the_score_and_a_reference_to_the_report(tmp_path):
+    paths = write_resumes(tmp_path, 1)
+    copy = tmp_path / "resume_copy.txt"
+    copy.write_text(open(paths[0], encoding="utf-8").read() + "\nReferences on request", encoding="utf-8")
+    index = MinHashIndex()
+    results = [result for _, result in batch.screen(paths + [str(copy)], JOB_DESCRIPTION, "Generic ATS", workers=1,
+                                                    index=index, model=StubModel(latency=0))]
+
+    assert [result["status"] for result in results] == ["analyzed", "duplicate"]
+    assert results[1]["analysis"] == results[0]["analysis"]
+    assert results[1]["score"] == results[0]["score"]
+    batch.save_index(index, str(tmp_path / "index.json"))
+    saved = json.loads((tmp_path / "index.json").read_text())
+    assert [sorted(entry["payload"]) for entry in saved["entries"]] == [["file", "key", "score"]]
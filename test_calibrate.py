@@ -0,0 +1,18 @@
+from calibrate import compare, quantile, ranks, spearman
+
+
+def test_ties_share_their_average_rank():
+    assert ranks([30, 10, 20, 10]) == [4.0, 1.5, 3.0, 1.5]
+
+
+def test_spearman_follows_the_order_only():
+    assert spearman([1, 2, 3, 4], [10, 20, 40, 80]) == 1.0
+    assert spearman([1, 2, 3, 4], [8, 6, 4, 2]) == -1.0
+    assert spearman([1, 2, 3], [5, 5, 5]) is None
+
+
+def test_compare_reports_bias_and_corrected_error():
+    # The estimate is always 5 points high, so once the bias is corrected it is exact
+    result = compare([(65, 60), (75, 70), (85, 80), (55, 50)], 0.9)
+    assert result == {"count": 4, "mae": 5, "spearman": 1.0, "bias": 5, "corrected_error": 0}
+    assert quantile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 0.9) == 9
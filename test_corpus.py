@@ -0,0 +1,39 @@
+from corpus import Corpus, file_digest, get_or_extract
+
+
+def test_texts_are_stored_and_shared(tmp_path):
+    path = str(tmp_path / "corpus")
+    corpus = Corpus(path)
+    corpus.add(file_digest(b"one"), "first resume")
+    corpus.add(file_digest(b"two"), "second résumé")
+
+    reader = Corpus(path)
+    assert reader.get(file_digest(b"two")) == "second résumé"
+    assert [text for _, text in reader.items()] == ["first resume", "second résumé"]
+    corpus.add(file_digest(b"three"), "third resume")
+    reader.refresh()
+    assert len(reader) == 3
+
+
+def test_get_or_extract_extracts_once(tmp_path):
+    corpus = Corpus(str(tmp_path / "corpus"))
+    calls = []
+    extract = lambda data: calls.append(data) or data.decode("utf-8")
+    assert get_or_extract(corpus, b"resume", extract) == "resume"
+    assert get_or_extract(corpus, b"resume", extract) == "resume"
+    assert calls == [b"resume"]
+
+
+def test_partial_record_from_a_crash_does_not_shift_later_records(tmp_path):
+    path = str(tmp_path / "corpus")
+    corpus = Corpus(path)
+    corpus.add(file_digest(b"one"), "first resume")
+    with open(f"{path}.idx", "ab") as f:
+        f.write(b"\x00" * 20)  # the process crashed while writing a record
+
+    reopened = Corpus(path)
+    reopened.add(file_digest(b"two"), "second resume")
+    reader = Corpus(path)
+    assert reader.get(file_digest(b"one")) == "first resume"
+    assert reader.get(file_digest(b"two")) == "second resume"
+    assert len(reader) == 2
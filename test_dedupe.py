@@ -0,0 +1,39 @@
+from dedupe import MinHashIndex, choose_bands, minhash, similarity
+
+RESUME = " ".join(f"Built service {number} in Python with SQL and Docker for the billing team." for number in range(40))
+
+
+def test_signatures_estimate_similarity():
+    assert similarity(minhash(RESUME), minhash(RESUME.upper())) == 1.0
+    assert similarity(minhash(RESUME), minhash("Nurse with ten years of intensive care experience")) < 0.1
+
+
+def test_band_layout_finds_pairs_above_the_threshold():
+    bands, rows = choose_bands(0.9)
+    assert bands * rows == 128
+    assert (1 / bands) ** (1 / rows) <= 0.9
+
+
+def test_near_duplicate_is_found_in_its_namespace_only():
+    index = MinHashIndex(0.8)
+    index.add("original.pdf", minhash(RESUME), {"score": 70}, namespace="job-1")
+    copy = minhash(RESUME.replace("service 39", "service thirty-nine"))
+
+    key, score, payload = index.query(copy, namespace="job-1")
+    assert (key, payload) == ("original.pdf", {"score": 70})
+    assert score >= 0.8
+    assert index.query(copy, namespace="job-2") is None
+    assert index.query(minhash("A completely different resume about cooking and catering"), "job-1") is None
+
+
+def test_index_survives_save_and_load(tmp_path):
+    index = MinHashIndex(0.8)
+    index.add("kept.pdf", minhash(RESUME), {"report": "..."})
+    index.add("unfinished.pdf", minhash("Another resume about data engineering work"), None)
+    index.save(str(tmp_path / "index.json"), keep=lambda payload: payload is not None)
+
+    loaded = MinHashIndex.load(str(tmp_path / "index.json"))
+    assert len(loaded) == 1
+    assert loaded.query(minhash(RESUME))[0] == "kept.pdf"
+    loaded.remove("kept.pdf")
+    assert loaded.query(minhash(RESUME)) is None
@@ -0,0 +1,67 @@
+import csv
+import json
+
+import pytest
+
+from export import Checkpoint, ResultExporter, open_output
+
+
+def result(number, status="analyzed"):
+    return {"file": f"resume_{number}.pdf", "status": status, "score": 60 + number, "issues": ["Add SQL", "Add AWS"]}
+
+
+def test_rows_are_written_in_batches_and_checkpointed(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "run.ckpt"))
+    exporter = ResultExporter([str(tmp_path / "results.csv"), str(tmp_path / "results.jsonl")], checkpoint, buffer_rows=2)
+    exporter.add(result(0), "key-0")
+    assert (tmp_path / "results.jsonl").read_text(encoding="utf-8") == ""
+    exporter.add(result(1), "key-1")
+    exporter.add(result(2, "error"))
+    exporter.close()
+
+    with open(tmp_path / "results.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["file"] for row in rows] == ["resume_0.pdf", "resume_1.pdf", "resume_2.pdf"]
+    assert rows[0]["issues"] == "Add SQL | Add AWS"
+    assert len((tmp_path / "results.jsonl").read_text(encoding="utf-8").splitlines()) == 3
+    assert exporter.counts == {"analyzed": 2, "error": 1}
+    # Errors are not checkpointed, so a resumed run tries them again
+    assert (tmp_path / "run.ckpt").read_text(encoding="utf-8").split() == ["key-0", "key-1"]
+
+
+def test_resumed_run_appends_and_skips_checkpointed_pairs(tmp_path):
+    for numbers in ([0, 1], [2]):
+        checkpoint = Checkpoint(str(tmp_path / "run.ckpt"))
+        assert all(f"key-{number}" not in checkpoint for number in numbers)
+        exporter = ResultExporter([str(tmp_path / "results.csv"), str(tmp_path / "results.jsonl")], checkpoint)
+        for number in numbers:
+            exporter.add(result(number), f"key-{number}")
+        exporter.close()
+
+    assert len(Checkpoint(str(tmp_path / "run.ckpt"))) == 3
+    assert (tmp_path / "results.csv").read_text(encoding="utf-8").count("file,status") == 1
+    rows = [json.loads(line) for line in (tmp_path / "results.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [row["file"] for row in rows] == ["resume_0.pdf", "resume_1.pdf", "resume_2.pdf"]
+
+
+def test_discarded_rows_are_never_written(tmp_path):
+    exporter = ResultExporter([str(tmp_path / "results.jsonl")], Checkpoint(str(tmp_path / "run.ckpt")))
+    exporter.add(result(0), "key-0")
+    exporter.discard()
+    exporter.close()
+    assert (tmp_path / "results.jsonl").read_text(encoding="utf-8") == ""
+    assert exporter.counts == {"analyzed": 0}
+
+
+def test_unknown_output_format_is_refused(tmp_path):
+    with pytest.raises(ValueError):
+        open_output(str(tmp_path / "results.xlsx"))
+
+
+def test_resumed_parquet_export_writes_the_next_part(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    for number in range(2):
+        exporter = ResultExporter([str(tmp_path / "results.parquet")])
+        exporter.add(result(number))
+        exporter.close()
+    assert parquet.read_table(str(tmp_path / "results.1.parquet")).column("score").to_pylist() == [61.0]
@@ -0,0 +1,97 @@
+import hashlib
+import io
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pytest
+
+import extractors
+from extractors import UnsupportedDocument, detect_type, extract_text, load_choices
+from samples import RESUME_LINES, make_resume_pdf
+
+
+def make_docx(paragraphs):
+    namespace = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    body = "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", f'<w:document xmlns:w="{namespace}"><w:body>{body}</w:body></w:document>')
+    return buffer.getvalue()
+
+
+def test_every_supported_format_is_read():
+    assert RESUME_LINES[0] in extract_text(make_resume_pdf(RESUME_LINES))
+    assert extract_text(make_docx(["Jane Doe", "SKILLS", "Python, SQL"])).split() == ["Jane", "Doe", "SKILLS", "Python,", "SQL"]
+    rtf = rb"{\rtf1\ansi{\fonttbl{\f0 Arial;}}\f0 Jane Doe\par Caf\'e9 owner\par}"
+    assert extract_text(rtf).split("\n")[:2] == ["Jane Doe", "Café owner"]
+    assert extract_text("José Doe".encode("cp1252")) == "José Doe"
+
+
+def test_unsupported_documents_are_refused():
+    assert detect_type(b"Plain resume text") == "txt"
+    with pytest.raises(UnsupportedDocument):
+        detect_type(b"\xd0\xcf\x11\xe0old word file")
+    with pytest.raises(UnsupportedDocument):
+        detect_type(b"\x89PNG\r\n\x1a\n\x00\x00")
+
+
+def test_saved_choices_only_use_backends_for_their_type(tmp_path):
+    choices = tmp_path / "choices.json"
+    choices.write_text('{"pdf": {"backend": "rtf"}, "txt": "txt", "docx": "no-such-backend"}', encoding="utf-8")
+    assert load_choices(str(choices)) == extractors.DEFAULT_BACKENDS
+
+
+def test_repeated_uploads_share_one_extraction():
+    data = "\n".join(RESUME_LINES).encode("utf-8")
+    first = extractors.submit(data)
+    assert extractors.submit(data) is first
+    assert first.result()["fingerprint"] == extractors.prepare_resume("\n".join(RESUME_LINES))["fingerprint"]
+
+
+def test_extraction_runs_in_the_background(monkeypatch):
+    release = threading.Event()
+
+    def slow_extract(data, corpus=None):
+        release.wait(5)
+        return extractors.prepare_resume(data.decode("utf-8"))
+
+    monkeypatch.setattr(extractors, "extract_resume", slow_extract)
+    monkeypatch.setattr(extractors, "_extractions", OrderedDict())
+    future = extractors.submit(b"SKILLS\nPython")
+    assert not future.done()
+    release.set()
+    assert future.result(timeout=5)["canonical"] == "SKILLS\nPython"
+
+
+def test_failed_extraction_is_tried_again(monkeypatch):
+    attempts = []
+
+    def flaky_extract(data, corpus=None):
+        attempts.append(data)
+        if len(attempts) == 1:
+            raise OSError("disk hiccup")
+        return extractors.prepare_resume(data.decode("utf-8"))
+
+    monkeypatch.setattr(extractors, "extract_resume", flaky_extract)
+    monkeypatch.setattr(extractors, "_extractions", OrderedDict())
+    first = extractors.submit(b"resume text")
+    with pytest.raises(OSError):
+        first.result(timeout=5)
+
+    second = extractors.submit(b"resume text")
+    assert second is not first
+    assert second.result(timeout=5)["text"] == "resume text"
+    assert len(attempts) == 2
+
+
+def test_cancelled_extraction_is_started_again(monkeypatch):
+    data = b"resume text"
+    cancelled = Future()
+    cancelled.cancel()
+    monkeypatch.setattr(extractors, "_extractions", OrderedDict({hashlib.sha256(data).hexdigest(): cancelled}))
+
+    future = extractors.submit(data)
+    assert future is not cancelled
+    assert future.result(timeout=5)["text"] == "resume text"
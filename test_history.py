@@ -0,0 +1,33 @@
+from history import MAX_VERSIONS, add_version, apply_delta, find_version, make_delta, version_text
+
+ORIGINAL = "Jane Doe\nSKILLS\nPython, SQL\nEXPERIENCE\n- Built data pipelines\n"
+SCORE = {"value": 70.0, "display": "70.0/100"}
+
+
+def test_delta_keeps_only_changed_lines_and_rebuilds_the_text():
+    edited = ORIGINAL.replace("Python, SQL", "Python, SQL, AWS") + "- Led a team of four\n"
+    delta = make_delta(ORIGINAL, edited)
+    assert delta == [(2, 3, ["Python, SQL, AWS\n"]), (5, 5, ["- Led a team of four\n"])]
+    assert apply_delta(ORIGINAL, delta) == edited
+
+
+def test_same_content_refreshes_its_version():
+    versions = []
+    add_version(versions, ORIGINAL, ORIGINAL, SCORE)
+    edited = ORIGINAL + "- Led a team of four\n"
+    add_version(versions, ORIGINAL, edited, SCORE, analysis="digest-1")
+    again = add_version(versions, ORIGINAL, edited.replace("\n", "\r\n"), {"value": 72.0, "display": "72.0/100"})
+
+    assert [version["number"] for version in versions] == [0, 1]
+    assert again is versions[1] and again["score"]["value"] == 72.0 and again["analysis"] == "digest-1"
+    assert find_version(versions, ORIGINAL) is versions[0]
+    assert version_text(ORIGINAL, versions[1]) == edited
+
+
+def test_original_is_kept_when_old_versions_are_dropped():
+    versions = []
+    for number in range(MAX_VERSIONS + 5):
+        add_version(versions, ORIGINAL, ORIGINAL + f"- Project {number}\n" * bool(number), SCORE)
+    assert len(versions) == MAX_VERSIONS
+    assert versions[0]["number"] == 0 and versions[1]["number"] == 6
+    assert version_text(ORIGINAL, versions[0]) == ORIGINAL
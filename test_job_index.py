@@ -0,0 +1,64 @@
+import job_index
+from job_index import JOB_LEVELS, JOB_ROLES, JobIndex, infer_level, infer_role, posting_fields, update_index
+
+
+def test_stated_role_must_name_a_choice():
+    assert infer_role("Job Role: Data Analyst/Scientist\nSQL") == "Data Analyst/Scientist"
+    assert infer_role("Job Role: data scientist\nSQL") == "Data Analyst/Scientist"
+    # Not a choice: the role is guessed from the posting instead
+    assert infer_role("Data Engineer\nJob Role: Data Engineer\nBuild pipelines in Java for the backend") \
+        == "Software Development Engineer"
+
+
+def test_stated_level_must_name_a_choice():
+    assert infer_level("Job Level: Advanced (5+ years)") == JOB_LEVELS[2]
+    assert infer_level("Job Level: advanced") == JOB_LEVELS[2]
+    assert infer_level("Job Level: Entrepreneur in residence") == ""
+
+
+def test_skills_are_canonical_names(tmp_path):
+    fields = posting_fields(str(tmp_path / "posting.txt"), "Platform Engineer\nWe run k8s on AWS with Terraform and JS tooling")
+    assert fields["skills"] == ["Kubernetes", "AWS", "Terraform", "JavaScript"]
+
+
+def test_search_matches_skills_by_synonym(tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    (library / "platform.txt").write_text("Platform Engineer\nKubernetes, Terraform and Golang services", encoding="utf-8")
+    (library / "analyst.txt").write_text("Data Analyst\nSQL, Tableau and Excel reporting", encoding="utf-8")
+    index = JobIndex()
+    assert update_index(index, str(library)) == (2, 0)
+
+    best = index.search("Ran k8s clusters and wrote terraform modules in golang")[0]
+    assert best["id"] == "platform.txt"
+    assert best["matched_skills"] == ["Kubernetes", "Terraform", "Go"]
+    assert best["role"] in JOB_ROLES
+
+
+def test_old_indexes_are_rebuilt(tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    (library / "platform.txt").write_text("Platform Engineer\nKubernetes and Terraform", encoding="utf-8")
+    index = JobIndex()
+    update_index(index, str(library))
+    index.version = 1
+    index.save(str(tmp_path / "index.json"))
+
+    loaded = JobIndex.load(str(tmp_path / "index.json"))
+    assert update_index(loaded, str(library)) == (1, 0)
+    assert loaded.version == job_index.INDEX_VERSION
+
+
+def test_removed_posting_leaves_no_terms_behind(tmp_path):
+    index = JobIndex()
+    index.add("platform.txt", "Platform Engineer\nKubernetes and Terraform", {"skills": []})
+    index.add("analyst.txt", "Data Analyst\nSQL and Terraform", {"skills": []})
+    index.save(str(tmp_path / "index.json"))
+
+    # Removal works the same on a loaded index, which rebuilds each posting's term list
+    for index in (index, JobIndex.load(str(tmp_path / "index.json"))):
+        index.remove("platform.txt")
+        assert "kubernetes" not in index.terms
+        assert index.terms["terraform"] == {"analyst.txt": 1}
+        index.remove("analyst.txt")
+        assert index.terms == {}
@@ -0,0 +1,40 @@
+import json
+import os
+import socket
+import sys
+
+import loadtest
+
+
+# Function to find a port nothing is listening on
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def test_percentile_picks_the_nearest_rank():
+    values = [5, 1, 4, 2, 3]
+    assert loadtest.percentile(values, 50) == 3
+    assert loadtest.percentile(values, 100) == 5
+    assert loadtest.percentile([], 95) is None
+
+
+def test_process_stats_reads_this_process():
+    threads, rss_mb = loadtest.process_stats(os.getpid())
+    assert threads >= 1
+    assert rss_mb > 0
+
+
+def test_sessions_run_every_step_against_the_stub_server(monkeypatch, tmp_path):
+    report_path = tmp_path / "report.json"
+    monkeypatch.setattr(sys, "argv", [
+        "loadtest.py", "--sessions", "2", "--stub-latency", "0", "--port", str(free_port()),
+        "--step-timeout", "60", "--json", str(report_path),
+    ])
+    assert loadtest.main() == 0
+
+    report = json.loads(report_path.read_text())
+    assert report["failed_sessions"] == 0
+    assert all(report["steps"][name]["count"] == 2 for name in loadtest.STEPS)
+    assert report["threads_peak"] and report["rss_peak_mb"]
@@ -0,0 +1,264 @@
+import threading
+import time
+
+import pytest
+
+import metrics
+import model_client
+import scheduler
+from model_client import (CallCancelled, CircuitBreaker, CircuitOpen, FixtureNotFound, FixtureResponse, RecordingModel,
+                          ReplayModel, SloMissed, StubModel, call_ensemble, call_model, generate_parallel)
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(failures=2, cooldown=0)
+    monkeypatch.setattr(model_client, "_breaker", breaker)
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failures=2, cooldown=60)
+    breaker.record_failure()
+    assert breaker.state() == "closed"
+    breaker.record_failure()
+    assert breaker.state() == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_lets_one_trial_through_after_the_cooldown():
+    breaker = CircuitBreaker(failures=1, cooldown=0)
+    breaker.record_failure()
+    assert breaker.state() == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state() == "closed"
+
+
+def test_cancelled_trial_does_not_leave_the_breaker_stuck(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    with pytest.raises(CallCancelled):
+        call_model(StubModel(latency=1), ["prompt"], "score", timeout=5, cancel=cancel)
+
+    # The next call is let through as the trial, and closes the breaker
+    call_model(StubModel(latency=0), ["prompt"], "score", timeout=5)
+    assert breaker.state() == "closed"
+
+
+def test_open_breaker_refuses_calls(monkeypatch):
+    breaker = CircuitBreaker(failures=1, cooldown=60)
+    breaker.record_failure()
+    monkeypatch.setattr(model_client, "_breaker", breaker)
+    with pytest.raises(CircuitOpen):
+        call_model(StubModel(latency=0), ["prompt"], "score", timeout=5)
+
+
+def test_latency_excludes_the_wait_for_a_slot(monkeypatch, breaker):
+    class SlowModel:
+        def generate_content(self, contents):
+            time.sleep(0.2)
+            return FixtureResponse("answer")
+
+    monkeypatch.setattr(model_client, "_scheduler", scheduler.create_scheduler(1))
+    metrics.reset()
+    calls = [threading.Thread(target=call_model, args=(SlowModel(), ["prompt"], "score", 5)) for _ in range(2)]
+    for call in calls:
+        call.start()
+    for call in calls:
+        call.join()
+
+    # The second call waited for the first one's slot, but that is not part of its latency
+    assert metrics.latency_window("model.score").percentile(100) < 0.35
+    assert metrics.latency_window("model.score.queue").percentile(100) >= 0.15
+
+
+def test_deadline_starts_once_the_call_has_a_slot(monkeypatch, breaker):
+    class SlowModel:
+        def generate_content(self, contents):
+            time.sleep(0.2)
+            return FixtureResponse("answer")
+
+    monkeypatch.setattr(model_client, "_scheduler", scheduler.create_scheduler(1))
+    model_client._scheduler.acquire("score")
+    threading.Timer(0.2, model_client._scheduler.release, args=("score",)).start()
+
+    # The wait for the slot and the call together took longer than the deadline, the call alone did not
+    assert call_model(SlowModel(), ["prompt"], "score", timeout=0.3).text == "answer"
+
+
+def test_timeout_in_the_queue_is_not_a_model_failure(monkeypatch, breaker):
+    monkeypatch.setattr(model_client, "_scheduler", scheduler.create_scheduler(1))
+    model_client._scheduler.acquire("score")
+    metrics.reset()
+    try:
+        with pytest.raises(model_client.TimeoutException):
+            call_model(StubModel(latency=0), ["prompt"], "score", timeout=0.1)
+    finally:
+        model_client._scheduler.release("score")
+
+    assert metrics.counter("model.score.queue_timeouts") == 1
+    assert metrics.counter("model.score.timeouts") == 0
+    # One more failure would open the breaker if the queue timeout had counted as one
+    breaker.record_failure()
+    assert breaker.state() == "closed"
+
+
+def test_missed_cutoff_hands_over_the_running_call(breaker):
+    class SlowModel:
+        def generate_content(self, contents):
+            time.sleep(0.3)
+            return FixtureResponse("late answer")
+
+    metrics.reset()
+    with pytest.raises(SloMissed) as missed:
+        call_model(SlowModel(), ["prompt"], "score", timeout=5, cutoff=0.05)
+    assert missed.value.pending.result(timeout=5).text == "late answer"
+    assert metrics.counter("model.score.slo_misses") == 1
+
+    # Missing the SLO is not a model failure: one more failure would otherwise open the breaker
+    breaker.record_failure()
+    assert breaker.state() == "closed"
+
+
+def test_parallel_prompts_past_the_cutoff_hand_over_every_text(breaker):
+    class SlowSecondPromptModel:
+        def generate_content(self, contents):
+            if contents == ["second"]:
+                time.sleep(0.3)
+            return FixtureResponse(f"{contents[0]} answer")
+
+    with pytest.raises(SloMissed) as missed:
+        generate_parallel(SlowSecondPromptModel(), ["first", "second"], "analysis", cutoff=0.05)
+    assert missed.value.pending.result(timeout=5) == ["first answer", "second answer"]
+
+
+def test_deadline_follows_recent_latencies():
+    metrics.reset()
+    assert model_client.adaptive_timeout("score") == model_client.DEFAULT_TIMEOUTS["score"]
+    for _ in range(model_client.ADAPTIVE_MIN_SAMPLES):
+        metrics.observe("model.score", 20)
+    assert model_client.adaptive_timeout("score") == 20 * model_client.TIMEOUT_MULTIPLIER
+
+
+def test_slow_call_is_hedged(monkeypatch, breaker):
+    class FirstCallSlowModel:
+        def __init__(self):
+            self.calls = 0
+
+        def generate_content(self, contents):
+            self.calls += 1
+            if self.calls == 1:
+                time.sleep(1)
+            return FixtureResponse(f"answer {self.calls}")
+
+    monkeypatch.setattr(model_client, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(model_client, "_hedge_tokens", [model_client.HEDGE_BURST])
+    metrics.reset()
+    for _ in range(model_client.ADAPTIVE_MIN_SAMPLES):
+        metrics.observe("model.score", 0.05)
+
+    started = time.monotonic()
+    response = call_model(FirstCallSlowModel(), ["prompt"], "score", timeout=5)
+    assert response.text == "answer 2"
+    assert time.monotonic() - started < 0.5
+    assert metrics.counter("model.score.hedges") == 1
+
+
+def test_hedge_is_skipped_when_no_slot_is_free(monkeypatch, breaker):
+    class SlowModel:
+        def generate_content(self, contents):
+            time.sleep(0.3)
+            return FixtureResponse("answer")
+
+    monkeypatch.setattr(model_client, "_scheduler", scheduler.create_scheduler(1))
+    monkeypatch.setattr(model_client, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(model_client, "_hedge_tokens", [model_client.HEDGE_BURST])
+    metrics.reset()
+    for _ in range(model_client.ADAPTIVE_MIN_SAMPLES):
+        metrics.observe("model.score", 0.05)
+
+    assert call_model(SlowModel(), ["prompt"], "score", timeout=5).text == "answer"
+    assert metrics.counter("model.score.hedges") == 0
+    assert metrics.counter("model.score.hedges_skipped") == 1
+
+
+def test_recorded_responses_are_replayed(tmp_path):
+    recorder = RecordingModel(StubModel(latency=0), "test-model", str(tmp_path))
+    recorded = recorder.generate_content(["Return ONLY the ATS score for this resume"])
+
+    replay = ReplayModel("test-model", str(tmp_path), latency=0)
+    assert replay.generate_content(["Return ONLY the ATS score for this resume"]).text == recorded.text
+    with pytest.raises(FixtureNotFound):
+        replay.generate_content(["A prompt that was never recorded"])
+    with pytest.raises(FixtureNotFound):
+        ReplayModel("other-model", str(tmp_path), latency=0).generate_content(
+            ["Return ONLY the ATS score for this resume"])
+
+
+class ScriptedModel:
+    """Answers each call with the next (delay, text) pair"""
+
+    def __init__(self, answers):
+        self.answers = iter(answers)
+        self.lock = threading.Lock()
+
+    def generate_content(self, contents):
+        with self.lock:
+            delay, text = next(self.answers)
+        time.sleep(delay)
+        if text is None:
+            raise RuntimeError("model down")
+        return FixtureResponse(text)
+
+
+def test_ensemble_stops_once_a_quorum_agrees(breaker):
+    metrics.reset()
+    model = ScriptedModel([(0, "70"), (0.05, "71"), (1, "95")])
+    started = time.monotonic()
+    value, texts = call_ensemble(model, ["prompt"], "score", float, samples=3, quorum=2, agreement=2, timeout=5)
+    assert value == 70.5
+    assert sorted(texts) == ["70", "71"]
+    assert time.monotonic() - started < 0.5
+    assert metrics.counter("model.score.ensemble_early_stops") == 1
+
+
+def test_ensemble_quorum_defaults_to_a_majority_of_its_samples(breaker):
+    # Two of five samples agreeing is not a majority, so the call waits for a third
+    model = ScriptedModel([(0, "70"), (0, "71"), (0.2, "90"), (0.3, "72"), (1, "95")])
+    value, texts = call_ensemble(model, ["prompt"], "score", float, samples=5, agreement=2, timeout=5)
+    assert value == 71
+    assert len(texts) == 4
+
+
+def test_ensemble_without_values_raises_the_last_error(breaker):
+    with pytest.raises(RuntimeError):
+        call_ensemble(ScriptedModel([(0, None), (0, None)]), ["prompt"], "score", float, samples=2, timeout=5)
+
+
+def test_ensemble_past_the_cutoff_keeps_one_call_running(breaker):
+    with pytest.raises(SloMissed) as missed:
+        call_ensemble(ScriptedModel([(0.3, "70"), (0.3, "72")]), ["prompt"], "score", float, samples=2, cutoff=0.05)
+    assert missed.value.pending.result(timeout=5).text in ("70", "72")
+
+
+def test_tiers_file_and_settings_override_the_defaults(monkeypatch, tmp_path):
+    tiers_file = tmp_path / "tiers.json"
+    tiers_file.write_text('{"score": {"model": "small-model", "generation_config": {"temperature": 0.5}}, '
+                          '"unknown": {"model": "ignored"}}', encoding="utf-8")
+    monkeypatch.setenv("CHAT_MODEL", "chat-model")
+    monkeypatch.delenv("SCORE_MODEL", raising=False)
+    monkeypatch.delenv("ANALYSIS_MODEL", raising=False)
+    tiers = model_client.load_tiers(str(tiers_file))
+    assert tiers["score"]["model"] == "small-model"
+    assert tiers["score"]["generation_config"]["temperature"] == 0.5
+    assert tiers["chat"]["model"] == "chat-model"
+    assert tiers["analysis"] == model_client.DEFAULT_TIERS["analysis"]
+    assert "unknown" not in tiers
+
+
+def test_call_types_without_a_tier_use_the_analysis_tier():
+    assert model_client.tier_for("batch-report") == model_client.tier_for("analysis")
@@ -0,0 +1,66 @@
+import tracemalloc
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import model_client
+import profiling
+from samples import RESUME_LINES, make_resume_pdf
+from test_app_flow import APP_PATH, click
+
+
+@pytest.fixture
+def profile_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    return tmp_path
+
+
+# Function to keep the CPU busy in a function the profile should find
+def busy_stage():
+    blocks = []
+    total = 0
+    for number in range(300000):
+        total += number * number
+        if number % 1000 == 0:
+            blocks.append(bytearray(10000))
+    return total, blocks
+
+
+def test_disabled_profiling_does_nothing(profile_dir):
+    profiling.set_enabled(False)
+    with profiling.profile("analysis") as profile:
+        busy_stage()
+    assert profile is profiling._NO_PROFILE
+    assert not tracemalloc.is_tracing()
+    assert list(profile_dir.iterdir()) == []
+
+
+def test_stage_profile_reports_its_functions_and_allocations(profile_dir):
+    profile = profiling.Profile("analysis", interval=0.001).start()
+    result = busy_stage()
+    report_path = profile.stop()
+    assert result
+
+    report = open(report_path, encoding="utf-8").read()
+    assert "Stage: analysis" in report
+    assert "test_profiling.py:busy_stage" in report
+    assert "test_profiling.py:" in report.split("Top 20 allocations")[1]
+    folded = open(report_path[:-len(".txt")] + ".folded", encoding="utf-8").read()
+    assert "test_profiling.py:busy_stage" in folded
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_query_parameter_profiles_the_reruns_and_stages(monkeypatch, profile_dir):
+    monkeypatch.setattr(model_client, "MODEL_BACKEND", "stub")
+    monkeypatch.setattr(model_client, "STUB_LATENCY", 0)
+    monkeypatch.setattr(model_client, "_models", {})
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.query_params["profile"] = "1"
+    at.run()
+    at.file_uploader[0].set_value(("resume.pdf", make_resume_pdf(RESUME_LINES), "application/pdf")).run()
+    at.checkbox[0].check().run()
+    click(at, "Analyze Resume")
+
+    stages = {path.stem.rsplit("-", 1)[1] for path in profile_dir.glob("*.txt")}
+    assert {"rerun", "read_pdf", "analysis", "render"} <= stages
+    profiling.set_enabled(False)
@@ -0,0 +1,21 @@
+from extractors import prepare_resume
+from prompts import build_analysis_prompts
+
+JOB_DESCRIPTION = "Backend engineer with Python, SQL, Docker and AWS experience."
+
+
+def test_short_resume_gets_one_prompt():
+    extracted = prepare_resume("SKILLS\nPython, SQL\nEXPERIENCE\nBuilt data pipelines")
+    prompts, weights, truncated = build_analysis_prompts(extracted, JOB_DESCRIPTION, "Generic ATS")
+    assert len(prompts) == 1 and weights is None and truncated == []
+    assert "LONG RESUME NOTE" not in prompts[0]
+
+
+def test_long_resume_is_split_into_noted_parts():
+    lines = ["EXPERIENCE"] + [f"- Shipped feature {number} for the billing platform in Python" for number in range(400)]
+    lines += ["EDUCATION", "BSc Computer Science"]
+    extracted = prepare_resume("\n".join(lines))
+    prompts, weights, _ = build_analysis_prompts(extracted, JOB_DESCRIPTION, "Generic ATS")
+    assert len(prompts) > 1 and len(weights) == len(prompts)
+    assert all(f"part {number} of {len(prompts)}" in prompt for number, prompt in enumerate(prompts, start=1))
+    assert "Shipped feature 399" in prompts[-1]
@@ -0,0 +1,48 @@
+from report import extract_ats_score, merge_reports, patch_report, split_report
+
+PART_ONE = """<h2>JOB DESCRIPTION ANALYSIS</h2>
+Backend role, Python and SQL.
+<h2>ATS SCORE</h2>
+80
+<h2>STRENGTHS</h2>
+- Python projects"""
+
+PART_TWO = """<h2>JOB DESCRIPTION ANALYSIS</h2>
+The same role, described again.
+<h2>ATS SCORE</h2>
+60
+<h2>STRENGTHS</h2>
+- SQL reporting
+<h2>OPTIMIZATION SUGGESTIONS</h2>
+- Add cloud experience"""
+
+
+def test_split_report_reads_html_and_markdown_headers():
+    assert split_report("<h2>Strengths</h2>\nGood\n## WEAKNESSES:\nFew") == [("STRENGTHS", "Good"), ("WEAKNESSES", "Few")]
+
+
+def test_merged_report_weights_scores_and_keeps_shared_sections_once():
+    merged = merge_reports([PART_ONE, PART_TWO], [80, 60], [300, 100])
+    sections = split_report(merged)
+    assert [title for title, _ in sections] == ["JOB DESCRIPTION ANALYSIS", "ATS SCORE", "STRENGTHS",
+                                                "OPTIMIZATION SUGGESTIONS"]
+    assert dict(sections)["JOB DESCRIPTION ANALYSIS"] == "Backend role, Python and SQL."
+    assert dict(sections)["STRENGTHS"] == "- Python projects\n\n- SQL reporting"
+    assert extract_ats_score(merged)["value"] == 75.0
+
+
+def test_patch_replaces_changed_sections_and_adds_new_ones():
+    patch = "<h2>ATS SCORE</h2>\n72\n<h2>STRENGTHS</h2>\n- SQL reporting\n<h2>KEY FINDINGS</h2>\n- Found keywords: SQL"
+    patched = patch_report(PART_ONE, patch)
+    assert [title for title, _ in split_report(patched)] == ["JOB DESCRIPTION ANALYSIS", "ATS SCORE", "STRENGTHS",
+                                                             "KEY FINDINGS"]
+    assert dict(split_report(patched))["STRENGTHS"] == "- SQL reporting"
+    assert dict(split_report(patched))["JOB DESCRIPTION ANALYSIS"] == "Backend role, Python and SQL."
+    assert extract_ats_score(patched)["value"] == 72.0
+
+
+def test_patch_keeps_the_text_before_the_first_header():
+    report = "Here is the analysis of your resume.\n\n" + PART_ONE
+    patched = patch_report(report, "<h2>STRENGTHS</h2>\n- SQL reporting")
+    assert patched.startswith("Here is the analysis of your resume.\n\n<h2>JOB DESCRIPTION ANALYSIS</h2>")
+    assert dict(split_report(patched))["STRENGTHS"] == "- SQL reporting"
@@ -0,0 +1,48 @@
+from resume_text import canonicalize, chunk_sections, diff_sections, estimate_tokens, fingerprint, split_sections
+
+RESUME = """Jane Doe
+jane@example.com
+SKILLS
+Python, SQL
+EXPERIENCE
+- Built data pipelines
+- Led a team of four
+EDUCATION
+BSc Computer Science"""
+
+
+def test_split_sections_follows_headings():
+    assert [title for title, _ in split_sections(RESUME)] == ["Header", "Skills", "Experience", "Education"]
+
+
+def test_chunks_stay_within_the_token_limit_and_keep_order():
+    sections = [("Experience", "\n".join(f"- Shipped feature {number} for the billing platform" for number in range(60))),
+                ("Education", "BSc Computer Science")]
+    chunks = chunk_sections(sections, 100)
+    assert len(chunks) > 1
+    assert all(sum(estimate_tokens(text) for _, text in chunk) <= 100 for chunk in chunks)
+    assert "\n".join(text for chunk in chunks for _, text in chunk) == "\n".join(text for _, text in sections)
+
+
+def test_fingerprint_ignores_extraction_noise():
+    clean = "SKILLS\n- Python, SQL\nBuilt data pipelines"
+    noisy = "SKILLS\r\n\u2022  Python,\u200b SQL  \r\n\r\n\r\nBuilt data pipe-\nlines"
+    assert canonicalize(noisy) == "SKILLS\n- Python, SQL\n\nBuilt data pipe-\nlines"
+    assert fingerprint(noisy) == fingerprint("SKILLS\n\u2022 Python, SQL\n\nBuilt data pipelines")
+    assert fingerprint(clean) != fingerprint(clean + " and dashboards")
+
+
+def test_canonical_text_keeps_its_meaning():
+    assert canonicalize("-5% churn\n*Python*\n- SQL\n\u2013 AWS") == "-5% churn\n*Python*\n- SQL\n- AWS"
+    assert canonicalize("a well-\nknown brand") == "a well-\nknown brand"
+
+
+def test_diff_finds_changed_added_and_removed_sections():
+    edited = RESUME.replace("Python, SQL", "Python, SQL, AWS").replace("EDUCATION\nBSc Computer Science", "")
+    edited += "\nPROJECTS\nATS checker"
+    assert diff_sections(RESUME, edited) == [
+        ("Skills", "SKILLS\nPython, SQL", "SKILLS\nPython, SQL, AWS"),
+        ("Projects", "", "PROJECTS\nATS checker"),
+        ("Education", "EDUCATION\nBSc Computer Science", ""),
+    ]
+    assert diff_sections(RESUME, RESUME.replace("\n", "\r\n")) == []
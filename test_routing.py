@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import metrics
+import routing
+from model_client import CircuitOpen
+from heuristics import estimate_report, estimate_score
+from report import extract_ats_score
+from samples import RESUME_LINES
+
+JOB_DESCRIPTION = "Backend engineer with Python, SQL, Docker and AWS. Bachelor's degree in computer science."
+
+
+# Function to wait for a background refresh to finish
+def wait_for_refresh(key):
+    deadline = time.monotonic() + 5
+    while routing.refreshing(key):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_slo_caps_the_adaptive_timeout(monkeypatch):
+    monkeypatch.setitem(routing.SLO_SECONDS, "score", 3)
+    assert routing.slo_timeout("score") == 3
+
+
+def test_refresh_retries_until_the_model_answers(monkeypatch):
+    monkeypatch.setattr(routing, "REFRESH_BACKOFF_SECONDS", 0)
+    answers = iter([RuntimeError("model down"), "real answer"])
+
+    def call():
+        answer = next(answers)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    routing.start_refresh("retry-key", call)
+    wait_for_refresh("retry-key")
+    assert routing.refreshed("retry-key") == "real answer"
+
+
+def test_failed_refresh_can_be_started_again(monkeypatch):
+    monkeypatch.setattr(routing, "REFRESH_BACKOFF_SECONDS", 0)
+
+    def fail():
+        raise RuntimeError("model down")
+
+    failed = metrics.counter("routing.refresh_failed")
+    routing.start_refresh("failing-key", fail)
+    wait_for_refresh("failing-key")
+    assert routing.refreshed("failing-key") is None
+    assert metrics.counter("routing.refresh_failed") == failed + 1
+
+    routing.start_refresh("failing-key", lambda: "recovered")
+    wait_for_refresh("failing-key")
+    assert routing.refreshed("failing-key") == "recovered"
+
+
+def test_refresh_waiting_out_the_cooldown_leaves_the_refresh_threads_free(monkeypatch):
+    monkeypatch.setattr(routing, "BREAKER_COOLDOWN", 0.3)
+    calls = {}
+
+    # Function to make a call that is refused by the open breaker the first time
+    def open_once(key):
+        def call():
+            calls.setdefault(key, []).append(time.monotonic())
+            if len(calls[key]) == 1:
+                raise CircuitOpen("The model is unavailable")
+            return f"{key} answer"
+        return call
+
+    keys = [f"cooldown-key-{number}" for number in range(routing._executor._max_workers)]
+    for key in keys:
+        routing.start_refresh(key, open_once(key))
+    # With every refresh waiting out the cooldown, another refresh still runs at once
+    ran = threading.Event()
+    routing.start_refresh("free-thread-key", lambda: ran.set() or "quick answer")
+    assert ran.wait(0.2)
+
+    for key in keys:
+        wait_for_refresh(key)
+        assert routing.refreshed(key) == f"{key} answer"
+        assert calls[key][1] - calls[key][0] >= 0.3
+
+
+def test_refresh_uses_the_call_still_running():
+    pending = Future()
+    calls = []
+    routing.start_refresh("pending-key", lambda: calls.append("new call") or "new answer", pending)
+    assert routing.refreshing("pending-key")
+
+    pending.set_result("late answer")
+    wait_for_refresh("pending-key")
+    assert routing.refreshed("pending-key") == "late answer"
+    assert calls == []
+
+
+def test_refresh_calls_again_if_the_running_call_fails():
+    pending = Future()
+    routing.start_refresh("failed-pending-key", lambda: "new answer", routing.then(pending, lambda response: response.text))
+    pending.set_exception(RuntimeError("model down"))
+    wait_for_refresh("failed-pending-key")
+    assert routing.refreshed("failed-pending-key") == "new answer"
+
+
+def test_estimate_is_marked_and_readable_as_a_report():
+    resume = "\n".join(RESUME_LINES)
+    score = estimate_score(resume, JOB_DESCRIPTION)
+    assert score["estimate"] and 0 <= score["value"] <= 100
+    assert "Python" in score["found"]
+    assert extract_ats_score(estimate_report(resume, JOB_DESCRIPTION))["value"] == score["value"]
+    assert estimate_score("", JOB_DESCRIPTION)["value"] < score["value"]
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import Scheduler, create_scheduler
+
+
+# Function to start a thread that takes a slot, notes its class in order and gives the slot back
+def start_waiter(scheduler, priority_class, order):
+    def run():
+        with scheduler.slot(priority_class):
+            order.append(priority_class)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+# Function to wait until the scheduler has a number of calls waiting
+def wait_for_queue(scheduler, count):
+    deadline = time.monotonic() + 5
+    while sum(scheduler.waiting().values()) < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_interactive_calls_overtake_a_bulk_backlog():
+    scheduler = Scheduler(1)
+    order = []
+    scheduler.acquire("bulk")
+    threads = [start_waiter(scheduler, "bulk", order) for _ in range(4)]
+    wait_for_queue(scheduler, 4)
+    threads.append(start_waiter(scheduler, "score", order))
+    wait_for_queue(scheduler, 5)
+
+    scheduler.release("bulk")
+    for thread in threads:
+        thread.join()
+    assert order[0] == "score"
+    assert order.count("bulk") == 4
+
+
+def test_bulk_calls_keep_slots_free_for_users():
+    scheduler = create_scheduler(2)
+    scheduler.acquire("bulk")
+    blocked = []
+    thread = start_waiter(scheduler, "bulk", blocked)
+    wait_for_queue(scheduler, 1)
+
+    # The second slot is free, but only for interactive calls
+    with scheduler.slot("chat"):
+        assert blocked == []
+    scheduler.release("bulk")
+    thread.join()
+    assert blocked == ["bulk"]
+
+
+def test_free_slot_respects_the_class_cap():
+    scheduler = create_scheduler(2)
+    scheduler.acquire("bulk")
+    assert scheduler.has_free_slot("score")
+    assert not scheduler.has_free_slot("bulk")
+
+    # A bulk call waiting on its cap does not hold the free slot
+    thread = start_waiter(scheduler, "bulk", [])
+    wait_for_queue(scheduler, 1)
+    assert scheduler.has_free_slot("score")
+    with scheduler.slot("score"):
+        assert not scheduler.has_free_slot("chat")
+    scheduler.release("bulk")
+    thread.join()
+
+
+def test_unknown_class_is_refused():
+    with pytest.raises(ValueError):
+        Scheduler(1).acquire("urgent")
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import time
+
+import session_store
+
+
+def test_held_text_outlives_its_field():
+    session_store.put("held-session", "analysis_response", "first analysis")
+    first = session_store.digest_of("first analysis")
+    session_store.hold("held-session", [first])
+    session_store.put("held-session", "analysis_response", "second analysis")
+    assert session_store.get(first) == "first analysis"
+
+    # Held texts no longer listed are released
+    session_store.hold("held-session", [])
+    assert session_store.get(first) is None
+    session_store.release("held-session")
+    assert session_store.get(session_store.digest_of("second analysis")) is None
+
+
+def test_release_drops_held_texts():
+    session_store.put("released-session", "pdf_text", "resume text")
+    digest = session_store.digest_of("resume text")
+    session_store.hold("released-session", [digest])
+    session_store.release("released-session")
+    assert session_store.get(digest) is None
+
+
+def test_identical_texts_are_stored_once_and_counted():
+    first = session_store.put("session-a", "pdf_text", "shared resume text")
+    second = session_store.put("session-b", "pdf_text", "shared resume text")
+    assert first == second
+
+    session_store.release("session-a")
+    assert session_store.get(first) == "shared resume text"
+    session_store.put("session-b", "pdf_text", "edited resume text")
+    assert session_store.get(first) is None
+    session_store.release("session-b")
+
+
+def test_idle_session_texts_are_spilled_and_read_back(monkeypatch, tmp_path):
+    monkeypatch.setattr(session_store, "SESSION_SPILL_DIR", str(tmp_path))
+    monkeypatch.setattr(session_store, "_spill_dir", [])
+    digest = session_store.put("idle-session", "job_description", "a long job description")
+    session_store.sweep(now=time.monotonic() + session_store.SESSION_IDLE_SECONDS + 1)
+
+    # The file is in a folder of this process's own, not directly in the shared folder
+    spilled = list(tmp_path.glob(f"ats_checker_sessions_*/{digest}"))
+    assert len(spilled) == 1
+    assert not (tmp_path / digest).exists()
+
+    session_store.touch("idle-session")
+    assert session_store.get(digest) == "a long job description"
+    assert not spilled[0].exists()
+    session_store.release("idle-session")
+
+
+def test_spill_folder_is_removed_when_the_process_exits(tmp_path):
+    script = (
+        "import time, session_store\n"
+        "session_store.put('s', 'pdf_text', 'resume text')\n"
+        "session_store.sweep(now=time.monotonic() + session_store.SESSION_IDLE_SECONDS + 1)\n"
+        "print(session_store._spill_dir[0])\n"
+    )
+    env = dict(os.environ, SESSION_SPILL_DIR=str(tmp_path))
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    assert result.stdout.strip().startswith(str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_expired_sessions_are_forgotten():
+    digest = session_store.put("expired-session", "pdf_text", "an old resume")
+    session_store.sweep(now=time.monotonic() + session_store.SESSION_EXPIRE_SECONDS + 1)
+    assert session_store.get(digest) is None
@@ -0,0 +1,80 @@
+import json
+import time
+
+import pytest
+
+import batch
+import shards
+from model_client import StubModel
+from test_batch import JOB_DESCRIPTION, write_resumes
+
+
+class CountingModel(StubModel):
+    def __init__(self):
+        super().__init__(latency=0)
+        self.calls = 0
+
+    def generate_content(self, contents):
+        self.calls += 1
+        return super().generate_content(contents)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = CountingModel()
+    monkeypatch.setattr(batch, "model_for", lambda call_type: model)
+    return model
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = shards.Manifest(str(tmp_path / "job.db"))
+    job = {"job_description": JOB_DESCRIPTION, "ats": "Generic ATS", "job_level": "", "job_role": "",
+           "on_duplicate": "reuse"}
+    manifest.plan(job, write_resumes(tmp_path, 4), 4)
+    yield manifest
+    manifest.close()
+
+
+# Function to let a shard's lease run out, as if its worker had crashed
+def expire(manifest):
+    manifest._write(lambda db: db.execute("UPDATE shards SET lease_until = 0 WHERE status = 'leased'"))
+
+
+def test_worker_that_lost_its_lease_cannot_spoil_the_results(manifest, model, tmp_path):
+    shard_id, paths = manifest.claim("worker-a", lease_seconds=60)
+    expire(manifest)
+    assert manifest.claim("worker-b", lease_seconds=60) == (shard_id, paths)
+    assert shards.work_shard(manifest, shard_id, paths, "worker-b", manifest.job(), workers=1)
+
+    # The old owner wakes up and keeps going: it notices, and whatever it wrote stays in its own files
+    assert not shards.work_shard(manifest, shard_id, paths, "worker-a", manifest.job(), workers=1,
+                                 lease_seconds=0.03)
+    with open(manifest.shard_files(shard_id, "worker-a")[0], "a", encoding="utf-8") as f:
+        f.write('{"file": "half a row')
+
+    output = tmp_path / "merged.jsonl"
+    assert sum(shards.merge(manifest, [str(output)]).values()) == 4
+    rows = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert sorted(row["file"] for row in rows) == sorted(paths)
+
+
+def test_new_owner_continues_from_the_previous_checkpoint(manifest, model, tmp_path):
+    shard_id, paths = manifest.claim("worker-a", lease_seconds=60)
+    # worker-a exported half of the shard before it crashed
+    shards.work_shard(manifest, shard_id, paths[:2], "worker-a", manifest.job(), workers=1, buffer_rows=1)
+    manifest._write(lambda db: db.execute("UPDATE shards SET status = 'leased', lease_until = 0"))
+    assert model.calls == 2
+
+    assert manifest.claim("worker-b", lease_seconds=60) == (shard_id, paths)
+    assert shards.work_shard(manifest, shard_id, paths, "worker-b", manifest.job(), workers=1)
+    assert model.calls == 4
+    assert sum(shards.merge(manifest, [str(tmp_path / "merged.jsonl")]).values()) == 4
+
+
+def test_shard_fails_after_max_attempts(manifest):
+    for attempt in range(2):
+        assert manifest.claim(f"worker-{attempt}", max_attempts=2) is not None
+        expire(manifest)
+    assert manifest.claim("worker-2", max_attempts=2) is None
+    assert manifest.progress() == {"failed": 1}
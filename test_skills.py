@@ -0,0 +1,30 @@
+from skills import SkillIndex, find_skills, resolve_terms
+
+
+def test_synonyms_resolve_to_one_skill():
+    found = find_skills("Shipped JS and reactjs frontends, Node.js services on k8s, ML models in python3")
+    assert list(found) == ["JavaScript", "React", "Node.js", "Kubernetes", "Machine Learning", "Python"]
+    assert found["Kubernetes"] == ["k8s"]
+
+
+def test_longer_names_win():
+    assert list(find_skills("React Native developer")) == ["React Native"]
+
+
+def test_misspellings_match_by_similarity():
+    assert resolve_terms(["kubernets", "postgre", "tensorflw"]) == ["Kubernetes", "PostgreSQL", "TensorFlow"]
+
+
+def test_ordinary_words_are_not_skills():
+    text = "I will excel at the rest of the work and react swiftly. Attached CV. node of a graph"
+    assert find_skills(text) == {}
+
+
+def test_capitalized_names_are_skills():
+    found = find_skills("Built React apps with REST services on Node, reports in Excel and jobs on Spark")
+    assert list(found) == ["React", "REST APIs", "Node.js", "Excel", "Apache Spark"]
+
+
+def test_short_aliases_are_not_matched_by_similarity():
+    index = SkillIndex(aliases={"swift": "Swift", "kubernetes": "Kubernetes"})
+    assert index.resolve(["swiftly", "kubernets"]) == [None, "Kubernetes"]
@@ -0,0 +1,54 @@
+from functools import partial
+
+import pytest
+
+import token_budget
+from token_budget import TokenBudgetExceeded, check_session_budget, count_tokens, fit_prompt, request_budget
+
+
+def build(header, resume_text, job_description):
+    return f"{header}\nRESUME:\n{resume_text}\nJOB:\n{job_description}"
+
+
+def test_fit_prompt_keeps_small_prompts_whole():
+    prompt, truncated = fit_prompt(partial(build, "Analyze"), {"resume_text": "Python developer",
+                                                               "job_description": "Needs Python"},
+                                   1000, ["job_description", "resume_text"])
+    assert truncated == []
+    assert prompt == build("Analyze", "Python developer", "Needs Python")
+
+
+def test_fit_prompt_truncates_in_order_to_fit():
+    resume = " ".join(f"skill{number}" for number in range(3000))
+    job = " ".join(f"duty{number}" for number in range(3000))
+    prompt, truncated = fit_prompt(partial(build, "Analyze"), {"resume_text": resume, "job_description": job},
+                                   1500, ["job_description", "resume_text"])
+    assert count_tokens(prompt) <= 1500
+    assert truncated == ["job_description", "resume_text"]
+    assert token_budget.TRUNCATION_NOTE.strip() in prompt
+
+
+def test_fit_prompt_raises_when_fixed_text_does_not_fit():
+    with pytest.raises(TokenBudgetExceeded):
+        fit_prompt(partial(build, "x " * 2000), {"resume_text": "a", "job_description": "b"}, 100,
+                   ["job_description", "resume_text"])
+
+
+def test_request_budget_follows_session_usage(monkeypatch):
+    monkeypatch.setattr(token_budget, "SESSION_TOKEN_BUDGET", 10000)
+    monkeypatch.setattr(token_budget, "MAX_PROMPT_TOKENS", 8000)
+    assert request_budget(0) == 8000
+    assert request_budget(7000) == 3000
+
+
+def test_parts_are_checked_against_what_is_left_of_the_session(monkeypatch):
+    monkeypatch.setattr(token_budget, "SESSION_TOKEN_BUDGET", 10000)
+    # 5000 tokens left: three parts of 4000 tokens together do not fit, even though each part does
+    with pytest.raises(TokenBudgetExceeded):
+        check_session_budget(3 * 4000, tokens_used=5000)
+    check_session_budget(4000, tokens_used=5000)
+
+
+def test_session_check_is_off_without_a_session_budget(monkeypatch):
+    monkeypatch.setattr(token_budget, "SESSION_TOKEN_BUDGET", 0)
+    check_session_budget(10 ** 9, tokens_used=10 ** 9)
@@ -0,0 +1,59 @@
+import json
+import threading
+
+import pytest
+
+import tracing
+
+
+@pytest.fixture
+def trace_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(tracing, "TRACING", True)
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(tracing, "TRACE_ENDPOINT", "")
+    return tmp_path / "traces.jsonl"
+
+
+# Function to read the exported spans
+def exported_spans(trace_file):
+    tracing.flush()
+    return [span for line in trace_file.read_text(encoding="utf-8").splitlines()
+            for resource in json.loads(line)["resourceSpans"]
+            for scope in resource["scopeSpans"]
+            for span in scope["spans"]]
+
+
+@tracing.traced("model.call")
+def call(fail=False):
+    tracing.set_attribute("call_type", "score")
+    if fail:
+        raise RuntimeError("model down")
+
+
+def test_user_action_is_traced_end_to_end(trace_file):
+    tracing.begin_rerun()
+    tracing.set_action("analyze")
+    with tracing.span("prompt.build", call_type="analysis"):
+        pass
+    worker = threading.Thread(target=tracing.wrap(call))
+    worker.start()
+    worker.join()
+    with pytest.raises(RuntimeError):
+        call(fail=True)
+    tracing.end_rerun()
+
+    spans = exported_spans(trace_file)
+    assert [span["name"] for span in spans] == ["prompt.build", "model.call", "model.call", "analyze"]
+    root = spans[-1]
+    assert root["parentSpanId"] == ""
+    # The call made from another thread joins the same trace
+    assert all(span["traceId"] == root["traceId"] and span["parentSpanId"] == root["spanId"] for span in spans[:-1])
+    assert {"key": "call_type", "value": {"stringValue": "score"}} in spans[1]["attributes"]
+    assert spans[1]["status"] == {"code": 1}
+    assert spans[2]["status"] == {"code": 2, "message": "RuntimeError: model down"}
+
+
+def test_nothing_is_recorded_when_tracing_is_off(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACING", False)
+    assert tracing.span("prompt.build") is tracing._NO_SPAN
+    assert tracing.wrap(call) is call
@@ -0,0 +1,39 @@
+import inspect
+
+import google.generativeai as genai
+
+import model_client
+import warmup
+
+
+def test_warm_up_runs_the_whole_pipeline_without_the_model(monkeypatch):
+    monkeypatch.setattr(model_client, "MODEL_BACKEND", "stub")
+    monkeypatch.setattr(model_client, "_models", {})
+    assert warmup.check_model().startswith("stub (")
+    assert warmup.load_caches() == 0
+    assert 0 < warmup.synthetic_request() <= 100
+
+
+def test_live_check_calls_count_tokens_with_a_timeout(monkeypatch):
+    calls = []
+
+    class LiveModel:
+        def count_tokens(self, *args, **kwargs):
+            calls.append((args, kwargs))
+
+    monkeypatch.setattr(model_client, "MODEL_BACKEND", "live")
+    monkeypatch.setattr(model_client, "model_for", lambda call_type: LiveModel())
+    warmup.check_model()
+
+    # The call fits the signature of the installed client library (request_options needs 0.4.0 or later)
+    args, kwargs = calls[0]
+    bound = inspect.signature(genai.GenerativeModel.count_tokens).bind(None, *args, **kwargs)
+    assert bound.arguments["request_options"] == {"timeout": warmup.HEALTH_CHECK_TIMEOUT}
+
+
+def test_ready_file_is_cleared(monkeypatch, tmp_path):
+    monkeypatch.setattr(warmup, "READY_FILE", str(tmp_path / "ready"))
+    warmup.clear_ready()
+    (tmp_path / "ready").write_text("1234\n", encoding="utf-8")
+    warmup.clear_ready()
+    assert not (tmp_path / "ready").exists()
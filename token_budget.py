@@ -0,0 +1,128 @@
+import os
+from dotenv import load_dotenv
+
+import metrics
+import tracing
+from resume_text import estimate_tokens
+
+# Token accounting for model calls. Prompt sizes are estimated locally (no API call),
+# every prompt is checked against a per-request limit and the session's remaining
+# budget, and oversized fields are truncated instead of failing the request.
+
+load_dotenv()
+
+# Largest prompt sent in one request, in estimated tokens
+MAX_PROMPT_TOKENS = int(os.getenv("MAX_PROMPT_TOKENS", "8000"))
+
+# Total prompt and response tokens one session may use (0 turns the session budget off)
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "200000"))
+
+# Each field keeps at least this many tokens before the next field in line is cut further
+MIN_FIELD_TOKENS = 200
+
+TRUNCATION_NOTE = "\n[... truncated to fit the prompt size limit ...]"
+
+
+class TokenBudgetExceeded(Exception):
+    pass
+
+
+# Function to count the tokens of a text with the local estimator
+def count_tokens(text):
+    return estimate_tokens(text or "")
+
+
+# Function to count the tokens of everything sent in one request
+def count_contents(contents):
+    return sum(count_tokens(str(part)) for part in contents)
+
+
+# Function to cut a text down to at most max_tokens, ending on a whole line where possible
+def truncate_to_tokens(text, max_tokens):
+    if count_tokens(text) <= max_tokens:
+        return text
+    note_tokens = count_tokens(TRUNCATION_NOTE)
+    if max_tokens <= note_tokens:
+        return ""
+    kept = []
+    used = note_tokens
+    for line in text.splitlines(keepends=True):
+        line_tokens = count_tokens(line)
+        if used + line_tokens > max_tokens:
+            # Keep the words of a partial line that still fit
+            words = []
+            for word in line.split():
+                word_tokens = count_tokens(word)
+                if used + word_tokens > max_tokens:
+                    break
+                words.append(word)
+                used += word_tokens
+            if words:
+                kept.append(" ".join(words))
+            break
+        kept.append(line)
+        used += line_tokens
+    return "".join(kept).rstrip() + TRUNCATION_NOTE
+
+
+# Function to get the prompt size allowed for the next request of a session
+def request_budget(tokens_used=0):
+    if SESSION_TOKEN_BUDGET <= 0:
+        return MAX_PROMPT_TOKENS
+    return min(MAX_PROMPT_TOKENS, SESSION_TOKEN_BUDGET - tokens_used)
+
+
+# Function to check that prompts sent together (e.g. the parts of a long resume) fit in what
+# is left of the session's budget; each prompt is already limited to MAX_PROMPT_TOKENS by fit_prompt
+# Raises TokenBudgetExceeded if they do not (never when the session budget is off)
+def check_session_budget(prompt_tokens, tokens_used=0):
+    if SESSION_TOKEN_BUDGET > 0 and prompt_tokens > SESSION_TOKEN_BUDGET - tokens_used:
+        raise TokenBudgetExceeded(
+            f"This request needs about {prompt_tokens} tokens, more than this session has left "
+            f"({max(SESSION_TOKEN_BUDGET - tokens_used, 0)})."
+        )
+
+
+# Function to build a prompt whose variable fields are truncated to fit max_tokens
+# build is called with the fields as keyword arguments; fields are cut in truncate_order,
+# first down to MIN_FIELD_TOKENS each and then further only if the prompt still does not fit.
+# Returns the prompt and the names of the fields that were truncated.
+@tracing.traced("prompt.build")
+def fit_prompt(build, fields, max_tokens, truncate_order):
+    fixed_tokens = count_tokens(build(**{name: "" for name in fields}))
+    if fixed_tokens >= max_tokens:
+        raise TokenBudgetExceeded(
+            f"The prompt needs at least {fixed_tokens} tokens but only {max(max_tokens, 0)} are available (per-request limit or what is left of this session's budget)."
+        )
+
+    fitted = dict(fields)
+    sizes = {name: count_tokens(text) for name, text in fields.items()}
+    excess = fixed_tokens + sum(sizes.values()) - max_tokens
+    truncated = []
+    for floor in (MIN_FIELD_TOKENS, 0):
+        for name in truncate_order:
+            if excess <= 0:
+                break
+            cut = min(excess, sizes[name] - floor)
+            if cut <= 0:
+                continue
+            fitted[name] = truncate_to_tokens(fitted[name], sizes[name] - cut)
+            new_size = count_tokens(fitted[name])
+            excess -= sizes[name] - new_size
+            sizes[name] = new_size
+            if name not in truncated:
+                truncated.append(name)
+
+    if truncated:
+        metrics.increment("tokens.truncated_prompts")
+        print(f"Truncated {', '.join(truncated)} to fit {max_tokens} prompt tokens")
+    prompt = build(**fitted)
+    tracing.set_attribute("prompt_tokens", count_tokens(prompt))
+    tracing.set_attribute("truncated", ", ".join(truncated))
+    return prompt, truncated
+
+
+# Function to record the tokens used by one model call
+def record_usage(call_type, prompt_tokens, response_tokens):
+    metrics.increment(f"tokens.{call_type}.prompt", prompt_tokens)
+    metrics.increment(f"tokens.{call_type}.response", response_tokens)
@@ -0,0 +1,249 @@
+import atexit
+import functools
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from contextvars import ContextVar, copy_context
+from dotenv import load_dotenv
+
+# Opt-in request tracing. With TRACING=true every script rerun (one user action: an
+# upload, Analyze, Update Score, a chat question) is the root span of a trace, and the
+# work it does (reading the resume, building prompts, waiting for a model slot, each
+# model attempt, parsing the score, rendering) is recorded as child spans with their
+# attributes. The current span is kept in a context variable; work handed to other
+# threads is run with wrap(), so its spans join the trace that started it. Finished
+# traces are written in the OTLP JSON format, one export request per line, to
+# TRACE_FILE and, if TRACE_ENDPOINT is set, posted to an OTLP/HTTP collector. When
+# tracing is off, span() returns a shared no-op span and nothing is recorded.
+
+load_dotenv()
+
+TRACING = os.getenv("TRACING", "false").lower() in ("1", "true", "yes")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+# e.g. http://localhost:4318/v1/traces
+TRACE_ENDPOINT = os.getenv("TRACE_ENDPOINT", "")
+SERVICE_NAME = "ats-checker"
+
+# Traces whose root span is still open; spans are exported together when the root ends.
+# A rerun stopped by st.stop() in another thread never ends its root, so the oldest
+# traces are exported as they are once there are too many.
+MAX_OPEN_TRACES = 100
+
+_current = ContextVar("current_span", default=None)
+_local = threading.local()
+_lock = threading.Lock()
+_open_traces = OrderedDict()  # trace id -> finished spans waiting for their root
+_exports = queue.Queue()
+_exporter = []
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def end(self):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Span:
+    """One timed operation in a trace; use as a context manager to make it the current span"""
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._token = None
+        if parent is None:
+            _open_trace(self.trace_id)
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _finish(self)
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc is not None and isinstance(exc, Exception):
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current.reset(self._token)
+        self.end()
+        return False
+
+
+# Function to start tracking a trace's spans until its root span ends
+def _open_trace(trace_id):
+    with _lock:
+        _open_traces[trace_id] = []
+        while len(_open_traces) > MAX_OPEN_TRACES:
+            _, spans = _open_traces.popitem(last=False)
+            if spans:
+                _export(spans)
+
+
+# Function to collect a finished span: a root exports its whole trace, a span that
+# finishes after its root (e.g. a background refresh) is exported on its own
+def _finish(span):
+    with _lock:
+        if span.parent_id is None:
+            _export(_open_traces.pop(span.trace_id, []) + [span])
+        elif span.trace_id in _open_traces:
+            _open_traces[span.trace_id].append(span)
+        else:
+            _export([span])
+
+
+# Function to convert an attribute value to an OTLP AnyValue
+def _value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+# Function to build an OTLP JSON export request for a list of spans
+def otlp_request(spans):
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": "ats_checker"},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_id or "",
+                    "name": span.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": [{"key": key, "value": _value(value)} for key, value in span.attributes.items()],
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+                } for span in spans],
+            }],
+        }]
+    }
+
+
+# Function to hand spans to the exporter thread, so requests never wait for the file or collector
+def _export(spans):
+    if not _exporter:
+        _exporter.append(threading.Thread(target=_export_loop, name="trace-exporter", daemon=True))
+        _exporter[0].start()
+    _exports.put(spans)
+
+
+def _export_loop():
+    while True:
+        spans = _exports.get()
+        try:
+            payload = json.dumps(otlp_request(spans))
+            if TRACE_FILE:
+                with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                    f.write(payload + "\n")
+            if TRACE_ENDPOINT:
+                request = urllib.request.Request(TRACE_ENDPOINT, data=payload.encode("utf-8"),
+                                                 headers={"Content-Type": "application/json"})
+                urllib.request.urlopen(request, timeout=5).close()
+        except Exception as e:
+            print(f"Could not export {len(spans)} spans: {str(e)}")
+        finally:
+            _exports.task_done()
+
+
+# Function to wait until every finished trace has been exported (used on exit)
+def flush():
+    if _exporter:
+        _exports.join()
+
+
+atexit.register(flush)
+
+
+# Function to trace an operation: use as "with span('prompt.build', call_type='score') as s:"
+# The span is a child of the current span, or the root of a new trace if there is none. For an
+# interval that does not match a block (like the wait for a model slot), call .end() instead.
+def span(name, **attributes):
+    if not TRACING:
+        return _NO_SPAN
+    return Span(name, _current.get(), attributes)
+
+
+# Decorator to trace every call of a function as a span
+def traced(name):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Function to set an attribute on the current span
+def set_attribute(key, value):
+    current = _current.get()
+    if current is not None:
+        current.set_attribute(key, value)
+
+
+# Function to make a function run in the current trace context when it is called from another thread
+def wrap(function):
+    if not TRACING:
+        return function
+    context = copy_context()
+    return functools.partial(context.run, function)
+
+
+# Function to start the trace of a script rerun, finishing one left open by st.rerun() or st.stop()
+def begin_rerun():
+    end_rerun()
+    if TRACING:
+        _local.rerun = Span("rerun", None, {"action": "interaction"})
+        _local.token = _current.set(_local.rerun)
+
+
+# Function to name the user action the current rerun performs ("upload", "analyze", ...)
+def set_action(action):
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        rerun.name = action
+        rerun.set_attribute("action", action)
+
+
+# Function to finish the trace of the current script rerun
+def end_rerun():
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        _local.rerun = None
+        try:
+            _current.reset(_local.token)
+        except ValueError:
+            # The rerun started in another context; just stop using its span
+            _current.set(None)
+        rerun.end()
@@ -0,0 +1,173 @@
+"""Warm start for the ATS Checker app.
+
+Does the slow first-time work before the app takes its first user, then starts
+Streamlit in this same process, so everything warmed up stays warm for the app:
+
+- creates the model client of every model tier once (the app reuses them, and their
+  connections, from model_client.model_for) and health-checks the model endpoint
+- loads the on-disk caches: the chosen extraction backends and, with the replay
+  backend, the recorded responses
+- runs one synthetic resume through extraction, prompt building, a stub model and
+  report parsing, so modules, parsers and compiled patterns are loaded before the
+  first real request
+
+The ready file is removed at start and written only when warm-up has finished and
+the Streamlit server answers its health check, so a readiness probe can simply test
+for it. If warm-up fails, the app is not started.
+
+Usage: python warmup.py --server.port 8501 --server.headless true
+       python warmup.py --no-serve
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from functools import partial
+from dotenv import load_dotenv
+
+import extractors
+import model_client
+from heuristics import estimate_report, estimate_score
+from prompts import build_analysis_prompt, build_chat_prompt, build_score_prompt
+from report import extract_ats_score, extract_issues, merge_reports
+from resume_text import canonicalize, fingerprint
+from samples import JOB_DESCRIPTION, RESUME_LINES, make_resume_pdf
+from token_budget import fit_prompt, request_budget
+
+load_dotenv()
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+READY_FILE = os.getenv("READY_FILE", os.path.join(tempfile.gettempdir(), "ats_checker.ready"))
+
+# Seconds to wait for the model endpoint's health check and for the server to come up
+HEALTH_CHECK_TIMEOUT = 30
+SERVER_START_TIMEOUT = 60
+
+
+# Function to create the model client of each tier and check that the model endpoint answers
+# Live clients open their connections here; count_tokens is free and does not generate anything
+def check_model():
+    backend = model_client.MODEL_BACKEND
+    names = set()
+    for call_type in model_client.DEFAULT_TIERS:
+        model = model_client.model_for(call_type)
+        names.add(model_client.tier_for(call_type)["model"])
+        if backend in ("live", "record"):
+            live_model = model.live_model if backend == "record" else model
+            live_model.count_tokens("ping", request_options={"timeout": HEALTH_CHECK_TIMEOUT})
+    if backend == "replay" and not os.path.isdir(model_client.FIXTURE_DIR):
+        raise RuntimeError(f"Fixture store {model_client.FIXTURE_DIR} does not exist")
+    return f"{backend} ({', '.join(sorted(names))})"
+
+
+# Function to load the on-disk caches, returns how many recorded responses were read
+# The extraction backend choices were read when extractors was imported; reading every
+# recorded response brings the fixture store into the page cache
+def load_caches():
+    loaded = 0
+    if model_client.MODEL_BACKEND == "replay":
+        for name in os.listdir(model_client.FIXTURE_DIR):
+            if name.endswith(".json"):
+                with open(os.path.join(model_client.FIXTURE_DIR, name), "rb") as f:
+                    f.read()
+                loaded += 1
+    return loaded
+
+
+# Function to run one synthetic resume through the whole pipeline against a stub model
+# The stub is called directly (not through call_model), so no latency is recorded and the breaker is untouched
+def synthetic_request():
+    stub = model_client.StubModel(latency=0)
+    extracted = extractors.extract_resume(make_resume_pdf(RESUME_LINES))
+    job_description = canonicalize(JOB_DESCRIPTION)
+    fields = {"resume_text": extracted["canonical"], "job_description": job_description}
+
+    build = partial(build_analysis_prompt, ats_model="Generic ATS", job_level="Mid Level", job_role="Software Engineer")
+    prompt, _ = fit_prompt(build, fields, request_budget(), ["job_description", "resume_text"])
+    fingerprint(prompt)
+    report = stub.generate_content([prompt]).text
+    score = extract_ats_score(report)
+    if score["value"] <= 0:
+        raise RuntimeError("The synthetic analysis had no score")
+    extract_issues(report)
+    merge_reports([report, report], [score["value"], score["value"]], [1, 1])
+
+    build = partial(build_score_prompt, ats_model="Generic ATS")
+    prompt, _ = fit_prompt(build, fields, request_budget(), ["job_description", "resume_text"])
+    extract_ats_score(stub.generate_content([prompt]).text.strip())
+    stub.generate_content([build_chat_prompt("What should I add?", extracted["canonical"], job_description, report)])
+
+    estimate_score(extracted["canonical"], job_description)
+    estimate_report(extracted["canonical"], job_description)
+    return score["value"]
+
+
+# Function to run the warm-up steps, printing how long each took
+def warm_up():
+    started = time.monotonic()
+    for name, step in [("model", check_model), ("caches", load_caches), ("synthetic request", synthetic_request)]:
+        step_started = time.monotonic()
+        result = step()
+        print(f"Warm-up {name}: {result} ({time.monotonic() - step_started:.2f}s)")
+    print(f"Warm-up finished in {time.monotonic() - started:.2f}s")
+
+
+# Function to write the ready file once the Streamlit server answers its health check
+def signal_ready(port):
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://localhost:{port}/_stcore/health", timeout=2) as response:
+                if response.status == 200:
+                    with open(READY_FILE, "w", encoding="utf-8") as f:
+                        f.write(f"{os.getpid()}\n")
+                    print(f"Ready: {READY_FILE}")
+                    return
+        except OSError:
+            time.sleep(0.5)
+    print(f"Streamlit server did not become healthy within {SERVER_START_TIMEOUT} seconds")
+
+
+# Function to remove the ready file, ignoring one that is not there
+def clear_ready():
+    try:
+        os.remove(READY_FILE)
+    except FileNotFoundError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm up the ATS Checker app, then start it",
+                                     epilog="Other options are passed to streamlit run")
+    parser.add_argument("--no-serve", action="store_true", help="Only warm up (e.g. to check a deployment), do not start the app")
+    args, streamlit_args = parser.parse_known_args()
+
+    clear_ready()
+    try:
+        warm_up()
+    except Exception as e:
+        print(f"Warm-up failed: {type(e).__name__}: {e}")
+        return 1
+    if args.no_serve:
+        return 0
+
+    # Streamlit runs app.py in this process, so it reuses the modules and model client warmed up above
+    from streamlit.web import cli
+
+    port = 8501
+    for number, value in enumerate(streamlit_args):
+        if value.startswith("--server.port"):
+            port = int(value.split("=", 1)[1] if "=" in value else streamlit_args[number + 1])
+    threading.Thread(target=signal_ready, args=(port,), name="ready", daemon=True).start()
+    sys.argv = ["streamlit", "run", APP_PATH, *streamlit_args]
+    try:
+        return cli.main()
+    finally:
+        clear_ready()
+
+
+if __name__ == "__main__":
+    sys.exit(main())